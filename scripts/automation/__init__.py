@@ -1,9 +1,38 @@
 """Automation package for capture-driven workflows."""
 
-from .config import AutomationConfig, ConsumerConfig, load_config
-from .emitter import NoteEmitter
-from .notes import NotePayload, iter_note_payloads
-from .store import AutomationStore
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any, Dict
+
+if TYPE_CHECKING:  # pragma: no cover - resolved lazily at runtime
+    from .config import AutomationConfig, ConsumerConfig, load_config
+    from .emitter import NoteEmitter
+    from .notes import NotePayload, iter_note_payloads
+    from .store import AutomationStore
+
+# Public names are resolved on first access (PEP 562) so importing the package,
+# e.g. for `cli --list-consumers`, does not pull in sqlite3, hashlib or PyYAML.
+_EXPORTS: Dict[str, str] = {
+    "AutomationConfig": ".config",
+    "ConsumerConfig": ".config",
+    "AutomationStore": ".store",
+    "NoteEmitter": ".emitter",
+    "NotePayload": ".notes",
+    "iter_note_payloads": ".notes",
+    "load_config": ".config",
+}
+
+
+def __getattr__(name: str) -> Any:
+    try:
+        module_name = _EXPORTS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
 
 __all__ = [
     "AutomationConfig",
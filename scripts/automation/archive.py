@@ -0,0 +1,146 @@
+"""Pack cold captures into archive segments and read them back."""
+
+from __future__ import annotations
+
+import contextlib
+import itertools
+import logging
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from scripts.vault.archive import ArchiveIndex, ArchiveWriter
+from scripts.vault.frontmatter import load_mapping, split_bytes
+from scripts.vault.index import FileStamp
+
+from . import metrics
+from .config import AutomationConfig
+from .frontmatter import parse_note_bytes
+from .hashing import algorithm_of, hash_bytes
+from .notes import NotePayload, to_payload
+from .store import AutomationStore
+
+LOG = logging.getLogger(__name__)
+
+# Notes packed per writer batch, i.e. per segment fsync and index fsync.
+PACK_BATCH_NOTES = 500
+
+
+@dataclass(slots=True)
+class ArchiveSummary:
+    """Counts produced by `pack_cold_notes`."""
+
+    packed: int = 0
+    changed: int = 0
+    failed: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+
+
+class PackedNotes:
+    """Load packed notes by their original path, for consumers that still need them."""
+
+    def __init__(self, capture_dir: Path, archive_dir: Path) -> None:
+        self.capture_dir = capture_dir
+        self.index = ArchiveIndex(archive_dir)
+
+    @classmethod
+    def open(cls, config: AutomationConfig) -> Optional["PackedNotes"]:
+        """Return None when no archive has been written yet."""
+        if config.archive is None or not (config.archive.directory / "index.jsonl").exists():
+            return None
+        return cls(config.capture_dir, config.archive.directory)
+
+    def load(self, path: Path, hash_algorithm: str) -> Optional[NotePayload]:
+        try:
+            relative = path.relative_to(self.capture_dir).as_posix()
+        except ValueError:
+            return None
+        entry = self.index.get(relative)
+        if entry is None:
+            return None
+        data = self.index.read(entry)
+        return to_payload(parse_note_bytes(path, data, hash_algorithm, entry.mtime_ns))
+
+
+def pack_cold_notes(
+    config: AutomationConfig,
+    store: AutomationStore,
+    older_than_days: Optional[float] = None,
+    dry_run: bool = False,
+) -> ArchiveSummary:
+    """
+    Move finished captures older than the cutoff into the archive.
+
+    Candidates come from the store: loose notes whose processing_status is in
+    `[tiering] final_statuses`. A note is only packed when its bytes still
+    match the stored hash, so anything edited since the last run stays loose
+    until the pipeline has seen the change. Notes are packed in batches of
+    `PACK_BATCH_NOTES`; once a batch is durably indexed, each loose file
+    that is unchanged since it was read is deleted and the store marks the
+    batch packed. A note edited in the meantime stays loose and shadows its
+    packed copy.
+    """
+    if config.archive is None:
+        raise ValueError("No [archive] directory configured.")
+    days = config.tiering.cold_after_days if older_than_days is None else older_than_days
+    cutoff_ns = int((time.time() - days * 86400) * 1_000_000_000)
+    summary = ArchiveSummary()
+    writer: Optional[ArchiveWriter] = None
+    run_metrics = metrics.current()
+    candidates = iter(store.iter_archivable(config.tiering.final_statuses, cutoff_ns))
+
+    while True:
+        chunk = list(itertools.islice(candidates, PACK_BATCH_NOTES))
+        if not chunk:
+            return summary
+        if writer is None and not dry_run:
+            writer = ArchiveWriter(config.archive.directory, config.archive.max_segment_bytes)
+        # (loose path, store key, stamp when read) of notes added to the batch.
+        added: List[Tuple[Path, str, FileStamp]] = []
+        batching = writer.batch() if writer is not None else contextlib.nullcontext()
+        with run_metrics.stage("archive.append"), batching as batch:
+            for raw_path, stored_hash in chunk:
+                path = Path(raw_path)
+                try:
+                    relative = path.relative_to(config.capture_dir).as_posix()
+                    with path.open("rb") as handle:
+                        stat = os.fstat(handle.fileno())
+                        data = handle.read()
+                except (ValueError, OSError) as exc:
+                    LOG.warning("Cannot archive %s: %s", path, exc)
+                    summary.failed += 1
+                    continue
+                if hash_bytes(data, algorithm_of(stored_hash)) != stored_hash:
+                    summary.changed += 1
+                    continue
+                try:
+                    fm_bytes, _ = split_bytes(data)
+                    frontmatter = load_mapping(fm_bytes.decode("utf-8")) if fm_bytes is not None else {}
+                except Exception as exc:  # noqa: BLE001 - YAML errors vary by version
+                    LOG.warning("Cannot archive %s: %s", path, exc)
+                    summary.failed += 1
+                    continue
+                summary.bytes_in += len(data)
+                if batch is None:
+                    summary.packed += 1
+                    continue
+                entry = batch.add(relative, data, stored_hash, stat.st_mtime_ns, frontmatter)
+                summary.bytes_out += entry.length
+                added.append((path, raw_path, FileStamp.of(stat)))
+        packed: List[str] = []
+        for path, raw_path, stamp in added:
+            try:
+                if FileStamp.of(path.stat()) != stamp:
+                    summary.changed += 1
+                    continue
+                path.unlink()
+            except OSError as exc:
+                LOG.warning("Packed %s but could not remove it: %s", path, exc)
+                summary.failed += 1
+                continue
+            packed.append(raw_path)
+        store.mark_packed(packed)
+        summary.packed += len(packed)
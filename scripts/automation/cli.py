@@ -6,11 +6,17 @@ import argparse
 import logging
 import sys
 from pathlib import Path
-from typing import Iterable, List, Optional, Sequence
+from typing import TYPE_CHECKING, Optional, Sequence, Union
 
-from . import AutomationStore, NoteEmitter, iter_note_payloads, load_config
-from .consumers import build_consumers
-from .emitter import NoteState
+from .config import AutomationConfig, ConsumerBudget, ConsumerConfig, load_config
+
+if TYPE_CHECKING:  # pragma: no cover - annotations only
+    import cProfile
+
+    from .consumers import Consumer
+    from .notes import NotePayload
+    from .sharding import Shard
+    from .store import AutomationStore
 
 
 def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
@@ -29,11 +35,51 @@ def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
         metavar="NAME",
         help="Limit the run to specific consumers (repeatable).",
     )
+    parser.add_argument(
+        "--ignore",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="Skip capture files or directories matching GLOB, in addition to [vault] ignore (repeatable).",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Rescan cold captures too, regardless of [tiering] full_scan_interval_hours.",
+    )
+    parser.add_argument(
+        "--shard",
+        metavar="I/N",
+        help=(
+            "Only scan and dispatch shard I of N (1-based, by a stable hash of the vault-relative path). "
+            "Shards may run concurrently, on one host or several sharing the state database."
+        ),
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        metavar="N",
+        help="Run N local processes, one per shard, then print their combined summary.",
+    )
     parser.add_argument(
         "--list-consumers",
         action="store_true",
         help="Print the configured consumers and exit.",
     )
+    parser.add_argument(
+        "--metrics-json",
+        type=Path,
+        metavar="PATH",
+        help="Write per-stage timings, counters and latency histograms as JSON ('-' for STDOUT).",
+    )
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        metavar="PATH",
+        help="Run under cProfile, dump stats to PATH and print the hottest functions to STDERR.",
+    )
+    # Set by --workers for its shard processes; the parent prints the merged profile.
+    parser.add_argument("--quiet-profile", action="store_true", help=argparse.SUPPRESS)
     parser.add_argument(
         "--log-level",
         choices=["DEBUG", "INFO", "WARNING", "ERROR"],
@@ -49,79 +95,670 @@ def setup_logging(level: str) -> None:
     )
 
 
+def parse_archive_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m scripts.automation.cli archive",
+        description=(
+            "Pack finished captures into compressed archive segments and remove the loose files. "
+            "capture_query.py keeps returning packed notes."
+        ),
+    )
+    parser.add_argument("--config", type=Path, help="Path to automations TOML config.")
+    parser.add_argument(
+        "--older-than",
+        type=float,
+        metavar="DAYS",
+        help="Only pack notes unmodified for DAYS (default: [tiering] cold_after_days).",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Report what would be packed without writing anything.",
+    )
+    parser.add_argument(
+        "--log-level",
+        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+        help="Override the log level (default from config).",
+    )
+    return parser.parse_args(argv)
+
+
+def archive_main(argv: Optional[Sequence[str]] = None) -> int:
+    """Entry point for the `archive` subcommand."""
+    from .archive import pack_cold_notes
+    from .runlock import run_coalesced
+    from .store import AutomationStore
+
+    args = parse_archive_args(argv)
+    config = load_config(args.config)
+    setup_logging(args.log_level or config.log_level)
+
+    def pack(_rerun: bool) -> int:
+        store = AutomationStore(config.database_path)
+        try:
+            summary = pack_cold_notes(config, store, args.older_than, args.dry_run)
+        finally:
+            store.close()
+        logging.info(
+            "%s %d notes (%d bytes -> %d bytes); %d changed since the last run, %d failed",
+            "Would pack" if args.dry_run else "Packed",
+            summary.packed,
+            summary.bytes_in,
+            summary.bytes_out,
+            summary.changed,
+            summary.failed,
+        )
+        return 1 if summary.failed else 0
+
+    if args.dry_run:
+        return pack(False)
+    # Packing deletes loose files, so it holds dispatch.lock exclusively and
+    # never overlaps a run, sharded or not.
+    return run_coalesced(config.state_dir, pack, suffix=".archive")
+
+
+def parse_dead_letter_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m scripts.automation.cli dead-letters",
+        description=(
+            "List notes consumers gave up on after [retry] max_attempts failures, "
+            "or requeue them for the next run."
+        ),
+    )
+    parser.add_argument("--config", type=Path, help="Path to automations TOML config.")
+    parser.add_argument("--consumer", metavar="NAME", help="Only this consumer's notes.")
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Also list notes still waiting out their backoff.",
+    )
+    parser.add_argument(
+        "--requeue",
+        action="store_true",
+        help="Requeue the dead letters (only PATHs, when given) instead of listing them.",
+    )
+    parser.add_argument("paths", nargs="*", type=Path, metavar="PATH", help="Notes to requeue.")
+    return parser.parse_args(argv)
+
+
+def dead_letters_main(argv: Optional[Sequence[str]] = None) -> int:
+    """Entry point for the `dead-letters` subcommand."""
+    from datetime import datetime
+
+    from .store import AutomationStore
+
+    args = parse_dead_letter_args(argv)
+    config = load_config(args.config)
+    setup_logging(config.log_level)
+    store = AutomationStore(config.database_path)
+    try:
+        if args.requeue:
+            paths = [path.expanduser().resolve() for path in args.paths] or None
+            count = store.requeue(args.consumer, paths)
+            logging.info("Requeued %d dead letters", count)
+            return 0
+        for retry in store.iter_retries(args.consumer, dead=None if args.all else True):
+            state = "dead" if retry.dead else datetime.fromtimestamp(retry.next_attempt_at).isoformat(timespec="seconds")
+            error = retry.last_error.splitlines()[0] if retry.last_error else ""
+            print(f"{retry.consumer}\t{retry.attempts}\t{state}\t{retry.path}\t{error}")
+    finally:
+        store.close()
+    return 0
+
+
 def main(argv: Optional[Sequence[str]] = None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if argv and argv[0] == "archive":
+        return archive_main(argv[1:])
+    if argv and argv[0] == "dead-letters":
+        return dead_letters_main(argv[1:])
+    if argv and argv[0] == "changes":
+        return changes_main(argv[1:])
+    if argv and argv[0] == "shard-summary":
+        return shard_summary_main(argv[1:])
     args = parse_args(argv)
     config = load_config(args.config)
+    config.ignore += tuple(args.ignore)
     log_level = args.log_level or config.log_level
     setup_logging(log_level)
 
-    consumers = build_consumers(config)
+    consumer_configs = [consumer for consumer in config.consumers if consumer.enabled]
     if args.list_consumers:
-        for consumer in consumers:
-            print(consumer.name)
+        for consumer_config in consumer_configs:
+            print(consumer_config.name)
         return 0
 
     if args.consumers:
         requested = {name.lower() for name in args.consumers}
-        consumers = [consumer for consumer in consumers if consumer.name.lower() in requested]
-        if not consumers:
+        consumer_configs = [
+            consumer for consumer in consumer_configs if consumer.name.lower() in requested
+        ]
+        if not consumer_configs:
             logging.error("No matching consumers for filters: %s", ", ".join(args.consumers))
             return 2
 
+    if args.workers is not None:
+        if args.shard:
+            logging.error("--workers and --shard cannot be combined")
+            return 2
+        if args.workers < 1:
+            logging.error("--workers must be at least 1")
+            return 2
+        return run_workers(argv, args, config)
+
+    from .metrics import RunMetrics, use_metrics
+    from .runlock import run_coalesced
+    from .sharding import Shard
+
+    shard = Shard.parse(args.shard, config.vault_root) if args.shard else None
+
+    run_metrics = RunMetrics()
+    profiler = None
+    if args.profile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        with use_metrics(run_metrics):
+            # Overlapping invocations (path unit + timer) fold into one extra
+            # incremental pass of the run already in progress.
+            status = run_coalesced(
+                config.state_dir,
+                lambda rerun: run(config, consumer_configs, full=args.full and not rerun, shard=shard),
+                suffix=f".shard-{shard.index}-of-{shard.count}" if shard else "",
+                shared=shard is not None,
+            )
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            write_profile(profiler, args.profile, report=not args.quiet_profile)
+
+    report = run_metrics.to_dict()
+    if args.metrics_json:
+        write_metrics(report, args.metrics_json)
+    if config.metrics.store:
+        from .store import AutomationStore
+
+        store = AutomationStore(config.database_path)
+        try:
+            store.record_run_metrics(report["started_at"], report, config.metrics.retain_runs)
+        finally:
+            store.close()
+    return status
+
+
+def run_workers(argv: Sequence[str], args: argparse.Namespace, config: AutomationConfig) -> int:
+    """
+    Run `args.workers` shard processes with the same options, wait, and merge
+    their summaries. Each worker writes `--metrics-json`/`--profile` to its
+    own temporary file; the parent writes the metrics of all shards as one
+    JSON document and the merged profile to the requested paths.
+    """
+    import json
+    import subprocess
+    import tempfile
+    import time
+
+    from .sharding import merge_summaries
+    from .store import AutomationStore
+
+    count = args.workers
+    started = time.time()
+    forwarded: list[str] = []
+    remaining = iter(argv)
+    for arg in remaining:
+        if arg in ("--workers", "--metrics-json", "--profile"):
+            next(remaining, None)
+        elif not arg.startswith(("--workers=", "--metrics-json=", "--profile=")):
+            forwarded.append(arg)
+    with tempfile.TemporaryDirectory(prefix="automation-workers-") as scratch:
+        outputs = Path(scratch)
+        workers = []
+        for index in range(1, count + 1):
+            command = [sys.executable, "-m", "scripts.automation.cli", *forwarded, "--shard", f"{index}/{count}"]
+            if args.metrics_json:
+                command += ["--metrics-json", str(outputs / f"metrics-{index}.json")]
+            if args.profile:
+                command += ["--profile", str(outputs / f"profile-{index}.prof"), "--quiet-profile"]
+            workers.append(subprocess.Popen(command))
+        exit_codes = [worker.wait() for worker in workers]
+
+        if args.metrics_json:
+            reports = {
+                f"{index}/{count}": json.loads(path.read_text(encoding="utf-8"))
+                for index in range(1, count + 1)
+                if (path := outputs / f"metrics-{index}.json").exists()
+            }
+            write_metrics({"workers": count, "shards": reports}, args.metrics_json)
+        if args.profile:
+            profiles = [str(path) for path in sorted(outputs.glob("profile-*.prof"))]
+            if profiles:
+                write_profile(profiles, args.profile)
+
+    store = AutomationStore(config.database_path)
+    try:
+        combined, status, missing = merge_summaries(store, count, since=started)
+    finally:
+        store.close()
+    print_shard_summary(combined, count, missing)
+    if missing:
+        return max([1, *exit_codes])
+    return max([status, *exit_codes])
+
+
+def print_shard_summary(combined: dict, count: int, missing: Sequence[int]) -> None:
+    for name, counts in sorted(combined.items()):
+        logging.info(
+            "Consumer %s (%d shards): %s",
+            name,
+            count,
+            " ".join(f"{key}={value}" for key, value in sorted(counts.items())),
+        )
+    if missing:
+        logging.error("No summary from shards: %s", ", ".join(f"{index}/{count}" for index in missing))
+
+
+def parse_changes_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m scripts.automation.cli changes",
+        description=(
+            "Print notes created, modified or deleted since a journal sequence number. "
+            "Pass the last printed sequence as --since next time to read only newer changes."
+        ),
+    )
+    parser.add_argument("--config", type=Path, help="Path to automations TOML config.")
+    parser.add_argument("--since", type=int, default=0, metavar="SEQ", help="Only changes after SEQ (default 0).")
+    parser.add_argument("--limit", type=int, metavar="N", help="At most N changes.")
+    parser.add_argument(
+        "--format",
+        choices=["text", "json"],
+        default="text",
+        help="Tab-separated lines (seq, kind, path, hash) or one JSON document.",
+    )
+    return parser.parse_args(argv)
+
+
+def changes_main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Entry point for the `changes` subcommand.
+
+    Exits with status 3 when entries after `--since` were already compacted;
+    the reader has to rescan and continue from the printed `last_seq`.
+    """
+    import json
+
+    from .store import AutomationStore
+
+    args = parse_changes_args(argv)
+    config = load_config(args.config)
+    setup_logging(config.log_level)
+    store = AutomationStore(config.database_path)
+    try:
+        compacted = store.compacted_through()
+        changes = list(store.iter_changes(args.since, args.limit))
+        last_seq = changes[-1].seq if changes else max(args.since, store.last_change_seq())
+    finally:
+        store.close()
+    resync = args.since < compacted
+    if args.format == "json":
+        document = {
+            "since": args.since,
+            "last_seq": last_seq,
+            "compacted_through": compacted,
+            "resync": resync,
+            "changes": [change._asdict() for change in changes],
+        }
+        print(json.dumps(document, indent=2))
+    else:
+        for change in changes:
+            print(f"{change.seq}\t{change.kind}\t{change.path}\t{change.note_hash or ''}")
+    if resync:
+        logging.warning(
+            "Changes up to %d were compacted; entries after %d are incomplete, rescan instead",
+            compacted,
+            args.since,
+        )
+        return 3
+    return 0
+
+
+def parse_shard_summary_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m scripts.automation.cli shard-summary",
+        description="Combine the summaries recorded by the last run of every shard of an --shard I/N run.",
+    )
+    parser.add_argument("--config", type=Path, help="Path to automations TOML config.")
+    parser.add_argument("--shards", type=int, required=True, metavar="N", help="Number of shards (N).")
+    parser.add_argument(
+        "--since",
+        type=float,
+        metavar="EPOCH",
+        help="Treat summaries older than this Unix time as missing.",
+    )
+    return parser.parse_args(argv)
+
+
+def shard_summary_main(argv: Optional[Sequence[str]] = None) -> int:
+    """Entry point for the `shard-summary` subcommand."""
+    from .sharding import merge_summaries
+    from .store import AutomationStore
+
+    args = parse_shard_summary_args(argv)
+    config = load_config(args.config)
+    setup_logging(config.log_level)
+    store = AutomationStore(config.database_path)
+    try:
+        combined, status, missing = merge_summaries(store, args.shards, since=args.since)
+    finally:
+        store.close()
+    print_shard_summary(combined, args.shards, missing)
+    return 1 if missing else status
+
+
+def consumer_signature(consumer_config: ConsumerConfig) -> str:
+    """Digest of a consumer's settings; a change re-evaluates not-applicable notes."""
+    import hashlib
+    import json
+
+    payload = json.dumps(
+        {"type": consumer_config.type, "options": consumer_config.options},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def run(
+    config: AutomationConfig,
+    consumer_configs: Sequence[ConsumerConfig],
+    full: bool = False,
+    shard: Optional["Shard"] = None,
+) -> int:
+    """
+    Refresh the store and dispatch pending notes to the given consumers.
+
+    With tiering enabled, cold notes are skipped unless `full` is set or a
+    periodic full scan is due. That periodic scan (kept even with tiering
+    off) and `full` re-hash every note instead of trusting the parse cache.
+    Every note is dispatched under a lease, renewed while its consumer runs,
+    so runs sharing the database (from other hosts, too) never handle it
+    twice. With a `shard`, only that
+    shard's notes are scanned and dispatched, and the run's summary is
+    recorded for `shard-summary`.
+    """
+    # Heavy modules (sqlite3, hashlib, PyYAML, consumer backends) load only
+    # once we know there is a run to do.
+    import time
+
+    from .archive import PackedNotes
+    from .consumers import build_consumer, get_consumer_class
+    from .emitter import NoteEmitter
+    from .metrics import current
+    from .notes import iter_note_payloads
+    from .selectors import describe
+    from .sharding import LEASE_SECONDS, LeaseKeeper, lease_owner, record_summary
+    from .store import AutomationStore
+    from .tiering import classify, full_scan_due, load_cold_set, record_full_scan, rehash_due
+
+    from scripts.vault.index import ParseCache
+
+    run_metrics = current()
     store = AutomationStore(config.database_path)
-    emitter = NoteEmitter(store)
+    cache = ParseCache.open(config.parse_cache)
+    emitter = NoteEmitter(store, config.hash_algorithm, PackedNotes.open(config), cache)
 
+    owns = shard.owns if shard is not None else None
+    owner = lease_owner()
+    leases = LeaseKeeper(config.database_path, owner)
+    full_scan = full or full_scan_due(store, config.tiering, shard=shard)
+    # Full scans on the interval (or --full) also ignore cached hashes.
+    rehash = full or rehash_due(store, config.tiering, shard=shard)
+    cold = None if full_scan else load_cold_set(store)
     try:
-        payloads = list(iter_note_payloads(config.vault_root, config.capture_dir))
+        refreshed = emitter.refresh(
+            iter_note_payloads(
+                config.vault_root,
+                config.capture_dir,
+                config.hash_algorithm,
+                config.ignore,
+                skip=cold.paths if cold else (),
+                prune=cold.prune_dir if cold else None,
+                cache=cache,
+                owns=owns,
+                rehash=rehash,
+            ),
+            partial=not full_scan,
+            owns=owns,
+        )
     except FileNotFoundError as exc:
         logging.error("Capture directory missing: %s", exc)
+        store.close()
+        if cache is not None:
+            cache.close()
         return 1
+    logging.debug(
+        "Scanned %d notes (%d new, %d modified, %d deleted, %d renamed) in a %s scan",
+        refreshed.seen,
+        refreshed.created,
+        refreshed.modified,
+        refreshed.deleted,
+        refreshed.renamed,
+        "rehashing full" if rehash else "full" if full_scan else "hot-tier",
+    )
+    if config.tiering.enabled:
+        classify(store, config.tiering, config.capture_dir, full_scan)
+    if rehash:
+        record_full_scan(store, shard=shard)
+    if config.changes.retain_days > 0:
+        with run_metrics.stage("store.compact_changes"):
+            store.compact_changes(int(time.time() - config.changes.retain_days * 86400))
 
-    states = emitter.refresh(payloads)
     summary: dict[str, dict[str, int]] = {}
     failure = False
 
-    for consumer in consumers:
-        summary[consumer.name] = {"success": 0, "skip": 0, "error": 0}
-        pending_states = list(emitter.pending_for_consumer(consumer.name, states))
-        if not pending_states:
-            logging.debug("No updates for consumer %s", consumer.name)
+    for consumer_config in consumer_configs:
+        summary[consumer_config.name] = {"success": 0, "skip": 0, "error": 0, "not_applicable": 0, "deferred": 0}
+        # Not-applicable checkpoints are only valid for the settings that
+        # produced them (e.g. a different marker_tag matches other notes).
+        signature_key = f"consumer.{consumer_config.name}.signature"
+        signature = consumer_signature(consumer_config)
+        if store.get_metadata(signature_key) != signature:
+            dropped = store.reset_not_applicable(consumer_config.name)
+            store.set_metadata(signature_key, signature)
+            if dropped:
+                logging.info(
+                    "Consumer %s settings changed; re-evaluating %d notes",
+                    consumer_config.name,
+                    dropped,
+                )
+        consumer_class = get_consumer_class(consumer_config.type)
+        watch = consumer_class.watch(consumer_config, config)
+        if watch is not None:
+            with run_metrics.stage("store.advance"):
+                advanced = store.advance_unwatched(consumer_config.name, watch)
+            if advanced:
+                logging.debug(
+                    "Consumer %s: %d notes changed outside %s",
+                    consumer_config.name,
+                    advanced,
+                    ", ".join(watch),
+                )
+        selector = consumer_class.selector(consumer_config, config)
+        if selector:
+            logging.debug(
+                "Consumer %s selects %s",
+                consumer_config.name,
+                " ".join(describe(selector, config.capture_dir)),
+            )
+        with run_metrics.stage("store.pending"):
+            pending = emitter.pending_paths(consumer_config.name, selector, consumer_config.priority)
+            if shard is not None:
+                pending = [entry for entry in pending if shard.owns(entry[0])]
+        if not pending:
+            logging.debug("No updates for consumer %s", consumer_config.name)
             continue
 
+        # Consumers are only constructed once they have work; construction may
+        # be expensive (Taskwarrior exports its whole database).
+        with run_metrics.stage(f"consumer.{consumer_config.name}.build"):
+            consumer = build_consumer(consumer_config, config)
+
         logging.info(
             "Dispatching %d notes to consumer %s",
-            len(pending_states),
+            len(pending),
             consumer.name,
         )
 
-        for state in pending_states:
-            if not consumer.matches(state):
-                continue
-            try:
-                result = consumer.handle(state, store)
-            except Exception:  # noqa: BLE001 - bubble up after logging
-                failure = True
-                summary[consumer.name]["error"] += 1
-                logging.exception(
-                    "Consumer %s failed on note %s",
+        not_applicable: list[tuple[Path, str]] = []
+        counts = summary[consumer.name]
+        budget = consumer_config.budget
+        started = time.monotonic()
+        calls_before = consumer.external_calls
+        handled = 0
+        examined = 0
+        with run_metrics.stage(f"consumer.{consumer.name}.dispatch"):
+            for state in emitter.pending_for_consumer(consumer.name, pending):
+                reason = budget_spent(budget, consumer, handled, started, calls_before)
+                if reason:
+                    counts["deferred"] = len(pending) - examined
+                    logging.info(
+                        "Consumer %s stopped after %d notes (%s); %d left for the next run",
+                        consumer.name,
+                        handled,
+                        reason,
+                        counts["deferred"],
+                    )
+                    break
+                examined += 1
+                if not consumer.matches(state):
+                    not_applicable.append((state.note.path, state.note.note_hash))
+                    continue
+                if not store.claim(
                     consumer.name,
                     state.note.path,
-                )
-            else:
-                summary[consumer.name][result.status] += 1
+                    state.note.note_hash,
+                    owner,
+                    LEASE_SECONDS,
+                ):
+                    logging.debug("Consumer %s: %s is leased by another worker", consumer.name, state.note.path)
+                    continue
+                handled += 1
+                try:
+                    with leases.holding(consumer.name, state.note.path), run_metrics.timed(f"consumer.{consumer.name}"):
+                        result = consumer.handle(state, store)
+                except Exception as exc:  # noqa: BLE001 - bubble up after logging
+                    failure = True
+                    counts["error"] += 1
+                    logging.exception(
+                        "Consumer %s failed on note %s",
+                        consumer.name,
+                        state.note.path,
+                    )
+                    schedule_retry(store, config, consumer.name, state.note, f"{type(exc).__name__}: {exc}")
+                else:
+                    counts[result.status] = counts.get(result.status, 0) + 1
+                    if result.status == "error":
+                        schedule_retry(store, config, consumer.name, state.note, result.message or "error")
+                finally:
+                    store.release(consumer.name, state.note.path, owner)
+        with run_metrics.stage("store.not_applicable"):
+            counts["not_applicable"] = store.mark_not_applicable(consumer.name, not_applicable)
 
     for name, counts in summary.items():
         logging.info(
-            "Consumer %s: success=%d skip=%d error=%d",
+            "Consumer %s: success=%d skip=%d error=%d not_applicable=%d deferred=%d",
             name,
             counts["success"],
             counts["skip"],
             counts["error"],
+            counts["not_applicable"],
+            counts["deferred"],
         )
+        for status, count in counts.items():
+            run_metrics.add(f"consumer.{name}.{status}", count)
 
+    if shard is not None:
+        record_summary(store, shard, summary, 1 if failure else 0, time.time())
+    leases.close()
     store.close()
+    if cache is not None:
+        cache.close()
     return 1 if failure else 0
 
 
+def budget_spent(
+    budget: ConsumerBudget,
+    consumer: "Consumer",
+    handled: int,
+    started: float,
+    calls_before: int,
+) -> Optional[str]:
+    """Return why `consumer` must stop dispatching this run, or None while budget remains."""
+    import time
+
+    if budget.max_items is not None and handled >= budget.max_items:
+        return f"max_items={budget.max_items}"
+    if budget.max_seconds is not None and time.monotonic() - started >= budget.max_seconds:
+        return f"max_seconds={budget.max_seconds:g}"
+    if budget.max_external_calls is not None and consumer.external_calls - calls_before >= budget.max_external_calls:
+        return f"max_external_calls={budget.max_external_calls}"
+    if consumer.budget_exhausted():
+        return "consumer limit"
+    return None
+
+
+def schedule_retry(
+    store: "AutomationStore",
+    config: AutomationConfig,
+    consumer_name: str,
+    note: "NotePayload",
+    error: str,
+) -> None:
+    """Record a failed dispatch so the note waits out its backoff before the next attempt."""
+    retry = store.record_failure(consumer_name, note.path, note.note_hash, error, config.retry)
+    if retry.dead:
+        logging.warning(
+            "Consumer %s gave up on %s after %d attempts; requeue with `dead-letters --requeue`",
+            consumer_name,
+            note.path,
+            retry.attempts,
+        )
+    else:
+        logging.info(
+            "Consumer %s will retry %s in %ds (attempt %d of %d)",
+            consumer_name,
+            note.path,
+            retry.next_attempt_at - retry.failed_at,
+            retry.attempts,
+            config.retry.max_attempts,
+        )
+
+
+def write_metrics(report: dict, destination: Path) -> None:
+    import json
+
+    payload = json.dumps(report, indent=2, sort_keys=True)
+    if str(destination) == "-":
+        print(payload)
+    else:
+        destination.write_text(payload + "\n", encoding="utf-8")
+
+
+def write_profile(
+    source: Union["cProfile.Profile", Sequence[str]],
+    destination: Path,
+    report: bool = True,
+) -> None:
+    """Dump a profiler, or the merged stats files of several, and print the hottest functions."""
+    import pstats
+
+    sources = list(source) if isinstance(source, (list, tuple)) else [source]
+    stats = pstats.Stats(*sources, stream=sys.stderr)
+    stats.dump_stats(str(destination))
+    if report:
+        stats.sort_stats("cumulative").print_stats(30)
+
+
 if __name__ == "__main__":
     sys.exit(main())
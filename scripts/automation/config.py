@@ -3,11 +3,27 @@
 from __future__ import annotations
 
 import os
-import tomllib
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, Dict, Mapping, Optional
 
+from scripts.vault.walk import DEFAULT_IGNORES
+
+from .hashing import DEFAULT_ALGORITHM, check_algorithm
+
+
+# Dispatch orders for a consumer's pending notes, by note mtime or path.
+PRIORITIES = ("newest", "oldest", "path")
+
+
+@dataclass(slots=True)
+class ConsumerBudget:
+    """Per-run limits on one consumer's work; None means unlimited."""
+
+    max_items: Optional[int] = None
+    max_seconds: Optional[float] = None
+    max_external_calls: Optional[int] = None
+
 
 @dataclass(slots=True)
 class ConsumerConfig:
@@ -17,6 +33,54 @@ class ConsumerConfig:
     type: str
     enabled: bool = True
     options: Dict[str, Any] = field(default_factory=dict)
+    budget: ConsumerBudget = field(default_factory=ConsumerBudget)
+    priority: str = "newest"
+
+
+@dataclass(slots=True)
+class MetricsConfig:
+    """Settings for run metrics persisted in the state database."""
+
+    store: bool = False
+    retain_runs: int = 200
+
+
+@dataclass(slots=True)
+class TieringConfig:
+    """Settings for skipping cold (finished, old) captures on routine runs."""
+
+    enabled: bool = False
+    final_statuses: tuple[str, ...] = ("organized", "archived")
+    cold_after_days: float = 30.0
+    full_scan_interval_hours: float = 24.0
+
+
+@dataclass(slots=True)
+class RetryConfig:
+    """Backoff for notes a consumer failed on, and when they become dead letters."""
+
+    max_attempts: int = 5
+    base_delay_seconds: float = 300.0
+    max_delay_seconds: float = 6 * 3600.0
+
+    def delay(self, attempts: int) -> int:
+        """Seconds to wait after the `attempts`-th consecutive failure."""
+        return int(min(self.max_delay_seconds, self.base_delay_seconds * 2 ** (attempts - 1)))
+
+
+@dataclass(slots=True)
+class ChangesConfig:
+    """Retention of the `changes` journal; entries older than retain_days are compacted."""
+
+    retain_days: float = 30.0
+
+
+@dataclass(slots=True)
+class ArchiveConfig:
+    """Where `archive` packs cold captures and how large segments grow."""
+
+    directory: Path
+    max_segment_bytes: int = 64 * 1024 * 1024
 
 
 @dataclass(slots=True)
@@ -29,6 +93,14 @@ class AutomationConfig:
     database_path: Path
     log_level: str
     consumers: tuple[ConsumerConfig, ...]
+    metrics: MetricsConfig = field(default_factory=MetricsConfig)
+    hash_algorithm: str = DEFAULT_ALGORITHM
+    ignore: tuple[str, ...] = DEFAULT_IGNORES
+    tiering: TieringConfig = field(default_factory=TieringConfig)
+    archive: Optional[ArchiveConfig] = None
+    parse_cache: Optional[Path] = None
+    retry: RetryConfig = field(default_factory=RetryConfig)
+    changes: ChangesConfig = field(default_factory=ChangesConfig)
 
     def ensure_state_dirs(self) -> None:
         """Create state directories if they do not exist."""
@@ -42,12 +114,38 @@ DEFAULTS: Dict[str, Any] = {
     "vault": {
         "root": str(Path("~/notes").expanduser()),
         "capture_dir": "capture/raw_capture",
+        "ignore": [],
     },
     "state": {
         "dir": str(Path("~/.local/state/para-organize").expanduser()),
         "database": "automations.db",
     },
     "logging": {"level": "INFO"},
+    "metrics": {
+        "store": False,
+        "retain_runs": 200,
+    },
+    "hashing": {"algorithm": DEFAULT_ALGORITHM},
+    "cache": {
+        "enabled": True,
+        "path": "",
+    },
+    "retry": {
+        "max_attempts": 5,
+        "base_delay_seconds": 300,
+        "max_delay_seconds": 21600,
+    },
+    "changes": {"retain_days": 30},
+    "archive": {
+        "directory": "capture/archive",
+        "max_segment_mb": 64,
+    },
+    "tiering": {
+        "enabled": False,
+        "final_statuses": ["organized", "archived"],
+        "cold_after_days": 30,
+        "full_scan_interval_hours": 24,
+    },
     "consumers": {
         "taskwarrior": {
             "type": "taskwarrior",
@@ -84,6 +182,8 @@ def _deep_merge(base: Mapping[str, Any], overlay: Mapping[str, Any]) -> Dict[str
 
 
 def _load_file(path: Path) -> Dict[str, Any]:
+    import tomllib
+
     with path.open("rb") as handle:
         return tomllib.load(handle)
 
@@ -96,6 +196,19 @@ def _expand_path(raw: str, base: Optional[Path] = None) -> Path:
     return path.resolve()
 
 
+def _budget_limit(name: str, data: Mapping[str, Any], key: str, kind: type) -> Any:
+    raw = data.get(key)
+    if raw is None or str(raw).strip() == "":
+        return None
+    try:
+        value = kind(raw)
+    except (TypeError, ValueError) as exc:
+        raise ValueError(f"Consumer '{name}' budget.{key} must be a number, got {raw!r}.") from exc
+    if value < 0:
+        raise ValueError(f"Consumer '{name}' budget.{key} must be non-negative, got {value}.")
+    return value
+
+
 def _normalise_consumers(data: Mapping[str, Any]) -> tuple[ConsumerConfig, ...]:
     consumers: list[ConsumerConfig] = []
     for name, payload in sorted(data.items()):
@@ -103,12 +216,28 @@ def _normalise_consumers(data: Mapping[str, Any]) -> tuple[ConsumerConfig, ...]:
             raise ValueError(f"Consumer '{name}' must map to a table of options.")
         if "type" not in payload:
             raise ValueError(f"Consumer '{name}' is missing required 'type'.")
+        budget_data = payload.get("budget", {})
+        if not isinstance(budget_data, Mapping):
+            raise ValueError(f"Consumer '{name}' budget must be a table.")
+        priority = str(payload.get("priority", "newest")).strip().lower()
+        if priority not in PRIORITIES:
+            raise ValueError(
+                f"Consumer '{name}' priority must be one of {', '.join(PRIORITIES)}, got {priority!r}.",
+            )
         consumers.append(
             ConsumerConfig(
                 name=name,
                 type=str(payload["type"]),
                 enabled=bool(payload.get("enabled", True)),
-                options={k: v for k, v in payload.items() if k not in {"type", "enabled"}},
+                options={
+                    k: v for k, v in payload.items() if k not in {"type", "enabled", "budget", "priority"}
+                },
+                budget=ConsumerBudget(
+                    max_items=_budget_limit(name, budget_data, "max_items", int),
+                    max_seconds=_budget_limit(name, budget_data, "max_seconds", float),
+                    max_external_calls=_budget_limit(name, budget_data, "max_external_calls", int),
+                ),
+                priority=priority,
             ),
         )
     return tuple(consumers)
@@ -133,6 +262,10 @@ def load_config(path: Optional[Path] = None) -> AutomationConfig:
     vault_root = _expand_path(str(data["vault"]["root"]))
     capture_dir = _expand_path(str(data["vault"]["capture_dir"]), vault_root)
 
+    ignore = data["vault"].get("ignore", [])
+    if not isinstance(ignore, list):
+        raise ValueError("'vault.ignore' must be a list of glob patterns.")
+
     state_dir = _expand_path(str(data["state"]["dir"]))
     database_path = _expand_path(
         str(data["state"].get("database", "automations.db")),
@@ -141,6 +274,51 @@ def load_config(path: Optional[Path] = None) -> AutomationConfig:
 
     log_level = str(data.get("logging", {}).get("level", "INFO")).upper()
     consumers = _normalise_consumers(data.get("consumers", {}))
+    metrics_data = data.get("metrics", {})
+    metrics = MetricsConfig(
+        store=bool(metrics_data.get("store", False)),
+        retain_runs=int(metrics_data.get("retain_runs", 200)),
+    )
+    hash_algorithm = check_algorithm(
+        str(data.get("hashing", {}).get("algorithm", DEFAULT_ALGORITHM)),
+    )
+
+    tiering_data = data.get("tiering", {})
+    tiering = TieringConfig(
+        enabled=bool(tiering_data.get("enabled", False)),
+        final_statuses=tuple(
+            str(status).lower() for status in tiering_data.get("final_statuses", ("organized", "archived"))
+        ),
+        cold_after_days=float(tiering_data.get("cold_after_days", 30)),
+        full_scan_interval_hours=float(tiering_data.get("full_scan_interval_hours", 24)),
+    )
+
+    archive_data = data.get("archive", {})
+    archive = ArchiveConfig(
+        directory=_expand_path(str(archive_data.get("directory", "capture/archive")), vault_root),
+        max_segment_bytes=int(float(archive_data.get("max_segment_mb", 64)) * 1024 * 1024),
+    )
+
+    retry_data = data.get("retry", {})
+    retry = RetryConfig(
+        max_attempts=int(retry_data.get("max_attempts", 5)),
+        base_delay_seconds=float(retry_data.get("base_delay_seconds", 300)),
+        max_delay_seconds=float(retry_data.get("max_delay_seconds", 21600)),
+    )
+    if retry.max_attempts < 1:
+        raise ValueError("'retry.max_attempts' must be at least 1.")
+
+    changes = ChangesConfig(retain_days=float(data.get("changes", {}).get("retain_days", 30)))
+
+    cache_data = data.get("cache", {})
+    parse_cache: Optional[Path] = None
+    if cache_data.get("enabled", True):
+        if cache_data.get("path"):
+            parse_cache = _expand_path(str(cache_data["path"]), state_dir)
+        else:
+            from scripts.vault.index import default_cache_path
+
+            parse_cache = default_cache_path()
 
     config = AutomationConfig(
         vault_root=vault_root,
@@ -149,6 +327,14 @@ def load_config(path: Optional[Path] = None) -> AutomationConfig:
         database_path=database_path,
         log_level=log_level,
         consumers=consumers,
+        metrics=metrics,
+        hash_algorithm=hash_algorithm,
+        ignore=DEFAULT_IGNORES + tuple(str(pattern) for pattern in ignore),
+        tiering=tiering,
+        archive=archive,
+        parse_cache=parse_cache,
+        retry=retry,
+        changes=changes,
     )
     config.ensure_state_dirs()
     return config
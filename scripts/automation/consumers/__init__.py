@@ -2,13 +2,22 @@
 
 from __future__ import annotations
 
-from typing import Dict, Iterable, List, Type
+import importlib
+from typing import Dict, List, Type
 
 from ..config import AutomationConfig, ConsumerConfig
 from .base import Consumer
 
 REGISTRY: Dict[str, Type[Consumer]] = {}
 
+# Built-in consumer modules, imported the first time their type is requested.
+BUILTIN_CONSUMERS: Dict[str, str] = {
+    "taskwarrior": ".taskwarrior",
+}
+
+# Third-party packages can expose consumers through this entry-point group.
+ENTRY_POINT_GROUP = "para_organize.automation.consumers"
+
 
 def register(name: str):
     """Decorator to register a consumer class."""
@@ -22,30 +31,48 @@ def register(name: str):
     return decorator
 
 
+def _load_consumer_type(name: str) -> None:
+    module_name = BUILTIN_CONSUMERS.get(name)
+    if module_name is not None:
+        importlib.import_module(module_name, __name__)
+        return
+    from importlib.metadata import entry_points
+
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+        if entry_point.name == name:
+            cls = entry_point.load()
+            REGISTRY.setdefault(name, cls)
+            return
+
+
 def get_consumer_class(name: str) -> Type[Consumer]:
+    if name not in REGISTRY:
+        _load_consumer_type(name)
     try:
         return REGISTRY[name]
     except KeyError as exc:
         raise KeyError(f"Unknown consumer type '{name}'.") from exc
 
 
+def build_consumer(consumer_config: ConsumerConfig, config: AutomationConfig) -> Consumer:
+    cls = get_consumer_class(consumer_config.type)
+    return cls(consumer_config, config)
+
+
 def build_consumers(config: AutomationConfig) -> List[Consumer]:
     instances: List[Consumer] = []
     for consumer_config in config.consumers:
         if not consumer_config.enabled:
             continue
-        cls = get_consumer_class(consumer_config.type)
-        instances.append(cls(consumer_config, config))
+        instances.append(build_consumer(consumer_config, config))
     return instances
 
 
 __all__ = [
+    "BUILTIN_CONSUMERS",
     "Consumer",
+    "build_consumer",
     "build_consumers",
     "get_consumer_class",
     "register",
 ]
-
-# Register built-in consumers.
-# noqa import ensures registrations happen on module import.
-from . import taskwarrior  # noqa: E402,F401
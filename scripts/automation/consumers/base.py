@@ -5,12 +5,14 @@ from __future__ import annotations
 import logging
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
 
 from ..config import AutomationConfig, ConsumerConfig
-from ..emitter import NoteState
-from ..notes import NotePayload
-from ..store import AutomationStore
+from ..selectors import Selector
+
+if TYPE_CHECKING:  # pragma: no cover - annotations only
+    from ..emitter import NoteState
+    from ..store import AutomationStore
 
 LOG = logging.getLogger("automation.consumers")
 
@@ -31,6 +33,19 @@ class ConsumerResult:
         }
 
 
+def parse_watch(raw: Any) -> Optional[Tuple[str, ...]]:
+    """Validate a `watch` option: None, or a list of top-level field names."""
+    if raw is None:
+        return None
+    if not isinstance(raw, list) or not all(isinstance(name, str) and name.strip() for name in raw):
+        raise ValueError("Consumer 'watch' must be a list of field names.")
+    names = tuple(sorted({name.strip() for name in raw}))
+    nested = [name for name in names if "." in name]
+    if nested:
+        raise ValueError(f"Consumer 'watch' takes top-level fields only: {', '.join(nested)}.")
+    return names
+
+
 class Consumer:
     """Interface implemented by concrete consumers."""
 
@@ -43,6 +58,39 @@ class Consumer:
         self.config = config
         self.global_config = global_config
 
+    @classmethod
+    def selector(cls, config: ConsumerConfig, global_config: AutomationConfig) -> Selector:
+        """
+        Notes this consumer could ever match, evaluated by the store before
+        any note is loaded. Defaults to the optional `select` table in the
+        consumer's options; subclasses add the filters they always apply.
+        `matches` still runs on every selected note.
+        """
+        return Selector.from_options(config.options.get("select"), global_config.capture_dir)
+
+    @classmethod
+    def watch(cls, config: ConsumerConfig, global_config: AutomationConfig) -> Optional[Tuple[str, ...]]:
+        """
+        Top-level frontmatter fields (and `body`) this consumer depends on,
+        from the `watch` option. Edits that touch none of them advance its
+        checkpoint instead of re-dispatching the note. None means any change
+        to the file counts. A consumer's `matches` and `handle` must only
+        read watched parts of a note.
+        """
+        return parse_watch(config.options.get("watch"))
+
+    @property
+    def external_calls(self) -> int:
+        """Calls to external systems made so far, counted against `budget.max_external_calls`."""
+        return 0
+
+    def budget_exhausted(self) -> bool:
+        """
+        Return True once the consumer's own limits allow no more work this
+        run; the remaining notes are left pending without being loaded.
+        """
+        return False
+
     def matches(self, state: NoteState) -> bool:
         """Return True when the consumer wants to inspect this note."""
         return True
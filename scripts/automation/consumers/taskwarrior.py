@@ -2,12 +2,9 @@
 
 from __future__ import annotations
 
-import json
 import logging
 import os
 import shutil
-import subprocess
-import tempfile
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Dict, List, Optional, Sequence, Set, Tuple
@@ -15,36 +12,55 @@ from typing import Dict, List, Optional, Sequence, Set, Tuple
 from ..config import AutomationConfig, ConsumerConfig
 from ..emitter import NoteState
 from ..notes import NotePayload
+from ..selectors import Selector
 from ..store import AutomationStore
 from . import register
 from .base import Consumer, ConsumerResult
+from .taskwarrior_backends import (
+    BACKENDS,
+    CliBackend,
+    DataFileBackend,
+    FakeBackend,
+    TaskBackend,
+    TaskCommandError,
+)
 
 LOG = logging.getLogger("automation.taskwarrior")
 
+# Everything `_process_note` reads: the description comes from the body or
+# title, tags and project from `tags`, the entry date and annotation from the
+# rest. Edits to other fields (status, last_edited_date, ...) are ignored.
+DEFAULT_WATCH = ("body", "capture_id", "created_date", "id", "tags", "timestamp", "title")
+
 
 def _normalise_tag(value: str) -> str:
     return value.strip().replace(" ", "_").lower()
 
 
+def _yaml_timestamp(source: str) -> Optional[datetime]:
+    """Resolve a YAML timestamp spelling `fromisoformat` rejects, e.g. `2024-1-2 10:00:00 -5`."""
+    import yaml
+
+    try:
+        value = yaml.safe_load(source)
+    except yaml.YAMLError:
+        return None
+    return value if isinstance(value, datetime) else None
+
+
 def _task_timestamp(source: Optional[str] = None) -> str:
+    # Frontmatter timestamps arrive as the text YAML read rather than as
+    # datetimes, so accept every spelling a YAML timestamp may have.
     if source:
         try:
-            dt = datetime.fromisoformat(source.replace("Z", "+00:00"))
-            return dt.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+            dt: Optional[datetime] = datetime.fromisoformat(source.replace("Z", "+00:00"))
         except ValueError:
-            pass
+            dt = _yaml_timestamp(source)
+        if dt is not None:
+            return dt.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
     return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
 
 
-class TaskCommandError(RuntimeError):
-    """Raised when a Taskwarrior invocation fails."""
-
-    def __init__(self, message: str, stdout: str = "", stderr: str = "") -> None:
-        super().__init__(message)
-        self.stdout = stdout
-        self.stderr = stderr
-
-
 @register("taskwarrior")
 class TaskWarriorConsumer(Consumer):
     """Consumer that mirrors capture notes into Taskwarrior."""
@@ -100,12 +116,21 @@ class TaskWarriorConsumer(Consumer):
         backup_path.mkdir(parents=True, exist_ok=True)
         self.backup_dir = backup_path
 
+        self.backend_name = str(opts.get("backend", "cli")).strip().lower()
+        if self.backend_name not in BACKENDS:
+            raise ValueError(
+                f"Unknown Taskwarrior backend {self.backend_name!r} (expected one of {', '.join(BACKENDS)}).",
+            )
+        if self.backend_name == "fake" and opts.get("data_directory"):
+            # The fake backend owns its directory, so create it up front.
+            Path(str(opts["data_directory"])).expanduser().mkdir(parents=True, exist_ok=True)
         self.taskrc_path = self._resolve_taskrc_path(opts)
         self.data_directory = self._resolve_data_directory(opts)
         if not self.data_directory.exists():
             raise FileNotFoundError(
                 f"Taskwarrior data directory not found: {self.data_directory}",
             )
+        self.backend = self._build_backend(opts)
 
         self._backed_up = False
         self._existing_tags = self._load_existing_tags()
@@ -115,6 +140,25 @@ class TaskWarriorConsumer(Consumer):
 
     # ------------------------------------------------------------------ lifecycle
 
+    @classmethod
+    def selector(cls, config: ConsumerConfig, global_config: AutomationConfig) -> Selector:
+        selector = super().selector(config, global_config)
+        marker_tag = str(config.options.get("marker_tag", "todo")).strip()
+        return selector.with_tags(marker_tag) if marker_tag else selector
+
+    @classmethod
+    def watch(cls, config: ConsumerConfig, global_config: AutomationConfig) -> Optional[Tuple[str, ...]]:
+        if "watch" in config.options:
+            return super().watch(config, global_config)
+        return DEFAULT_WATCH
+
+    @property
+    def external_calls(self) -> int:
+        return self.backend.external_calls
+
+    def budget_exhausted(self) -> bool:
+        return self.max_new_tasks_per_run is not None and self._tasks_added >= self.max_new_tasks_per_run
+
     def matches(self, state: NoteState) -> bool:
         if not self.marker_tag:
             return True
@@ -272,8 +316,8 @@ class TaskWarriorConsumer(Consumer):
         return candidate.strip()
 
     def _prepare_tags(self, note: NotePayload) -> Tuple[List[str], Optional[str]]:
-        tags = {_normalise_tag(tag) for tag in note.tags}
-        tags = {tag for tag in tags if tag}
+        # `tag_set` is already stripped and lowercased.
+        tags = {tag.replace(" ", "_") for tag in note.tag_set}
 
         # Remove marker and explicit strip tags.
         tags = {
@@ -356,30 +400,17 @@ class TaskWarriorConsumer(Consumer):
 
     # ------------------------------- Taskwarrior integration
 
-    def _run_task(self, args: Sequence[str], input_text: Optional[str] = None) -> subprocess.CompletedProcess:
-        cmd = [
-            "task",
-            f"rc.data.location={self.data_directory}",
-            "rc.confirmation=no",
-            "rc.hooks=off",
-        ] + list(args)
-        env = os.environ.copy()
-        if self.taskrc_path:
-            env["TASKRC"] = str(self.taskrc_path)
-        proc = subprocess.run(
-            cmd,
-            input=input_text.encode("utf-8") if input_text else None,
-            capture_output=True,
-            text=True,
-            env=env,
-        )
-        if proc.returncode != 0:
-            raise TaskCommandError(
-                f"Taskwarrior command failed: {' '.join(cmd)}",
-                stdout=proc.stdout,
-                stderr=proc.stderr,
-            )
-        return proc
+    def _build_backend(self, opts: Dict[str, object]) -> TaskBackend:
+        if self.backend_name == "fake":
+            store_raw = opts.get("fake_store")
+            store_path = Path(str(store_raw)).expanduser() if store_raw else Path("fake-tasks.jsonl")
+            if not store_path.is_absolute():
+                store_path = self.data_directory / store_path
+            return FakeBackend(store_path)
+        cli = CliBackend(self.data_directory, self.taskrc_path)
+        if self.backend_name == "files":
+            return DataFileBackend(self.data_directory, cli)
+        return cli
 
     def _resolve_taskrc_path(self, opts: Dict[str, object]) -> Optional[Path]:
         taskrc = opts.get("taskrc_path")
@@ -432,33 +463,12 @@ class TaskWarriorConsumer(Consumer):
         return None
 
     def _load_existing_tags(self) -> Set[str]:
-        try:
-            proc = self._run_task(["_tags"])
-        except TaskCommandError as exc:
-            raise TaskCommandError(
-                "Failed to load existing Taskwarrior tags",
-                stdout=exc.stdout,
-                stderr=exc.stderr,
-            ) from exc
-        tags = {line.strip().lower() for line in proc.stdout.splitlines() if line.strip()}
-        return tags
+        return self.backend.tags()
 
     def _load_existing_task_keys(self) -> Tuple[Set[Tuple[str, Tuple[str, ...], str]], Set[Tuple[str, str]]]:
-        try:
-            proc = self._run_task(["rc.json.array=1", "export"])
-        except TaskCommandError as exc:
-            raise TaskCommandError(
-                "Failed to export existing Taskwarrior tasks",
-                stdout=exc.stdout,
-                stderr=exc.stderr,
-            ) from exc
-        try:
-            tasks = json.loads(proc.stdout)
-        except json.JSONDecodeError as exc:
-            raise TaskCommandError("Failed to parse Taskwarrior export", proc.stdout, proc.stderr) from exc
         keys: Set[Tuple[str, Tuple[str, ...], str]] = set()
         summary_keys: Set[Tuple[str, str]] = set()
-        for task in tasks:
+        for task in self.backend.export():
             description = str(task.get("description", "")).strip()
             tags = tuple(sorted(str(tag) for tag in task.get("tags", []) if tag))
             project = str(task.get("project", "")).strip()
@@ -467,14 +477,4 @@ class TaskWarriorConsumer(Consumer):
         return keys, summary_keys
 
     def _import_task(self, payload: Dict[str, object]) -> None:
-        with tempfile.NamedTemporaryFile("w", encoding="utf-8", delete=False, suffix=".json") as handle:
-            json.dump([payload], handle)
-            handle.flush()
-            tmp_path = Path(handle.name)
-        try:
-            self._run_task(["import", str(tmp_path)])
-        finally:
-            try:
-                tmp_path.unlink()
-            except FileNotFoundError:
-                pass
+        self.backend.import_tasks([payload])
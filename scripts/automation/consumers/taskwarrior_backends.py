@@ -0,0 +1,252 @@
+"""Storage backends used by the Taskwarrior consumer."""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import sqlite3
+import subprocess
+import tempfile
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Set
+
+from .. import metrics
+
+# Virtual tags `task _tags` always reports, even on an empty database.
+BUILTIN_TAGS = frozenset({"next", "nocal", "nocolor", "nonag"})
+
+# One attribute of a Taskwarrior 2.x data line: key:"value" with \" escapes.
+_FF4_ATTRIBUTE = re.compile(r'([A-Za-z0-9_.-]+):"((?:[^"\\]|\\.)*)"')
+_FF4_ESCAPES = {"&open;": "[", "&close;": "]", "&dquot;": '"'}
+
+Task = Dict[str, object]
+
+
+class TaskCommandError(RuntimeError):
+    """Raised when a Taskwarrior invocation fails."""
+
+    def __init__(self, message: str, stdout: str = "", stderr: str = "") -> None:
+        super().__init__(message)
+        self.stdout = stdout
+        self.stderr = stderr
+
+
+class TaskBackend:
+    """Operations the consumer needs from a Taskwarrior database."""
+
+    #: Number of external (subprocess) calls made so far.
+    external_calls = 0
+
+    def tags(self) -> Set[str]:
+        """Return every known tag, lowercased."""
+        raise NotImplementedError
+
+    def export(self) -> List[Task]:
+        """Return all tasks as Taskwarrior JSON export records."""
+        raise NotImplementedError
+
+    def import_tasks(self, tasks: Sequence[Task]) -> None:
+        """Create tasks from Taskwarrior JSON import records."""
+        raise NotImplementedError
+
+
+class CliBackend(TaskBackend):
+    """Backend that shells out to the `task` binary (the default)."""
+
+    def __init__(self, data_directory: Path, taskrc_path: Optional[Path]) -> None:
+        self.data_directory = data_directory
+        self.taskrc_path = taskrc_path
+        self.external_calls = 0
+
+    def run(self, args: Sequence[str], input_text: Optional[str] = None) -> subprocess.CompletedProcess:
+        cmd = [
+            "task",
+            f"rc.data.location={self.data_directory}",
+            "rc.confirmation=no",
+            "rc.hooks=off",
+        ] + list(args)
+        env = os.environ.copy()
+        if self.taskrc_path:
+            env["TASKRC"] = str(self.taskrc_path)
+        run_metrics = metrics.current()
+        self.external_calls += 1
+        with run_metrics.stage("taskwarrior.subprocess"), run_metrics.timed("taskwarrior.subprocess"):
+            proc = subprocess.run(
+                cmd,
+                input=input_text,
+                capture_output=True,
+                text=True,
+                env=env,
+            )
+        if proc.returncode != 0:
+            raise TaskCommandError(
+                f"Taskwarrior command failed: {' '.join(cmd)}",
+                stdout=proc.stdout,
+                stderr=proc.stderr,
+            )
+        return proc
+
+    def tags(self) -> Set[str]:
+        try:
+            proc = self.run(["_tags"])
+        except TaskCommandError as exc:
+            raise TaskCommandError(
+                "Failed to load existing Taskwarrior tags",
+                stdout=exc.stdout,
+                stderr=exc.stderr,
+            ) from exc
+        return {line.strip().lower() for line in proc.stdout.splitlines() if line.strip()}
+
+    def export(self) -> List[Task]:
+        try:
+            proc = self.run(["rc.json.array=1", "export"])
+        except TaskCommandError as exc:
+            raise TaskCommandError(
+                "Failed to export existing Taskwarrior tasks",
+                stdout=exc.stdout,
+                stderr=exc.stderr,
+            ) from exc
+        try:
+            return json.loads(proc.stdout)
+        except json.JSONDecodeError as exc:
+            raise TaskCommandError("Failed to parse Taskwarrior export", proc.stdout, proc.stderr) from exc
+
+    def import_tasks(self, tasks: Sequence[Task]) -> None:
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", delete=False, suffix=".json") as handle:
+            json.dump(list(tasks), handle)
+            handle.flush()
+            tmp_path = Path(handle.name)
+        try:
+            self.run(["import", str(tmp_path)])
+        finally:
+            try:
+                tmp_path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class DataFileBackend(TaskBackend):
+    """
+    Read tags and tasks straight from Taskwarrior's data files.
+
+    Supports the Taskwarrior 2.x `pending.data`/`completed.data` files and the
+    3.x `taskchampion.sqlite3` replica. Imports are delegated to `task` so the
+    binary keeps ownership of writes.
+    """
+
+    def __init__(self, data_directory: Path, writer: CliBackend) -> None:
+        self.data_directory = data_directory
+        self._writer = writer
+
+    @property
+    def external_calls(self) -> int:  # type: ignore[override]
+        return self._writer.external_calls
+
+    def tags(self) -> Set[str]:
+        tags = set(BUILTIN_TAGS)
+        for task in self.export():
+            tags.update(str(tag).lower() for tag in task.get("tags", []) if tag)
+        return tags
+
+    def export(self) -> List[Task]:
+        replica = self.data_directory / "taskchampion.sqlite3"
+        if replica.exists():
+            return list(self._read_replica(replica))
+        tasks: List[Task] = []
+        for name in ("pending.data", "completed.data"):
+            path = self.data_directory / name
+            if path.exists():
+                tasks.extend(self._read_ff4(path))
+        return tasks
+
+    def import_tasks(self, tasks: Sequence[Task]) -> None:
+        self._writer.import_tasks(tasks)
+
+    @staticmethod
+    def _unescape(value: str) -> str:
+        value = value.replace('\\"', '"')
+        for escaped, raw in _FF4_ESCAPES.items():
+            value = value.replace(escaped, raw)
+        return value
+
+    def _read_ff4(self, path: Path) -> Iterator[Task]:
+        with path.open("r", encoding="utf-8") as handle:
+            for line in handle:
+                line = line.strip()
+                if not line.startswith("["):
+                    continue
+                task: Task = {}
+                for key, raw_value in _FF4_ATTRIBUTE.findall(line):
+                    value = self._unescape(raw_value)
+                    if key == "tags":
+                        task["tags"] = [tag for tag in value.split(",") if tag]
+                    else:
+                        task[key] = value
+                yield task
+
+    @staticmethod
+    def _read_replica(path: Path) -> Iterator[Task]:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            for (raw,) in conn.execute("SELECT data FROM tasks"):
+                data = json.loads(raw)
+                task: Task = {
+                    key: value for key, value in data.items() if not key.startswith("tag_")
+                }
+                task["tags"] = [key[len("tag_") :] for key in data if key.startswith("tag_")]
+                yield task
+        finally:
+            conn.close()
+
+
+class FakeBackend(TaskBackend):
+    """
+    In-process stand-in for Taskwarrior backed by a JSON-lines file.
+
+    Imports append one line per task, so load tests with 100k tasks stay
+    linear. Intended for benchmarks and tests; it never touches `task`.
+    """
+
+    def __init__(self, store_path: Path) -> None:
+        self.store_path = store_path
+        self.store_path.parent.mkdir(parents=True, exist_ok=True)
+        self.external_calls = 0
+        self._tasks: Optional[List[Task]] = None
+
+    def _load(self) -> List[Task]:
+        if self._tasks is None:
+            tasks: List[Task] = []
+            if self.store_path.exists():
+                with self.store_path.open("r", encoding="utf-8") as handle:
+                    tasks = [json.loads(line) for line in handle if line.strip()]
+            self._tasks = tasks
+        return self._tasks
+
+    def tags(self) -> Set[str]:
+        tags = set(BUILTIN_TAGS)
+        for task in self._load():
+            tags.update(str(tag).lower() for tag in task.get("tags", []) if tag)
+        return tags
+
+    def export(self) -> List[Task]:
+        return list(self._load())
+
+    def import_tasks(self, tasks: Sequence[Task]) -> None:
+        tasks_list = self._load()
+        now = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        records: List[Task] = []
+        for task in tasks:
+            record: Task = {"uuid": str(uuid.uuid4()), "status": "pending", "entry": now}
+            record.update(task)
+            record["modified"] = now
+            records.append(record)
+        with self.store_path.open("a", encoding="utf-8") as handle:
+            for record in records:
+                handle.write(json.dumps(record, sort_keys=True) + "\n")
+        tasks_list.extend(records)
+
+
+BACKENDS = ("cli", "files", "fake")
@@ -4,15 +4,23 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, Iterator, List, Optional, Sequence
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, List, Optional, Tuple
 
-from .notes import NotePayload
-from .store import AutomationStore
+from . import metrics
+from .hashing import DEFAULT_ALGORITHM, algorithm_of, hash_bytes
+from .notes import NotePayload, load_payload
+from .store import MODIFIED, AutomationStore
+
+if TYPE_CHECKING:  # pragma: no cover
+    from scripts.vault.index import ParseCache
+
+    from .archive import PackedNotes
+    from .selectors import Selector
 
 
 @dataclass(slots=True)
 class NoteState:
-    """State wrapper describing how a note changed since the last run."""
+    """State wrapper describing how a note changed since a consumer last saw it."""
 
     note: NotePayload
     previous_hash: Optional[str]
@@ -26,45 +34,146 @@ class NoteState:
         return self.previous_hash != self.note.note_hash
 
 
+@dataclass(slots=True)
+class RefreshSummary:
+    """Counts produced by `NoteEmitter.refresh`."""
+
+    seen: int = 0
+    created: int = 0
+    modified: int = 0
+    deleted: int = 0
+    renamed: int = 0
+
+    @property
+    def unchanged(self) -> int:
+        return self.seen - self.created - self.modified
+
+
 class NoteEmitter:
     """Synchronise notes into the store and enumerate updates for consumers."""
 
-    def __init__(self, store: AutomationStore) -> None:
+    def __init__(
+        self,
+        store: AutomationStore,
+        hash_algorithm: str = DEFAULT_ALGORITHM,
+        packed: Optional[PackedNotes] = None,
+        cache: Optional[ParseCache] = None,
+    ) -> None:
         self._store = store
+        self._hash_algorithm = hash_algorithm
+        self._packed = packed
+        self._cache = cache
 
-    def refresh(self, payloads: Iterable[NotePayload]) -> List[NoteState]:
+    def refresh(
+        self,
+        payloads: Iterable[NotePayload],
+        partial: bool = False,
+        owns: Optional[Callable[[str], bool]] = None,
+    ) -> RefreshSummary:
         """
-        Upsert note payloads into the database and return change metadata.
+        Upsert note payloads into the database, streaming.
+
+        Each payload is dropped as soon as its hash and metadata are stored, so
+        memory stays bounded by the number of paths rather than note bodies.
+        When the configured hash algorithm changed since a note was stored,
+        unchanged notes have their checkpoints migrated to the new digest
+        instead of being reported as modified.
 
         Args:
             payloads: Iterable of `NotePayload` records.
+            partial: The payloads come from a hot-tier scan, so cold notes
+                that were not yielded must not be purged.
+            owns: The payloads cover only the paths this accepts (one shard),
+                so only those are purged when missing.
         Returns:
-            List of `NoteState` objects describing previous hashes.
+            `RefreshSummary` with created/modified/deleted counts; renamed
+            notes count as created and deleted, and their checkpoints follow
+            them to the new path.
         """
-        states: List[NoteState] = []
+        run_metrics = metrics.current()
+        summary = RefreshSummary()
         seen_paths: List[Path] = []
         for payload in payloads:
-            previous = self._store.upsert_note(payload)
-            states.append(NoteState(note=payload, previous_hash=previous))
+            with run_metrics.stage("store.upsert"):
+                previous = self._store.upsert_note(payload)
+            if previous is not None and previous != payload.note_hash:
+                previous = self._migrate_hash(payload, previous)
+                if previous != payload.note_hash and algorithm_of(previous) != algorithm_of(payload.note_hash):
+                    # Re-hashed under a new algorithm and edited as well.
+                    self._store.record_change(payload.path, MODIFIED, payload.note_hash)
+            summary.seen += 1
+            if previous is None:
+                summary.created += 1
+            elif previous != payload.note_hash:
+                summary.modified += 1
             seen_paths.append(payload.path)
-        self._store.purge_missing(seen_paths)
-        return states
+        with run_metrics.stage("store.purge"):
+            summary.deleted, summary.renamed = self._store.purge_missing(
+                seen_paths,
+                include_cold=not partial,
+                owns=owns,
+            )
+        return summary
+
+    def _migrate_hash(self, payload: NotePayload, previous: str) -> str:
+        """Carry checkpoints over to a new digest when only the algorithm changed."""
+        previous_algorithm = algorithm_of(previous)
+        if previous_algorithm == algorithm_of(payload.note_hash):
+            return previous
+        with metrics.current().stage("store.migrate_hash"):
+            if hash_bytes(payload.raw_bytes, previous_algorithm) != previous:
+                return previous
+            self._store.migrate_hash(payload.path, previous, payload.note_hash)
+        return payload.note_hash
+
+    def pending_paths(
+        self,
+        consumer_name: str,
+        selector: Optional[Selector] = None,
+        order: str = "path",
+    ) -> List[Tuple[Path, str, Optional[str]]]:
+        """
+        Return `(path, note_hash, last_emitted_hash)` for notes a consumer has not
+        processed at their current hash, without loading any note bodies.
+        Notes outside `selector` are filtered out by the store query, and the
+        list is sorted by `order` ("newest", "oldest" or "path").
+        """
+        return [
+            (Path(path), note_hash, emitted_hash)
+            for path, note_hash, emitted_hash in self._store.iter_pending(
+                consumer_name,
+                selector,
+                order=order,
+            )
+        ]
 
     def pending_for_consumer(
         self,
         consumer_name: str,
-        states: Iterable[NoteState],
+        pending: Optional[Iterable[Tuple[Path, str, Optional[str]]]] = None,
     ) -> Iterator[NoteState]:
         """
         Yield note states that a consumer needs to process based on hashes.
 
-        The caller is still responsible for applying consumer-specific filters
-        (e.g., tags, modalities).
+        Notes are re-read from disk one at a time as they are yielded, falling
+        back to the archive for packed notes; notes that disappeared since
+        `refresh` are skipped. The caller is still
+        responsible for applying consumer-specific filters (e.g., tags,
+        modalities).
         """
-        for state in states:
-            if self._store.needs_emission(
-                consumer_name,
-                state.note.path,
-                state.note.note_hash,
-            ):
-                yield state
+        if pending is None:
+            pending = self.pending_paths(consumer_name)
+        run_metrics = metrics.current()
+        for path, _note_hash, emitted_hash in pending:
+            try:
+                with run_metrics.stage("load"):
+                    payload = load_payload(path, self._hash_algorithm, self._cache)
+            except FileNotFoundError:
+                if self._packed is None:
+                    continue
+                with run_metrics.stage("load.packed"):
+                    packed = self._packed.load(path, self._hash_algorithm)
+                if packed is None:
+                    continue
+                payload = packed
+            yield NoteState(note=payload, previous_hash=emitted_hash)
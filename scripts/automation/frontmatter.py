@@ -1,175 +1,166 @@
-"""Frontmatter parsing utilities with optional PyYAML support."""
+"""
+Read and hash capture notes for the automation pipeline.
+
+Splitting and YAML loading come from `scripts.vault.frontmatter`, so notes
+parse exactly as capture_query sees them, and
+`scripts.vault.index.ParseCache` lets either tool reuse the other's work.
+Frontmatter timestamps therefore stay the strings YAML read (they round-trip
+through the store's JSON), not `datetime` objects. Decoded text keeps what
+consumers saw when notes were read as text: universal newlines, and
+`content` without the blank lines after the frontmatter.
+"""
 
 from __future__ import annotations
 
-import re
+import mmap
+import os
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Optional
 
-try:
-    import yaml
-except ImportError:  # pragma: no cover - fallback to pure-Python parser
-    yaml = None  # type: ignore[assignment]
+from scripts.vault.frontmatter import load_mapping, split_bytes
+from scripts.vault.index import FileStamp, ParseCache
+
+from . import metrics
+from .hashing import DEFAULT_ALGORITHM, algorithm_of, hash_bytes
+
+# Files at least this large are hashed through mmap and their bytes are not
+# kept in memory; the body is re-read only if a consumer asks for it.
+MMAP_THRESHOLD = 1 << 20
+
+
+def decode_text(data: bytes) -> str:
+    """Decode note bytes as UTF-8 with CRLF and CR line endings read as LF."""
+    text = data.decode("utf-8")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
 
 
 @dataclass(slots=True)
 class NoteRecord:
-    """Represents a capture note parsed from disk."""
+    """
+    Represents a capture note parsed from disk.
+
+    Only the frontmatter is decoded eagerly; `raw_text` and `content` decode
+    the raw bytes on access.
+    """
 
     path: Path
     frontmatter: Dict[str, Any]
-    content: str
-    raw_text: str
-
-
-def _yaml_load(text: str) -> Dict[str, Any]:
-    if yaml is None:
-        return _fallback_parse(text)
-    if not text.strip():
-        return {}
-    data = yaml.safe_load(text)
-    if data is None:
-        return {}
-    if not isinstance(data, dict):
-        raise ValueError("Frontmatter must be a mapping.")
-    return data
-
-
-def _parse_scalar(token: str) -> Any:
-    token = token.strip()
-    if token in {"", "~", "null", "Null", "NULL"}:
-        return None
-    if token.lower() in {"true", "false"}:
-        return token.lower() == "true"
-    if token.startswith("'") and token.endswith("'"):
-        return token[1:-1]
-    if token.startswith('"') and token.endswith('"'):
-        return token[1:-1]
-    if re.fullmatch(r"-?\d+", token):
-        try:
-            return int(token)
-        except ValueError:
-            pass
-    if re.fullmatch(r"-?\d+\.\d+", token):
-        try:
-            return float(token)
-        except ValueError:
-            pass
-    if token.startswith("[") and token.endswith("]"):
-        inner = token[1:-1].strip()
-        if not inner:
-            return []
-        return [_parse_scalar(item) for item in inner.split(",")]
-    if token.startswith("{") and token.endswith("}"):
-        inner = token[1:-1].strip()
-        if not inner:
-            return {}
-        result: Dict[str, Any] = {}
-        for part in inner.split(","):
-            if ":" not in part:
-                continue
-            key, value = part.split(":", 1)
-            result[key.strip()] = _parse_scalar(value.strip())
-        return result
-    return token
-
-
-def _parse_block(lines: List[str], start: int, indent: int) -> Tuple[Dict[str, Any], int]:
-    mapping: Dict[str, Any] = {}
-    index = start
-    total = len(lines)
-
-    while index < total:
-        line = lines[index]
-        stripped = line.strip()
-        if not stripped:
-            index += 1
-            continue
-        current_indent = len(line) - len(line.lstrip(" "))
-        if current_indent < indent:
-            break
-        if ":" not in stripped:
-            break
-        key_part, value_part = line.split(":", 1)
-        key = key_part.strip()
-        value = value_part.strip()
-        index += 1
-        if value:
-            mapping[key] = _parse_scalar(value)
-            continue
-        next_indent = indent + 2
-        seq, new_index = _parse_sequence(lines, index, next_indent)
-        if seq is not None:
-            mapping[key] = seq
-            index = new_index
-            continue
-        nested, new_index = _parse_block(lines, index, next_indent)
-        mapping[key] = nested
-        index = new_index
-
-    return mapping, index
-
-
-def _parse_sequence(lines: List[str], start: int, indent: int) -> Tuple[Optional[List[Any]], int]:
-    items: List[Any] = []
-    index = start
-    total = len(lines)
-    consumed = False
-
-    while index < total:
-        line = lines[index]
-        stripped = line.strip()
-        if not stripped:
-            index += 1
-            continue
-        current_indent = len(line) - len(line.lstrip(" "))
-        if current_indent < indent:
-            break
-        if not stripped.startswith("- "):
-            break
-        consumed = True
-        item_value = stripped[2:].strip()
-        index += 1
-        if item_value:
-            items.append(_parse_scalar(item_value))
-            continue
-        next_indent = current_indent + 2
-        seq, new_index = _parse_sequence(lines, index, next_indent)
-        if seq is not None:
-            items.append(seq)
-            index = new_index
-            continue
-        nested, new_index = _parse_block(lines, index, next_indent)
-        items.append(nested)
-        index = new_index
-
-    if not consumed:
-        return None, start
-    return items, index
-
-
-def _fallback_parse(text: str) -> Dict[str, Any]:
-    lines = text.splitlines()
-    mapping, _ = _parse_block(lines, 0, 0)
-    return mapping
-
-
-def read_note(path: Path) -> NoteRecord:
-    raw = path.read_text(encoding="utf-8")
-    frontmatter: Dict[str, Any] = {}
-    content = raw
+    note_hash: str
+    data: Optional[bytes]
+    body_offset: int
+    mtime_ns: int = 0
+
+    @property
+    def raw_bytes(self) -> bytes:
+        if self.data is None:
+            return self.path.read_bytes()
+        return self.data
+
+    @property
+    def raw_text(self) -> str:
+        return decode_text(self.raw_bytes)
+
+    @property
+    def content(self) -> str:
+        return decode_text(self.raw_bytes[self.body_offset :]).lstrip("\n")
+
+
+def read_note(
+    path: Path,
+    hash_algorithm: str = DEFAULT_ALGORITHM,
+    cache: Optional[ParseCache] = None,
+    rehash: bool = False,
+) -> NoteRecord:
+    """
+    Read a note's bytes once, hash them and decode only the frontmatter.
+
+    With a `cache`, an unchanged note whose cached hash was made with
+    `hash_algorithm` is not opened at all (its body is read lazily), and one
+    cached without a hash (e.g. by capture_query) skips the YAML parse.
+    `rehash` (full scans) reads and hashes every note regardless, so an edit
+    the stamp missed is found; the cached frontmatter is only reused when
+    the hash confirms it.
+    """
+    run_metrics = metrics.current()
+    cached = None
+    stamp = None
+    if cache is not None:
+        stat = os.stat(path)
+        stamp = FileStamp.of(stat)
+        cached = cache.get(str(path), stamp)
+        if (
+            cached is not None
+            and not rehash
+            and cached.note_hash
+            and algorithm_of(cached.note_hash) == hash_algorithm
+        ):
+            run_metrics.add("cache.hits")
+            return NoteRecord(
+                path=path,
+                frontmatter=cached.frontmatter,
+                note_hash=cached.note_hash,
+                data=None,
+                body_offset=cached.body_offset,
+                mtime_ns=stat.st_mtime_ns,
+            )
+    with path.open("rb") as handle:
+        stat = os.fstat(handle.fileno())
+        size = stat.st_size
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                with run_metrics.stage("read"):
+                    fm_bytes, body_offset = split_bytes(view)
+                with run_metrics.stage("hash"):
+                    note_hash = hash_bytes(view, hash_algorithm)
+            data: Optional[bytes] = None
+        else:
+            with run_metrics.stage("read"):
+                data = handle.read()
+                fm_bytes, body_offset = split_bytes(data)
+            with run_metrics.stage("hash"):
+                note_hash = hash_bytes(data, hash_algorithm)
+    run_metrics.add("bytes_read", size)
+
+    if cached is not None and stamp == FileStamp.of(stat) and not (rehash and cached.note_hash != note_hash):
+        frontmatter = cached.frontmatter
+    else:
+        frontmatter = {}
+        if fm_bytes is not None:
+            with run_metrics.stage("parse"):
+                frontmatter = load_mapping(fm_bytes.decode("utf-8"))
+    if cache is not None:
+        run_metrics.add("cache.misses")
+        cache.put(str(path), FileStamp.of(stat), frontmatter, body_offset, note_hash)
+
+    return NoteRecord(
+        path=path,
+        frontmatter=frontmatter,
+        note_hash=note_hash,
+        data=data,
+        body_offset=body_offset,
+        mtime_ns=stat.st_mtime_ns,
+    )
 
-    if raw.startswith("---"):
-        parts = raw.split("---", 2)
-        if len(parts) >= 3:
-            _, fm_text, body = parts
-            frontmatter = _yaml_load(fm_text)
-            content = body.lstrip("\n")
 
+def parse_note_bytes(
+    path: Path,
+    data: bytes,
+    hash_algorithm: str = DEFAULT_ALGORITHM,
+    mtime_ns: int = 0,
+) -> NoteRecord:
+    """Build a record from bytes already in memory (e.g. a packed archive note)."""
+    fm_bytes, body_offset = split_bytes(data)
+    frontmatter: Dict[str, Any] = {}
+    if fm_bytes is not None:
+        frontmatter = load_mapping(fm_bytes.decode("utf-8"))
     return NoteRecord(
         path=path,
         frontmatter=frontmatter,
-        content=content,
-        raw_text=raw,
+        note_hash=hash_bytes(data, hash_algorithm),
+        data=data,
+        body_offset=body_offset,
+        mtime_ns=mtime_ns,
     )
@@ -0,0 +1,61 @@
+"""Content digests for capture notes, tagged with the algorithm that made them."""
+
+from __future__ import annotations
+
+import hashlib
+from typing import Callable, Dict
+
+DEFAULT_ALGORITHM = "sha256"
+
+# sha256 digests are stored as bare hex for compatibility with databases
+# written before digests were tagged; other algorithms use "<name>:<hex>".
+_FACTORIES: Dict[str, Callable[[], "hashlib._Hash"]] = {
+    "sha256": hashlib.sha256,
+    "blake2b": lambda: hashlib.blake2b(digest_size=32),
+    "blake2s": hashlib.blake2s,
+}
+
+ALGORITHMS = tuple(_FACTORIES)
+
+
+def check_algorithm(name: str) -> str:
+    """Normalise and validate a configured algorithm name."""
+    normalised = name.strip().lower()
+    if normalised not in _FACTORIES:
+        raise ValueError(
+            f"Unsupported hash algorithm {name!r} (expected one of {', '.join(ALGORITHMS)}).",
+        )
+    return normalised
+
+
+def hash_bytes(data: bytes, algorithm: str = DEFAULT_ALGORITHM) -> str:
+    """
+    Digest note bytes (bytes or an mmap) into a tagged hex string.
+
+    CRLF and lone CR line endings are hashed as LF, matching the digests of
+    notes read as text with universal newlines before notes were hashed as
+    bytes, so notes saved with Windows line endings keep their checkpoints.
+    Only such notes pay for the translated copy.
+    """
+    digest = _FACTORIES[algorithm]()
+    if data.find(b"\r") != -1:
+        data = bytes(data).replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+    digest.update(data)
+    if algorithm == DEFAULT_ALGORITHM:
+        return digest.hexdigest()
+    return f"{algorithm}:{digest.hexdigest()}"
+
+
+def short_digest(data: bytes) -> str:
+    """
+    Compact untagged digest for change detection within one note (frontmatter
+    fields, body). Independent of the configured algorithm, so switching
+    algorithms does not look like an edit to every field.
+    """
+    return hashlib.blake2b(data, digest_size=12).hexdigest()
+
+
+def algorithm_of(note_hash: str) -> str:
+    """Return the algorithm that produced a stored digest."""
+    name, sep, _ = note_hash.partition(":")
+    return name if sep else DEFAULT_ALGORITHM
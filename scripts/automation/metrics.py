@@ -0,0 +1,164 @@
+"""Per-stage timings, counters and latency histograms for automation runs."""
+
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Upper bounds (milliseconds) of the latency histogram buckets; the final
+# bucket collects everything slower.
+LATENCY_BUCKETS_MS: Tuple[float, ...] = (
+    1,
+    2,
+    5,
+    10,
+    25,
+    50,
+    100,
+    250,
+    500,
+    1000,
+    2500,
+    5000,
+    10000,
+)
+
+
+class StageTiming:
+    """Accumulated wall/CPU time for a named stage."""
+
+    __slots__ = ("wall", "cpu", "calls")
+
+    def __init__(self) -> None:
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.calls = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "wall_ms": round(self.wall * 1000, 3),
+            "cpu_ms": round(self.cpu * 1000, 3),
+            "calls": self.calls,
+        }
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram."""
+
+    __slots__ = ("counts", "total", "maximum")
+
+    def __init__(self) -> None:
+        self.counts: List[int] = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        millis = seconds * 1000
+        for index, bound in enumerate(LATENCY_BUCKETS_MS):
+            if millis <= bound:
+                self.counts[index] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += millis
+        self.maximum = max(self.maximum, millis)
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [f"le_{bound:g}" for bound in LATENCY_BUCKETS_MS] + ["gt_max"]
+        count = self.count
+        return {
+            "count": count,
+            "mean_ms": round(self.total / count, 3) if count else 0.0,
+            "max_ms": round(self.maximum, 3),
+            "buckets": {label: value for label, value in zip(labels, self.counts) if value},
+        }
+
+
+class RunMetrics:
+    """Collects timings for one automation run."""
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self.started_at = time.time()
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        self.stages: Dict[str, StageTiming] = {}
+        self.counters: Dict[str, int] = {}
+        self.histograms: Dict[str, LatencyHistogram] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Accumulate wall and CPU time spent inside the block under `name`."""
+        if not self.enabled:
+            yield
+            return
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            timing = self.stages.get(name)
+            if timing is None:
+                timing = self.stages[name] = StageTiming()
+            timing.wall += time.perf_counter() - wall_start
+            timing.cpu += time.process_time() - cpu_start
+            timing.calls += 1
+
+    def add(self, counter: str, value: int = 1) -> None:
+        if self.enabled:
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def observe(self, histogram: str, seconds: float) -> None:
+        if not self.enabled:
+            return
+        hist = self.histograms.get(histogram)
+        if hist is None:
+            hist = self.histograms[histogram] = LatencyHistogram()
+        hist.observe(seconds)
+
+    @contextmanager
+    def timed(self, histogram: str) -> Iterator[None]:
+        """Record the block's wall time into `histogram`."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(histogram, time.perf_counter() - started)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "started_at": int(self.started_at),
+            "wall_ms": round((time.perf_counter() - self._wall_start) * 1000, 3),
+            "cpu_ms": round((time.process_time() - self._cpu_start) * 1000, 3),
+            "stages": {name: timing.to_dict() for name, timing in sorted(self.stages.items())},
+            "counters": dict(sorted(self.counters.items())),
+            "histograms": {
+                name: hist.to_dict() for name, hist in sorted(self.histograms.items())
+            },
+        }
+
+
+_DISABLED = RunMetrics(enabled=False)
+_active: RunMetrics = _DISABLED
+
+
+def current() -> RunMetrics:
+    """Return the metrics collector for the active run (a no-op outside runs)."""
+    return _active
+
+
+@contextmanager
+def use_metrics(metrics: Optional[RunMetrics]) -> Iterator[RunMetrics]:
+    """Make `metrics` the collector returned by `current()` inside the block."""
+    global _active
+    previous = _active
+    _active = metrics or _DISABLED
+    try:
+        yield _active
+    finally:
+        _active = previous
@@ -0,0 +1,364 @@
+"""
+Numbered schema migrations for the automation state database.
+
+`migrate` brings a database up to `LATEST_VERSION`, recorded as
+`schema_version` in the `metadata` table. Each migration runs in its own
+`BEGIN IMMEDIATE` transaction together with the version bump, so a crash or
+a concurrent worker never sees it half applied. Migrations only add tables,
+columns and indexes and never touch note hashes, so the first run after an
+upgrade is an ordinary warm scan rather than a rehash of the vault.
+
+A migration whose derived data can be computed from existing rows (tags and
+field digests from `notes.metadata_json`) leaves a backfill cursor in
+`metadata`. Backfills then run in batches of `BACKFILL_BATCH` notes, one
+transaction each, so other workers sharing the database only ever wait for
+one batch; a backfill cut short resumes from its cursor the next time the
+store is opened.
+
+Databases created before versioning have no `schema_version`; every step is
+written to be harmless on a database that already has its objects, so they
+replay all migrations.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from .notes import frontmatter_digests, normalise_values
+
+LOG = logging.getLogger(__name__)
+
+SCHEMA_VERSION_KEY = "schema_version"
+# Metadata key holding the last note path a migration's backfill processed.
+BACKFILL_KEY = "schema.backfill.{version}"
+# Notes per backfill transaction.
+BACKFILL_BATCH = 500
+
+# Holds the schema version itself, so it exists before any migration runs.
+METADATA_TABLE = """
+CREATE TABLE IF NOT EXISTS metadata (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+)
+"""
+
+
+def _tag_set(frontmatter: Dict[str, object]) -> Set[str]:
+    tags = frontmatter.get("tags")
+    if tags is None:
+        return set()
+    values = tags if isinstance(tags, list) else [tags]
+    return set(normalise_values(tuple(str(value) for value in values)))
+
+
+def _next_batch(conn: sqlite3.Connection, where: str, after: str) -> list:
+    return conn.execute(
+        f"SELECT path, metadata_json FROM notes WHERE path > ? AND {where} ORDER BY path LIMIT ?",
+        (after, BACKFILL_BATCH),
+    ).fetchall()
+
+
+def _backfill_note_tags(conn: sqlite3.Connection, after: str) -> Optional[str]:
+    """Derive `note_tags` from stored frontmatter."""
+    rows = _next_batch(conn, "1", after)
+    conn.executemany(
+        "INSERT OR IGNORE INTO note_tags(tag, path) VALUES (?, ?)",
+        (
+            (tag, path)
+            for path, metadata_json in rows
+            for tag in _tag_set(json.loads(metadata_json or "{}"))
+        ),
+    )
+    return rows[-1][0] if rows else None
+
+
+def _backfill_field_digests(conn: sqlite3.Connection, after: str) -> Optional[str]:
+    """
+    Derive `notes.field_digests` from stored frontmatter. The body digest
+    needs the file and is left for the next edit; until then watch lists
+    that include the body treat the note as changed. Emissions recorded at
+    the note's current hash get the same digests, since they describe the
+    same content.
+    """
+    rows = _next_batch(conn, "field_digests IS NULL", after)
+    conn.executemany(
+        "UPDATE notes SET field_digests = ? WHERE path = ?",
+        ((frontmatter_digests(json.loads(metadata_json or "{}")), path) for path, metadata_json in rows),
+    )
+    if not rows:
+        return None
+    conn.execute(
+        """
+        UPDATE emissions
+        SET field_digests = (SELECT n.field_digests FROM notes AS n WHERE n.path = emissions.note_path)
+        WHERE field_digests IS NULL
+            AND note_path > ? AND note_path <= ?
+            AND EXISTS (
+                SELECT 1 FROM notes AS n
+                WHERE n.path = emissions.note_path AND n.note_hash = emissions.note_hash
+            )
+        """,
+        (after, rows[-1][0]),
+    )
+    return rows[-1][0]
+
+
+@dataclass(slots=True, frozen=True)
+class Migration:
+    """
+    One schema step.
+
+    Attributes:
+        version: Schema version after this step; versions are consecutive.
+        description: Logged when the step is applied.
+        statements: DDL, each `IF NOT EXISTS`.
+        columns: `(table, column, declaration)` added when missing.
+        backfill: Called with the last path processed ("" at first) inside a
+            transaction; fills one batch and returns the last path it
+            processed, or None when nothing is left.
+    """
+
+    version: int
+    description: str
+    statements: Tuple[str, ...] = ()
+    columns: Tuple[Tuple[str, str, str], ...] = ()
+    backfill: Optional[Callable[[sqlite3.Connection, str], Optional[str]]] = None
+
+
+MIGRATIONS: Tuple[Migration, ...] = (
+    Migration(
+        1,
+        "notes and emission checkpoints",
+        statements=(
+            """
+            CREATE TABLE IF NOT EXISTS notes (
+                path TEXT PRIMARY KEY,
+                note_hash TEXT NOT NULL,
+                metadata_json TEXT,
+                seen_at INTEGER NOT NULL
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS emissions (
+                consumer TEXT NOT NULL,
+                note_path TEXT NOT NULL,
+                note_hash TEXT NOT NULL,
+                emitted_at INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'success',
+                metadata_json TEXT,
+                PRIMARY KEY (consumer, note_path)
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_emissions_consumer_hash ON emissions (consumer, note_hash)",
+        ),
+    ),
+    Migration(
+        2,
+        "run metrics",
+        statements=(
+            """
+            CREATE TABLE IF NOT EXISTS run_metrics (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                started_at INTEGER NOT NULL,
+                metrics_json TEXT NOT NULL
+            )
+            """,
+        ),
+    ),
+    Migration(
+        3,
+        "hot/cold tiering",
+        statements=(
+            """
+            CREATE TABLE IF NOT EXISTS cold_dirs (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL
+            )
+            """,
+        ),
+        columns=(
+            ("notes", "mtime_ns", "INTEGER NOT NULL DEFAULT 0"),
+            ("notes", "cold", "INTEGER NOT NULL DEFAULT 0"),
+        ),
+    ),
+    Migration(
+        4,
+        "archived notes",
+        columns=(("notes", "packed", "INTEGER NOT NULL DEFAULT 0"),),
+    ),
+    Migration(
+        5,
+        "tag index for selectors",
+        statements=(
+            """
+            CREATE TABLE IF NOT EXISTS note_tags (
+                tag TEXT NOT NULL,
+                path TEXT NOT NULL,
+                PRIMARY KEY (tag, path)
+            ) WITHOUT ROWID
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_note_tags_path ON note_tags (path)",
+        ),
+        backfill=_backfill_note_tags,
+    ),
+    Migration(
+        6,
+        "field and body digests for watch lists",
+        columns=(
+            ("notes", "field_digests", "TEXT"),
+            ("notes", "body_digest", "TEXT"),
+            ("emissions", "field_digests", "TEXT"),
+            ("emissions", "body_digest", "TEXT"),
+        ),
+        backfill=_backfill_field_digests,
+    ),
+    Migration(
+        7,
+        "retry queue",
+        statements=(
+            """
+            CREATE TABLE IF NOT EXISTS retries (
+                consumer TEXT NOT NULL,
+                note_path TEXT NOT NULL,
+                note_hash TEXT NOT NULL,
+                attempts INTEGER NOT NULL,
+                last_error TEXT NOT NULL,
+                failed_at INTEGER NOT NULL,
+                next_attempt_at INTEGER NOT NULL,
+                dead INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (consumer, note_path)
+            )
+            """,
+        ),
+    ),
+    Migration(
+        8,
+        "dispatch leases for sharded runs",
+        statements=(
+            """
+            CREATE TABLE IF NOT EXISTS leases (
+                consumer TEXT NOT NULL,
+                note_path TEXT NOT NULL,
+                owner TEXT NOT NULL,
+                expires_at INTEGER NOT NULL,
+                PRIMARY KEY (consumer, note_path)
+            )
+            """,
+        ),
+    ),
+    Migration(
+        9,
+        "change journal",
+        statements=(
+            """
+            CREATE TABLE IF NOT EXISTS changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                path TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                note_hash TEXT,
+                changed_at INTEGER NOT NULL
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_changes_changed_at ON changes (changed_at)",
+        ),
+    ),
+    Migration(
+        10,
+        "emissions by note path",
+        statements=("CREATE INDEX IF NOT EXISTS idx_emissions_note_path ON emissions (note_path)",),
+    ),
+)
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def _get(conn: sqlite3.Connection, key: str) -> Optional[str]:
+    row = conn.execute("SELECT value FROM metadata WHERE key = ?", (key,)).fetchone()
+    return None if row is None else str(row[0])
+
+
+def _put(conn: sqlite3.Connection, key: str, value: str) -> None:
+    conn.execute(
+        """
+        INSERT INTO metadata(key, value) VALUES (?, ?)
+        ON CONFLICT(key) DO UPDATE SET value = excluded.value
+        """,
+        (key, value),
+    )
+
+
+def _ensure_column(conn: sqlite3.Connection, table: str, column: str, declaration: str) -> None:
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if column not in columns:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return int(_get(conn, SCHEMA_VERSION_KEY) or 0)
+
+
+def _apply(conn: sqlite3.Connection, migration: Migration) -> bool:
+    """Apply one migration unless another process got there first; True when applied."""
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        if schema_version(conn) >= migration.version:
+            return False
+        for statement in migration.statements:
+            conn.execute(statement)
+        for table, column, declaration in migration.columns:
+            _ensure_column(conn, table, column, declaration)
+        if migration.backfill is not None and conn.execute("SELECT 1 FROM notes LIMIT 1").fetchone():
+            _put(conn, BACKFILL_KEY.format(version=migration.version), "")
+        _put(conn, SCHEMA_VERSION_KEY, str(migration.version))
+    return True
+
+
+def _run_backfill(conn: sqlite3.Connection, migration: Migration) -> int:
+    """Run a pending backfill to completion, one batch per transaction. Returns batches run."""
+    key = BACKFILL_KEY.format(version=migration.version)
+    batches = 0
+    while True:
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            after = _get(conn, key)
+            if after is None:
+                return batches
+            last = migration.backfill(conn, after)
+            if last is None:
+                conn.execute("DELETE FROM metadata WHERE key = ?", (key,))
+            else:
+                _put(conn, key, last)
+        batches += 1
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    Apply pending migrations and finish pending backfills. Returns the
+    schema version. A database from newer code is left as it is.
+    """
+    conn.execute(METADATA_TABLE)
+    conn.commit()
+    current = schema_version(conn)
+    if current > LATEST_VERSION:
+        LOG.warning(
+            "State database schema version %d is newer than this code (%d); not migrating",
+            current,
+            LATEST_VERSION,
+        )
+        return current
+    for migration in MIGRATIONS:
+        if migration.version > current and _apply(conn, migration):
+            LOG.debug("Applied schema migration %d (%s)", migration.version, migration.description)
+    latest = schema_version(conn)
+    if latest != current:
+        LOG.info("Migrated state database from schema version %d to %d", current, latest)
+    for migration in MIGRATIONS:
+        if migration.backfill is not None and _get(conn, BACKFILL_KEY.format(version=migration.version)) is not None:
+            batches = _run_backfill(conn, migration)
+            if batches:
+                LOG.info("Backfilled %s in %d batches", migration.description, batches)
+    return latest
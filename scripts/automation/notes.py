@@ -2,67 +2,174 @@
 
 from __future__ import annotations
 
-import hashlib
+import json
+import os
 import re
-from dataclasses import dataclass
+import sys
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, Iterator, Tuple
+from typing import Callable, Container, Dict, FrozenSet, Iterator, Optional, Sequence, Tuple
 
-from .frontmatter import NoteRecord, read_note
+from scripts.vault.index import ParseCache
+from scripts.vault.walk import DEFAULT_IGNORES, walk_markdown
+
+from . import metrics
+from .frontmatter import NoteRecord, decode_text, read_note
+from .hashing import DEFAULT_ALGORITHM, short_digest
 
 LEGACY_DAILY_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}\.md")
 
+# Name consumers use in `watch` for the note body; every other name is a
+# top-level frontmatter field.
+BODY_FIELD = "body"
+
+
+def _as_strings(value: object) -> Tuple[str, ...]:
+    if value is None:
+        return ()
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(str(entry) for entry in value)
+    return (str(value),)
 
-def _compute_hash(raw_text: str) -> str:
-    digest = hashlib.sha256()
-    digest.update(raw_text.encode("utf-8"))
-    return digest.hexdigest()
+
+def normalise_values(values: Tuple[str, ...]) -> FrozenSet[str]:
+    """
+    Lowercase, strip and intern list-valued frontmatter entries.
+
+    Interning makes the handful of distinct tags shared across every payload
+    instead of being duplicated per note.
+    """
+    return frozenset(sys.intern(entry.strip().lower()) for entry in values if entry.strip())
 
 
 @dataclass(slots=True)
 class NotePayload:
-    """Normalized representation of a capture note."""
+    """
+    Normalized representation of a capture note.
+
+    `tags`, `tag_set`, `context` and `modalities` are derived from the
+    frontmatter once, at construction.
+    """
 
     path: Path
     frontmatter: Dict[str, object]
-    content: str
-    raw_text: str
     note_hash: str
+    data: Optional[bytes]
+    body_offset: int
+    mtime_ns: int = 0
+    tags: Tuple[str, ...] = field(init=False)
+    tag_set: FrozenSet[str] = field(init=False)
+    context: FrozenSet[str] = field(init=False)
+    modalities: FrozenSet[str] = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.tags = _as_strings(self.frontmatter.get("tags"))
+        self.tag_set = normalise_values(self.tags)
+        self.context = normalise_values(_as_strings(self.frontmatter.get("context")))
+        self.modalities = normalise_values(_as_strings(self.frontmatter.get("modalities")))
+
+    @property
+    def raw_bytes(self) -> bytes:
+        """Raw file bytes; re-read from disk for notes hashed through mmap."""
+        if self.data is None:
+            return self.path.read_bytes()
+        return self.data
 
     @property
-    def tags(self) -> Tuple[str, ...]:
-        tags = self.frontmatter.get("tags")
-        if tags is None:
-            return ()
-        if isinstance(tags, (list, tuple, set)):
-            return tuple(str(tag) for tag in tags)
-        return (str(tags),)
+    def raw_text(self) -> str:
+        return decode_text(self.raw_bytes)
+
+    @property
+    def content(self) -> str:
+        return decode_text(self.raw_bytes[self.body_offset :]).lstrip("\n")
 
     def has_tag(self, tag: str) -> bool:
-        tag_lower = tag.lower()
-        return any(entry.lower() == tag_lower for entry in self.tags)
+        return tag.strip().lower() in self.tag_set
+
+
+def _canonical(value: object) -> bytes:
+    # Strings are by far the most common field values; skip json.dumps for
+    # them (the leading quote keeps them distinct from other JSON values).
+    if isinstance(value, str):
+        return b'"' + value.encode("utf-8", "surrogatepass")
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8", "surrogatepass")
+
+
+def frontmatter_digests(frontmatter: Dict[str, object]) -> str:
+    """
+    JSON object mapping each top-level frontmatter field to a digest of its
+    canonical JSON form. Frontmatter read back from `metadata_json` gives the
+    same digests as the parsed note.
+    """
+    digests = {str(key): short_digest(_canonical(value)) for key, value in frontmatter.items()}
+    return json.dumps(digests, sort_keys=True, separators=(",", ":"))
+
+
+def field_digests(note: NotePayload) -> Tuple[str, str]:
+    """Return `(frontmatter_digests(...), body_digest)` for a note."""
+    return frontmatter_digests(note.frontmatter), short_digest(note.raw_bytes[note.body_offset :])
 
 
 def to_payload(note: NoteRecord) -> NotePayload:
-    note_hash = _compute_hash(note.raw_text)
     return NotePayload(
         path=note.path,
         frontmatter=note.frontmatter,
-        content=note.content,
-        raw_text=note.raw_text,
-        note_hash=note_hash,
+        note_hash=note.note_hash,
+        data=note.data,
+        body_offset=note.body_offset,
+        mtime_ns=note.mtime_ns,
     )
 
 
-def iter_note_payloads(root: Path, capture_dir: Path) -> Iterator[NotePayload]:
-    """Yield `NotePayload` objects for every Markdown file under capture_dir."""
+def load_payload(
+    path: Path,
+    hash_algorithm: str = DEFAULT_ALGORITHM,
+    cache: Optional[ParseCache] = None,
+) -> NotePayload:
+    """Read and hash a single note."""
+    return to_payload(read_note(path, hash_algorithm, cache))
+
+
+def iter_note_payloads(
+    root: Path,
+    capture_dir: Path,
+    hash_algorithm: str = DEFAULT_ALGORITHM,
+    ignore: Sequence[str] = DEFAULT_IGNORES,
+    sort: bool = False,
+    skip: Container[str] = (),
+    prune: Optional[Callable[[os.DirEntry], bool]] = None,
+    cache: Optional[ParseCache] = None,
+    owns: Optional[Callable[[str], bool]] = None,
+    rehash: bool = False,
+) -> Iterator[NotePayload]:
+    """
+    Yield `NotePayload` objects for every Markdown file under capture_dir.
+
+    Files stream in filesystem order unless `sort` is set; subtrees matching
+    `ignore` globs are never entered. Paths in `skip` are neither read nor
+    stat-ed, and directories for which `prune` returns True are not walked
+    (used for cold notes on hot-tier runs). Unchanged notes found in
+    `cache` are neither read nor hashed again. With `owns`, only paths it
+    accepts are read (used by sharded runs). `rehash` ignores cached
+    hashes and hashes every note read (used by full scans).
+    """
     capture_dir = capture_dir if capture_dir.is_absolute() else (root / capture_dir)
     if not capture_dir.exists():
         raise FileNotFoundError(f"Capture directory not found: {capture_dir}")
-    for path in sorted(capture_dir.rglob("*.md")):
-        if not path.is_file():
-            continue
+    run_metrics = metrics.current()
+    paths = walk_markdown(capture_dir, ignore, sort, prune=prune)
+    while True:
+        with run_metrics.stage("walk"):
+            path = next(paths, None)
+        if path is None:
+            break
         if LEGACY_DAILY_PATTERN.fullmatch(path.name):
             continue
-        raw = read_note(path)
+        if str(path) in skip:
+            run_metrics.add("tiering.cold_skipped")
+            continue
+        if owns is not None and not owns(str(path)):
+            continue
+        raw = read_note(path, hash_algorithm, cache, rehash)
+        run_metrics.add("notes_scanned")
         yield to_payload(raw)
@@ -0,0 +1,141 @@
+"""Advisory run lock that coalesces overlapping CLI invocations."""
+
+from __future__ import annotations
+
+import logging
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms run unlocked
+    fcntl = None  # type: ignore[assignment]
+
+LOG = logging.getLogger(__name__)
+
+LOCK_NAME = "run{suffix}.lock"
+RERUN_FLAG_NAME = "rerun{suffix}.requested"
+# Held shared by shard passes and exclusively by whole-vault passes.
+DISPATCH_LOCK_NAME = "dispatch.lock"
+
+
+class RunLock:
+    """
+    Non-blocking `flock` on `<state_dir>/run.lock` plus a "rerun requested"
+    flag file next to it. The lock is released when the holder exits, even
+    if it crashes, so a stale lock never blocks later runs. `suffix` gives
+    independent runs (e.g. one per shard) their own lock.
+    """
+
+    def __init__(self, state_dir: Path, suffix: str = "") -> None:
+        self.lock_path = state_dir / LOCK_NAME.format(suffix=suffix)
+        self.flag_path = state_dir / RERUN_FLAG_NAME.format(suffix=suffix)
+        self._fd: Optional[int] = None
+
+    def acquire(self) -> bool:
+        """Take the lock without waiting; False when another run holds it."""
+        if fcntl is None:
+            return True
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode("ascii"))
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
+    def request_rerun(self) -> None:
+        with open(self.flag_path, "a", encoding="ascii"):
+            pass
+
+    def rerun_requested(self) -> bool:
+        return self.flag_path.exists()
+
+    def take_rerun_request(self) -> bool:
+        """Clear the flag; True when it was set."""
+        try:
+            self.flag_path.unlink()
+        except FileNotFoundError:
+            return False
+        return True
+
+
+@contextmanager
+def dispatch_lock(state_dir: Path, shared: bool = False) -> Iterator[None]:
+    """
+    Blocking `flock` on `<state_dir>/dispatch.lock` around one pass.
+
+    Shard passes (`shared=True`) run side by side; a whole-vault pass waits
+    for them to finish and they wait for it, so the two never dispatch at
+    the same time. Callers hold their own run lock while waiting, so the
+    triggers that arrive meanwhile still coalesce into one rerun.
+    """
+    if fcntl is None:
+        yield
+        return
+    fd = os.open(state_dir / DISPATCH_LOCK_NAME, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        mode = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        try:
+            fcntl.flock(fd, mode | fcntl.LOCK_NB)
+        except BlockingIOError:
+            LOG.info("Waiting for %s to finish", "a whole-vault run or archive" if shared else "other runs")
+            fcntl.flock(fd, mode)
+        yield
+    finally:
+        os.close(fd)
+
+
+def run_coalesced(
+    state_dir: Path,
+    run_pass: Callable[[bool], int],
+    suffix: str = "",
+    shared: bool = False,
+) -> int:
+    """
+    Call `run_pass(rerun)` under the run lock, coalescing concurrent triggers.
+
+    When another run holds the lock, a rerun is requested and this call
+    returns 0 straight away. The holder does one more pass (`rerun=True`)
+    for all requests that arrived during its pass, so a burst of N triggers
+    costs at most two passes. The flag is re-checked after the lock is
+    released, so a request racing with the end of a run is never lost:
+    either the old holder takes the lock back or the requester gets it.
+
+    Each pass also holds `dispatch_lock(state_dir, shared)`; shard runs
+    (a `suffix` per shard) pass `shared=True`.
+
+    Returns the highest status of any pass run.
+    """
+    lock = RunLock(state_dir, suffix)
+    if not lock.acquire():
+        lock.request_rerun()
+        if not lock.acquire():
+            LOG.info("Another run is in progress; requested a rerun from it")
+            return 0
+    status = 0
+    rerun = False
+    while True:
+        # Requests made before this pass started are served by it.
+        lock.take_rerun_request()
+        try:
+            with dispatch_lock(state_dir, shared):
+                status = max(status, run_pass(rerun))
+        finally:
+            lock.release()
+        if not lock.rerun_requested() or not lock.acquire():
+            return status
+        LOG.info("Triggers arrived during the run; running one more pass")
+        rerun = True
@@ -0,0 +1,140 @@
+"""Declarative note selectors that consumers push down into the store query."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, List, Mapping, Optional, Sequence, Tuple
+
+
+def _normalise_tag(value: Any) -> str:
+    # Same normalisation as NotePayload.tag_set and the note_tags table.
+    return str(value).strip().lower()
+
+
+def _field_text(value: Any) -> str:
+    """Text form used to compare frontmatter values with selector values."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def _flatten(prefix: str, data: Mapping[str, Any], out: List[Tuple[str, Tuple[str, ...]]]) -> None:
+    for key, value in data.items():
+        path = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, Mapping):
+            _flatten(path, value, out)
+        elif isinstance(value, (list, tuple)):
+            out.append((path, tuple(_field_text(item) for item in value)))
+        else:
+            out.append((path, (_field_text(value),)))
+
+
+def _glob_escape(text: str) -> str:
+    return "".join(f"[{char}]" if char in "*?[" else char for char in text)
+
+
+def json_path(field: str) -> str:
+    """JSON path for a dotted field name, quoting each segment for `json_extract`."""
+    segments = (segment.replace("\\", "\\\\").replace('"', '\\"') for segment in field.split("."))
+    return "$" + "".join(f'."{segment}"' for segment in segments)
+
+
+@dataclass(slots=True, frozen=True)
+class Selector:
+    """
+    Notes a consumer can ever be interested in, evaluated by `AutomationStore`
+    before any note is read.
+
+    Attributes:
+        tags: Tags a note must all carry (normalised like `NotePayload.tag_set`).
+        fields: `(dotted.field, values)` pairs; the frontmatter value, or one
+            element of a list value, must equal one of `values` as text
+            (booleans compare as `true`/`false`).
+        paths: Absolute SQLite GLOB patterns; a note must match at least one.
+    """
+
+    tags: Tuple[str, ...] = ()
+    fields: Tuple[Tuple[str, Tuple[str, ...]], ...] = ()
+    paths: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_options(cls, data: Optional[Mapping[str, Any]], capture_dir: Path) -> "Selector":
+        """
+        Build a selector from a consumer's `select` table:
+
+            [consumers.<name>.select]
+            tags = ["todo"]
+            paths = ["inbox/*"]              # globs relative to the capture dir
+            fields = { processing_status = "raw", metadata = { source = ["phone", "watch"] } }
+        """
+        if not data:
+            return cls()
+        if not isinstance(data, Mapping):
+            raise ValueError("Consumer 'select' must be a table.")
+        unknown = set(data) - {"tags", "fields", "paths"}
+        if unknown:
+            raise ValueError(f"Unknown selector keys: {', '.join(sorted(unknown))}.")
+        tags = data.get("tags", [])
+        paths = data.get("paths", [])
+        fields = data.get("fields", {})
+        if isinstance(tags, str):
+            tags = [tags]
+        if isinstance(paths, str):
+            paths = [paths]
+        if not isinstance(tags, list) or not isinstance(paths, list) or not isinstance(fields, Mapping):
+            raise ValueError("Selector 'tags' and 'paths' must be lists and 'fields' a table.")
+        flattened: List[Tuple[str, Tuple[str, ...]]] = []
+        _flatten("", fields, flattened)
+        prefix = _glob_escape(str(capture_dir).rstrip("/")) + "/"
+        return cls(
+            tags=tuple(sorted({_normalise_tag(tag) for tag in tags if _normalise_tag(tag)})),
+            fields=tuple(flattened),
+            paths=tuple(prefix + str(pattern).lstrip("/") for pattern in paths),
+        )
+
+    def with_tags(self, *tags: str) -> "Selector":
+        merged = set(self.tags) | {_normalise_tag(tag) for tag in tags if _normalise_tag(tag)}
+        return Selector(tags=tuple(sorted(merged)), fields=self.fields, paths=self.paths)
+
+    def __bool__(self) -> bool:
+        return bool(self.tags or self.fields or self.paths)
+
+    def to_sql(self, alias: str = "n") -> Tuple[str, List[Any]]:
+        """
+        Return a WHERE fragment over the `notes` table aliased as `alias`,
+        with its parameters. Tags use the `note_tags` index; fields are read
+        from `metadata_json` with `json_each`.
+        """
+        clauses: List[str] = []
+        params: List[Any] = []
+        for tag in self.tags:
+            clauses.append(f"EXISTS (SELECT 1 FROM note_tags AS t WHERE t.tag = ? AND t.path = {alias}.path)")
+            params.append(tag)
+        for field, values in self.fields:
+            placeholders = ", ".join("?" for _ in values)
+            clauses.append(
+                f"""EXISTS (
+                    SELECT 1 FROM json_each({alias}.metadata_json, ?) AS f
+                    WHERE CASE f.type
+                        WHEN 'true' THEN 'true'
+                        WHEN 'false' THEN 'false'
+                        ELSE CAST(f.value AS TEXT)
+                    END IN ({placeholders})
+                )"""
+            )
+            params.append(json_path(field))
+            params.extend(values)
+        if self.paths:
+            clauses.append("(" + " OR ".join(f"{alias}.path GLOB ?" for _ in self.paths) + ")")
+            params.extend(self.paths)
+        return " AND ".join(clauses) or "1", params
+
+
+def describe(selector: Selector, capture_dir: Path) -> Sequence[str]:
+    """Human-readable selector terms, for logs."""
+    prefix = _glob_escape(str(capture_dir).rstrip("/")) + "/"
+    terms = [f"tag:{tag}" for tag in selector.tags]
+    terms.extend(f"{field}={'|'.join(values)}" for field, values in selector.fields)
+    terms.extend(f"path:{pattern[len(prefix):] if pattern.startswith(prefix) else pattern}" for pattern in selector.paths)
+    return terms
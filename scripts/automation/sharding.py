@@ -0,0 +1,168 @@
+"""Split an automation run across processes or hosts with `--shard i/N`."""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from .store import AutomationStore
+
+LOG = logging.getLogger(__name__)
+
+# Metadata key holding the last summary written by shard i of N.
+SUMMARY_KEY = "shard.{index}/{count}.summary"
+# Seconds a claimed note stays reserved after its worker last renewed it;
+# `LeaseKeeper` renews every third of that while the note is being handled,
+# so only a worker that died (or hung without its renewal thread) loses it.
+LEASE_SECONDS = 900
+
+
+def shard_of(relative_path: str, count: int) -> int:
+    """Stable 1-based shard for a vault-relative POSIX path."""
+    return zlib.crc32(relative_path.encode("utf-8")) % count + 1
+
+
+@dataclass(slots=True, frozen=True)
+class Shard:
+    """
+    One of `count` partitions of the vault, by a CRC-32 of each note's
+    vault-relative path, so every worker computes the same assignment.
+    """
+
+    index: int
+    count: int
+    vault_root: str
+
+    @classmethod
+    def parse(cls, text: str, vault_root: Path) -> "Shard":
+        """Parse `i/N` (1 <= i <= N)."""
+        index_text, sep, count_text = text.partition("/")
+        try:
+            index, count = int(index_text), int(count_text)
+        except ValueError:
+            index = count = 0
+        if not sep or count < 1 or not 1 <= index <= count:
+            raise ValueError(f"Invalid shard {text!r}; expected i/N with 1 <= i <= N.")
+        return cls(index, count, str(vault_root).rstrip("/"))
+
+    @property
+    def label(self) -> str:
+        return f"{self.index}/{self.count}"
+
+    def owns(self, path: Union[str, Path]) -> bool:
+        text = str(path)
+        prefix = self.vault_root + "/"
+        relative = text[len(prefix) :] if text.startswith(prefix) else os.path.relpath(text, self.vault_root)
+        return shard_of(relative.replace(os.sep, "/"), self.count) == self.index
+
+
+def lease_owner() -> str:
+    """Identifies this worker in lease rows."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class LeaseKeeper:
+    """
+    Renews the lease on the note a consumer is handling, from a daemon thread
+    with its own store connection, so a handle that outlives `ttl` is not
+    claimed and dispatched again by another worker. The thread and its
+    connection start with the first `holding` call.
+    """
+
+    def __init__(self, database_path: Path, owner: str, ttl: int = LEASE_SECONDS) -> None:
+        self.database_path = database_path
+        self.owner = owner
+        self.ttl = ttl
+        self._held: Optional[Tuple[str, Path]] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @contextlib.contextmanager
+    def holding(self, consumer: str, note_path: Path) -> Iterator[None]:
+        """Keep renewing `consumer`'s lease on `note_path` until the block exits."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._renew_loop, name="lease-keeper", daemon=True)
+            self._thread.start()
+        with self._lock:
+            self._held = (consumer, note_path)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._held = None
+
+    def _renew_loop(self) -> None:
+        store: Optional[AutomationStore] = None
+        try:
+            while not self._stop.wait(self.ttl / 3):
+                with self._lock:
+                    held = self._held
+                if held is None:
+                    continue
+                try:
+                    if store is None:
+                        store = AutomationStore(self.database_path)
+                    store.renew(held[0], held[1], self.owner, self.ttl)
+                except sqlite3.Error as exc:
+                    LOG.warning("Could not renew the lease on %s: %s", held[1], exc)
+        finally:
+            if store is not None:
+                store.close()
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def record_summary(
+    store: AutomationStore,
+    shard: Shard,
+    summary: Dict[str, Dict[str, int]],
+    status: int,
+    finished_at: float,
+) -> None:
+    store.set_metadata(
+        SUMMARY_KEY.format(index=shard.index, count=shard.count),
+        json.dumps({"finished_at": finished_at, "status": status, "summary": summary}, sort_keys=True),
+    )
+
+
+def merge_summaries(
+    store: AutomationStore,
+    count: int,
+    since: Optional[float] = None,
+) -> Tuple[Dict[str, Dict[str, int]], int, List[int]]:
+    """
+    Combine the summaries recorded by shards 1..count.
+
+    Returns:
+        Per-consumer counts summed over shards, the highest shard status, and
+        the shards with no summary (or none finished at or after `since`).
+    """
+    combined: Dict[str, Dict[str, int]] = {}
+    status = 0
+    missing: List[int] = []
+    for index in range(1, count + 1):
+        raw = store.get_metadata(SUMMARY_KEY.format(index=index, count=count))
+        record = json.loads(raw) if raw else None
+        if record is None or (since is not None and record["finished_at"] < since):
+            missing.append(index)
+            continue
+        status = max(status, int(record["status"]))
+        for consumer, counts in record["summary"].items():
+            totals = combined.setdefault(consumer, {})
+            for key, value in counts.items():
+                totals[key] = totals.get(key, 0) + value
+    return combined, status, missing
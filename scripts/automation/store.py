@@ -7,53 +7,105 @@ import sqlite3
 import time
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Iterable, Iterator, Optional, Sequence, Tuple
-
-from .notes import NotePayload
-
-
-SCHEMA = """
-PRAGMA journal_mode = WAL;
-PRAGMA foreign_keys = ON;
-
-CREATE TABLE IF NOT EXISTS notes (
-    path TEXT PRIMARY KEY,
-    note_hash TEXT NOT NULL,
-    metadata_json TEXT,
-    seen_at INTEGER NOT NULL
-);
-
-CREATE TABLE IF NOT EXISTS emissions (
-    consumer TEXT NOT NULL,
-    note_path TEXT NOT NULL,
-    note_hash TEXT NOT NULL,
-    emitted_at INTEGER NOT NULL,
-    status TEXT NOT NULL DEFAULT 'success',
-    metadata_json TEXT,
-    PRIMARY KEY (consumer, note_path)
-);
-
-CREATE INDEX IF NOT EXISTS idx_emissions_consumer_hash
-    ON emissions (consumer, note_hash);
+from typing import Callable, Dict, Iterable, Iterator, NamedTuple, Optional, Sequence, Set, Tuple
+
+from .config import RetryConfig
+from .hashing import algorithm_of
+from .migrations import migrate
+from .notes import BODY_FIELD, NotePayload, field_digests
+from .selectors import Selector, json_path
+
+
+# How long a connection waits for other processes' writes (sharded runs).
+BUSY_TIMEOUT_SECONDS = 30.0
+# Kinds of entries in the `changes` journal.
+CREATED = "created"
+MODIFIED = "modified"
+DELETED = "deleted"
+# Highest sequence number removed by `compact_changes`.
+COMPACTED_THROUGH_KEY = "changes.compacted_through"
+
+# Scratch tables for `purge_missing`, private to the connection.
+PURGE_TABLES = """
+CREATE TEMP TABLE IF NOT EXISTS purge_seen (path TEXT PRIMARY KEY) WITHOUT ROWID;
+CREATE TEMP TABLE IF NOT EXISTS purge_missing (path TEXT PRIMARY KEY, note_hash TEXT NOT NULL) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS temp.idx_purge_missing_hash ON purge_missing (note_hash);
+CREATE TEMP TABLE IF NOT EXISTS purge_renames (old_path TEXT PRIMARY KEY, new_path TEXT NOT NULL) WITHOUT ROWID;
+"""
+PURGE_CLEANUP = """
+DELETE FROM temp.purge_seen;
+DELETE FROM temp.purge_missing;
+DELETE FROM temp.purge_renames;
 """
 
+# ORDER BY clauses for `iter_pending`, keyed by `ConsumerConfig.priority`.
+PENDING_ORDER = {
+    "newest": "n.mtime_ns DESC, n.path",
+    "oldest": "n.mtime_ns, n.path",
+    "path": "n.path",
+}
+
+# Emission status recording that a consumer's `matches()` rejected a note at
+# that hash; such notes leave the pending set until their content changes.
+NOT_APPLICABLE = "not_applicable"
 
 def _now() -> int:
     return int(time.time())
 
 
+class RetryState(NamedTuple):
+    """A consumer's failure record for one note."""
+
+    path: str
+    consumer: str
+    note_hash: str
+    attempts: int
+    last_error: str
+    failed_at: int
+    next_attempt_at: int
+    dead: bool
+
+
+class Change(NamedTuple):
+    """One entry of the `changes` journal."""
+
+    seq: int
+    path: str
+    kind: str
+    note_hash: Optional[str]
+    changed_at: int
+
+
 class AutomationStore:
     """Persistence layer for note hashes and consumer emission checkpoints."""
 
     def __init__(self, database_path: Path) -> None:
         self._path = database_path
-        self._conn = sqlite3.connect(str(database_path))
+        # Sharded runs write from several processes; wait out their commits.
+        self._conn = sqlite3.connect(str(database_path), timeout=BUSY_TIMEOUT_SECONDS)
         self._conn.row_factory = sqlite3.Row
         self._initialise()
 
     def _initialise(self) -> None:
-        with self._conn:
-            self._conn.executescript(SCHEMA)
+        self._enable_wal()
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        migrate(self._conn)
+
+    def _enable_wal(self) -> None:
+        """
+        Switch the database to WAL. On a new database the switch needs an
+        exclusive lock that SQLite does not wait for through the busy
+        timeout, so shard workers creating the database together retry.
+        """
+        deadline = time.monotonic() + BUSY_TIMEOUT_SECONDS
+        while True:
+            try:
+                self._conn.execute("PRAGMA journal_mode = WAL")
+                return
+            except sqlite3.OperationalError as exc:
+                if "locked" not in str(exc) or time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.05)
 
     def close(self) -> None:
         self._conn.close()
@@ -67,34 +119,217 @@ class AutomationStore:
         return str(row["note_hash"]) if row else None
 
     def upsert_note(self, note: NotePayload) -> Optional[str]:
-        previous = self.get_note_hash(note.path)
+        """
+        Store a note's hash and frontmatter and return the previously stored
+        hash. New and edited notes are journalled in `changes` in the same
+        transaction, except for a hash made with a different algorithm, which
+        the emitter journals once it knows whether the content changed. The
+        previous hash is read inside that transaction, so workers whose shards
+        overlap never both store a note as new.
+        """
         metadata_json = json.dumps(note.frontmatter, sort_keys=True)
         with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            previous = self.get_note_hash(note.path)
+            # Field digests are only recomputed when the content changed.
+            fields_json, body_digest = field_digests(note) if previous != note.note_hash else (None, None)
             self._conn.execute(
                 """
-                INSERT INTO notes(path, note_hash, metadata_json, seen_at)
-                VALUES (?, ?, ?, ?)
+                INSERT INTO notes(path, note_hash, metadata_json, seen_at, mtime_ns, field_digests, body_digest)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
                 ON CONFLICT(path) DO UPDATE SET
                     note_hash = excluded.note_hash,
                     metadata_json = excluded.metadata_json,
-                    seen_at = excluded.seen_at
+                    seen_at = excluded.seen_at,
+                    mtime_ns = excluded.mtime_ns,
+                    packed = 0,
+                    field_digests = COALESCE(excluded.field_digests, notes.field_digests),
+                    body_digest = COALESCE(excluded.body_digest, notes.body_digest)
                 """,
-                (str(note.path), note.note_hash, metadata_json, _now()),
+                (
+                    str(note.path),
+                    note.note_hash,
+                    metadata_json,
+                    _now(),
+                    note.mtime_ns,
+                    fields_json,
+                    body_digest,
+                ),
             )
+            if previous != note.note_hash:
+                if previous is not None:
+                    self._conn.execute("DELETE FROM note_tags WHERE path = ?", (str(note.path),))
+                self._conn.executemany(
+                    "INSERT INTO note_tags(tag, path) VALUES (?, ?)",
+                    ((tag, str(note.path)) for tag in note.tag_set),
+                )
+                if previous is None:
+                    self._append_change(str(note.path), CREATED, note.note_hash)
+                elif algorithm_of(previous) == algorithm_of(note.note_hash):
+                    self._append_change(str(note.path), MODIFIED, note.note_hash)
         return previous
 
-    def purge_missing(self, existing_paths: Iterable[Path]) -> None:
-        keep = {str(path) for path in existing_paths}
-        cursor = self._conn.execute("SELECT path FROM notes")
-        missing = [row["path"] for row in cursor if row["path"] not in keep]
-        if not missing:
-            return
+    def _append_change(self, path: str, kind: str, note_hash: Optional[str]) -> None:
+        self._conn.execute(
+            "INSERT INTO changes(path, kind, note_hash, changed_at) VALUES (?, ?, ?, ?)",
+            (path, kind, note_hash, _now()),
+        )
+
+    def record_change(self, note_path: Path, kind: str, note_hash: Optional[str]) -> None:
+        """Journal a change the store could not classify by itself."""
         with self._conn:
-            self._conn.executemany("DELETE FROM notes WHERE path = ?", ((path,) for path in missing))
-            self._conn.executemany(
-                "DELETE FROM emissions WHERE note_path = ?",
-                ((path,) for path in missing),
+            self._append_change(str(note_path), kind, note_hash)
+
+    def iter_changes(self, since_seq: int = 0, limit: Optional[int] = None) -> Iterator[Change]:
+        """Yield journal entries with `seq > since_seq`, oldest first."""
+        query = "SELECT seq, path, kind, note_hash, changed_at FROM changes WHERE seq > ? ORDER BY seq"
+        params: list = [since_seq]
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        for row in self._conn.execute(query, params):
+            yield Change(row["seq"], row["path"], row["kind"], row["note_hash"], row["changed_at"])
+
+    def last_change_seq(self) -> int:
+        """Sequence number of the newest entry, counting entries already compacted away."""
+        row = self._conn.execute("SELECT MAX(seq) AS seq FROM changes").fetchone()
+        return max(int(row["seq"] or 0), self.compacted_through())
+
+    def compacted_through(self) -> int:
+        """Highest sequence number dropped by compaction; readers behind it must resync."""
+        return int(self.get_metadata(COMPACTED_THROUGH_KEY) or 0)
+
+    def compact_changes(self, older_than: int) -> int:
+        """Drop journal entries recorded before `older_than` (Unix time). Returns the count."""
+        with self._conn:
+            row = self._conn.execute(
+                "SELECT MAX(seq) AS seq FROM changes WHERE changed_at < ?",
+                (older_than,),
+            ).fetchone()
+            through = row["seq"]
+            if through is None:
+                return 0
+            cursor = self._conn.execute("DELETE FROM changes WHERE seq <= ?", (through,))
+            self._conn.execute(
+                """
+                INSERT INTO metadata(key, value) VALUES (?, ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value
+                """,
+                (COMPACTED_THROUGH_KEY, str(through)),
             )
+        return cursor.rowcount
+
+    def migrate_hash(self, note_path: Path, old_hash: str, new_hash: str) -> None:
+        """Rewrite emission checkpoints recorded under `old_hash` to `new_hash`."""
+        with self._conn:
+            self._conn.execute(
+                """
+                UPDATE emissions SET note_hash = ?
+                WHERE note_path = ? AND note_hash = ?
+                """,
+                (new_hash, str(note_path), old_hash),
+            )
+            self._conn.execute(
+                "UPDATE retries SET note_hash = ? WHERE note_path = ? AND note_hash = ?",
+                (new_hash, str(note_path), old_hash),
+            )
+
+    def purge_missing(
+        self,
+        existing_paths: Iterable[Path],
+        include_cold: bool = True,
+        owns: Optional[Callable[[str], bool]] = None,
+    ) -> Tuple[int, int]:
+        """
+        Forget notes that were not seen during a scan. Packed notes live in
+        the archive rather than on disk and are always kept.
+
+        The scanned paths go into a temporary table and the missing notes are
+        found with one anti-join, so the cost grows with the number of notes
+        rather than with notes times deletions. A missing note whose hash
+        belongs to exactly one seen note without checkpoints of its own, and
+        to no other missing note, was renamed: its emission and retry
+        checkpoints move to the new path instead of being dropped. The
+        journal records a rename as the old path deleted (the new path was
+        journalled as created when it was stored).
+
+        Args:
+            existing_paths: Paths seen during the scan.
+            include_cold: When False (a hot-tier scan, which never visits cold
+                notes), cold notes are kept regardless.
+            owns: When set (a sharded scan), only paths it accepts are
+                candidates; other shards' notes are kept.
+        Returns:
+            Number of notes forgotten and how many of them were renames.
+        """
+        self._conn.executescript(PURGE_TABLES)
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO temp.purge_seen(path) VALUES (?)",
+            ((str(path),) for path in existing_paths),
+        )
+        query = """
+            INSERT INTO temp.purge_missing(path, note_hash)
+            SELECT n.path, n.note_hash FROM notes AS n
+            WHERE n.packed = 0
+                AND NOT EXISTS (SELECT 1 FROM temp.purge_seen AS s WHERE s.path = n.path)
+        """
+        if not include_cold:
+            query += " AND n.cold = 0"
+        if owns is not None:
+            self._conn.create_function("purge_owns", 1, owns, deterministic=True)
+            query += " AND purge_owns(n.path)"
+        try:
+            with self._conn:
+                self._conn.execute(query)
+                missing = self._conn.execute("SELECT COUNT(*) AS total FROM temp.purge_missing").fetchone()["total"]
+                if not missing:
+                    return 0, 0
+                renamed = self._conn.execute(
+                    """
+                    INSERT INTO temp.purge_renames(old_path, new_path)
+                    SELECT m.path, MIN(n.path)
+                    FROM temp.purge_missing AS m
+                    JOIN notes AS n ON n.note_hash = m.note_hash
+                    WHERE NOT EXISTS (SELECT 1 FROM temp.purge_missing AS x WHERE x.path = n.path)
+                        AND NOT EXISTS (SELECT 1 FROM emissions AS e WHERE e.note_path = n.path)
+                        AND NOT EXISTS (SELECT 1 FROM retries AS r WHERE r.note_path = n.path)
+                        AND (SELECT COUNT(*) FROM temp.purge_missing AS x WHERE x.note_hash = m.note_hash) = 1
+                    GROUP BY m.path
+                    HAVING COUNT(*) = 1
+                    """
+                ).rowcount
+                if renamed:
+                    for table in ("emissions", "retries"):
+                        self._conn.execute(
+                            f"""
+                            UPDATE {table}
+                            SET note_path = (
+                                SELECT r.new_path FROM temp.purge_renames AS r
+                                WHERE r.old_path = {table}.note_path
+                            )
+                            WHERE note_path IN (SELECT old_path FROM temp.purge_renames)
+                            """
+                        )
+                for table, column in (
+                    ("notes", "path"),
+                    ("emissions", "note_path"),
+                    ("note_tags", "path"),
+                    ("retries", "note_path"),
+                    ("leases", "note_path"),
+                ):
+                    self._conn.execute(
+                        f"DELETE FROM {table} WHERE {column} IN (SELECT path FROM temp.purge_missing)"
+                    )
+                self._conn.execute(
+                    """
+                    INSERT INTO changes(path, kind, note_hash, changed_at)
+                    SELECT path, ?, NULL, ? FROM temp.purge_missing ORDER BY path
+                    """,
+                    (DELETED, _now()),
+                )
+        finally:
+            self._conn.executescript(PURGE_CLEANUP)
+        return missing, renamed
 
     def get_emission_hash(self, consumer: str, note_path: Path) -> Optional[str]:
         cursor = self._conn.execute(
@@ -107,6 +342,50 @@ class AutomationStore:
         row = cursor.fetchone()
         return str(row["note_hash"]) if row else None
 
+    def iter_pending(
+        self,
+        consumer: str,
+        selector: Optional[Selector] = None,
+        now: Optional[int] = None,
+        order: str = "path",
+    ) -> Iterator[tuple[str, str, Optional[str]]]:
+        """
+        Yield `(path, note_hash, emitted_hash)` for notes whose current hash
+        was not emitted. Not-applicable checkpoints report no emitted hash,
+        since the consumer never processed the note. With a `selector`, only
+        notes it selects are considered. `order` is a `PENDING_ORDER` key.
+
+        Notes that failed at their current hash are held back until their
+        `next_attempt_at` (as of `now`), and dead letters until requeued; an
+        edit to the note makes it eligible again straight away.
+        """
+        where, params = selector.to_sql("n") if selector else ("1", [])
+        now = _now() if now is None else now
+        cursor = self._conn.execute(
+            f"""
+            SELECT
+                n.path,
+                n.note_hash,
+                CASE WHEN e.status = '{NOT_APPLICABLE}' THEN NULL ELSE e.note_hash END AS emitted_hash
+            FROM notes AS n
+            LEFT JOIN emissions AS e
+                ON e.consumer = ? AND e.note_path = n.path
+            LEFT JOIN retries AS r
+                ON r.consumer = ? AND r.note_path = n.path
+            WHERE (e.note_hash IS NULL OR e.note_hash != n.note_hash)
+                AND (
+                    r.note_hash IS NULL
+                    OR r.note_hash != n.note_hash
+                    OR (r.dead = 0 AND r.next_attempt_at <= ?)
+                )
+                AND {where}
+            ORDER BY {PENDING_ORDER[order]}
+            """,
+            (consumer, consumer, now, *params),
+        )
+        for row in cursor:
+            yield row["path"], row["note_hash"], row["emitted_hash"]
+
     def needs_emission(self, consumer: str, note_path: Path, note_hash: str) -> bool:
         recorded = self.get_emission_hash(consumer, note_path)
         return recorded != note_hash
@@ -123,16 +402,337 @@ class AutomationStore:
         with self._conn:
             self._conn.execute(
                 """
-                INSERT INTO emissions(consumer, note_path, note_hash, emitted_at, status, metadata_json)
-                VALUES (?, ?, ?, ?, ?, ?)
+                INSERT INTO emissions(
+                    consumer, note_path, note_hash, emitted_at, status, metadata_json,
+                    field_digests, body_digest
+                )
+                SELECT ?, ?, ?, ?, ?, ?, n.field_digests, n.body_digest
+                FROM (SELECT 1) LEFT JOIN notes AS n ON n.path = ?2
+                WHERE true
                 ON CONFLICT(consumer, note_path) DO UPDATE SET
                     note_hash = excluded.note_hash,
                     emitted_at = excluded.emitted_at,
                     status = excluded.status,
-                    metadata_json = excluded.metadata_json
+                    metadata_json = excluded.metadata_json,
+                    field_digests = excluded.field_digests,
+                    body_digest = excluded.body_digest
                 """,
                 (consumer, str(note_path), note_hash, _now(), status, metadata_json),
             )
+            self._conn.execute(
+                "DELETE FROM retries WHERE consumer = ? AND note_path = ?",
+                (consumer, str(note_path)),
+            )
+
+    def mark_not_applicable(self, consumer: str, notes: Iterable[Tuple[Path, str]]) -> int:
+        """
+        Record `(path, note_hash)` pairs the consumer does not handle, in one
+        transaction. Returns the number of rows written.
+        """
+        now = _now()
+        rows = [(consumer, str(path), note_hash, now, NOT_APPLICABLE) for path, note_hash in notes]
+        if not rows:
+            return 0
+        with self._conn:
+            self._conn.executemany(
+                """
+                INSERT INTO emissions(
+                    consumer, note_path, note_hash, emitted_at, status, metadata_json,
+                    field_digests, body_digest
+                )
+                SELECT ?, ?, ?, ?, ?, NULL, n.field_digests, n.body_digest
+                FROM (SELECT 1) LEFT JOIN notes AS n ON n.path = ?2
+                WHERE true
+                ON CONFLICT(consumer, note_path) DO UPDATE SET
+                    note_hash = excluded.note_hash,
+                    emitted_at = excluded.emitted_at,
+                    status = excluded.status,
+                    metadata_json = NULL,
+                    field_digests = excluded.field_digests,
+                    body_digest = excluded.body_digest
+                """,
+                rows,
+            )
+            self._conn.executemany(
+                "DELETE FROM retries WHERE consumer = ? AND note_path = ?",
+                ((consumer, row[1]) for row in rows),
+            )
+        return len(rows)
+
+    def advance_unwatched(self, consumer: str, watch: Sequence[str]) -> int:
+        """
+        Move a consumer's checkpoints to the current note hash where none of
+        the `watch`ed frontmatter fields (or the body, named `BODY_FIELD`)
+        changed since the last dispatch, so edits it does not depend on never
+        reach it. The stored digests stay those of the last dispatch. Notes
+        without digests on either side (recorded before digests existed) are
+        left pending. Returns the number of checkpoints advanced.
+        """
+        clauses = ["n.field_digests IS NOT NULL", "emissions.field_digests IS NOT NULL"]
+        params: list = []
+        for name in watch:
+            if name == BODY_FIELD:
+                clauses.append("n.body_digest IS emissions.body_digest")
+                continue
+            path = json_path(name)
+            clauses.append("json_extract(n.field_digests, ?) IS json_extract(emissions.field_digests, ?)")
+            params.extend((path, path))
+        unchanged = " AND ".join(clauses)
+        with self._conn:
+            cursor = self._conn.execute(
+                f"""
+                UPDATE emissions
+                SET note_hash = (SELECT n.note_hash FROM notes AS n WHERE n.path = emissions.note_path)
+                WHERE consumer = ?
+                    AND EXISTS (
+                        SELECT 1 FROM notes AS n
+                        WHERE n.path = emissions.note_path
+                            AND n.note_hash != emissions.note_hash
+                            AND {unchanged}
+                    )
+                """,
+                (consumer, *params),
+            )
+        return cursor.rowcount
+
+    def reset_not_applicable(self, consumer: str) -> int:
+        """Drop a consumer's not-applicable checkpoints so every such note is re-evaluated."""
+        with self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM emissions WHERE consumer = ? AND status = ?",
+                (consumer, NOT_APPLICABLE),
+            )
+        return cursor.rowcount
+
+    def claim(self, consumer: str, note_path: Path, note_hash: str, owner: str, ttl: int) -> bool:
+        """
+        Reserve a note for `owner` for `ttl` seconds so concurrent workers do
+        not dispatch it twice. Fails while another owner's lease is live, and
+        when the note was already emitted at `note_hash` (by another worker
+        since the pending list was read).
+        """
+        now = _now()
+        with self._conn:
+            cursor = self._conn.execute(
+                """
+                INSERT INTO leases(consumer, note_path, owner, expires_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(consumer, note_path) DO UPDATE SET
+                    owner = excluded.owner,
+                    expires_at = excluded.expires_at
+                WHERE leases.expires_at <= ? OR leases.owner = excluded.owner
+                """,
+                (consumer, str(note_path), owner, now + ttl, now),
+            )
+            if cursor.rowcount != 1:
+                return False
+            emitted = self._conn.execute(
+                "SELECT 1 FROM emissions WHERE consumer = ? AND note_path = ? AND note_hash = ?",
+                (consumer, str(note_path), note_hash),
+            ).fetchone()
+            if emitted is not None:
+                self._conn.execute(
+                    "DELETE FROM leases WHERE consumer = ? AND note_path = ? AND owner = ?",
+                    (consumer, str(note_path), owner),
+                )
+                return False
+        return True
+
+    def renew(self, consumer: str, note_path: Path, owner: str, ttl: int) -> bool:
+        """Extend `owner`'s lease by `ttl` seconds from now; False once it was released or taken over."""
+        with self._conn:
+            cursor = self._conn.execute(
+                "UPDATE leases SET expires_at = ? WHERE consumer = ? AND note_path = ? AND owner = ?",
+                (_now() + ttl, consumer, str(note_path), owner),
+            )
+        return cursor.rowcount == 1
+
+    def release(self, consumer: str, note_path: Path, owner: str) -> None:
+        with self._conn:
+            self._conn.execute(
+                "DELETE FROM leases WHERE consumer = ? AND note_path = ? AND owner = ?",
+                (consumer, str(note_path), owner),
+            )
+
+    def record_failure(
+        self,
+        consumer: str,
+        note_path: Path,
+        note_hash: str,
+        error: str,
+        policy: RetryConfig,
+    ) -> RetryState:
+        """
+        Count a failed dispatch and schedule the next attempt with exponential
+        backoff. Attempts restart at one when the note changed since the last
+        failure; after `policy.max_attempts` the note becomes a dead letter.
+        """
+        now = _now()
+        row = self._conn.execute(
+            "SELECT note_hash, attempts FROM retries WHERE consumer = ? AND note_path = ?",
+            (consumer, str(note_path)),
+        ).fetchone()
+        attempts = row["attempts"] + 1 if row is not None and row["note_hash"] == note_hash else 1
+        dead = attempts >= policy.max_attempts
+        next_attempt_at = now + policy.delay(attempts)
+        with self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO retries(
+                    consumer, note_path, note_hash, attempts, last_error, failed_at, next_attempt_at, dead
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(consumer, note_path) DO UPDATE SET
+                    note_hash = excluded.note_hash,
+                    attempts = excluded.attempts,
+                    last_error = excluded.last_error,
+                    failed_at = excluded.failed_at,
+                    next_attempt_at = excluded.next_attempt_at,
+                    dead = excluded.dead
+                """,
+                (consumer, str(note_path), note_hash, attempts, error, now, next_attempt_at, int(dead)),
+            )
+        return RetryState(str(note_path), consumer, note_hash, attempts, error, now, next_attempt_at, dead)
+
+    def iter_retries(self, consumer: Optional[str] = None, dead: Optional[bool] = None) -> Iterator[RetryState]:
+        """Yield recorded failures, optionally for one consumer and only (not) dead letters."""
+        query = "SELECT * FROM retries WHERE 1"
+        params: list = []
+        if consumer is not None:
+            query += " AND consumer = ?"
+            params.append(consumer)
+        if dead is not None:
+            query += " AND dead = ?"
+            params.append(int(dead))
+        for row in self._conn.execute(query + " ORDER BY consumer, note_path", params):
+            yield RetryState(
+                path=row["note_path"],
+                consumer=row["consumer"],
+                note_hash=row["note_hash"],
+                attempts=row["attempts"],
+                last_error=row["last_error"],
+                failed_at=row["failed_at"],
+                next_attempt_at=row["next_attempt_at"],
+                dead=bool(row["dead"]),
+            )
+
+    def requeue(self, consumer: Optional[str] = None, paths: Optional[Sequence[Path]] = None) -> int:
+        """
+        Forget dead letters (all, one consumer's, or only `paths`) so the next
+        run dispatches them again with a fresh attempt count. Returns the
+        number requeued.
+        """
+        query = "DELETE FROM retries WHERE dead = 1"
+        params: list = []
+        if consumer is not None:
+            query += " AND consumer = ?"
+            params.append(consumer)
+        if paths is not None:
+            query += f" AND note_path IN ({', '.join('?' for _ in paths)})"
+            params.extend(str(path) for path in paths)
+        with self._conn:
+            cursor = self._conn.execute(query, params)
+        return cursor.rowcount
+
+    def record_run_metrics(self, started_at: int, metrics: dict, retain: int) -> None:
+        """Append a run's metrics and keep only the newest `retain` rows."""
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO run_metrics(started_at, metrics_json) VALUES (?, ?)",
+                (started_at, json.dumps(metrics, sort_keys=True)),
+            )
+            self._conn.execute(
+                """
+                DELETE FROM run_metrics
+                WHERE id <= (SELECT MAX(id) FROM run_metrics) - ?
+                """,
+                (max(retain, 1),),
+            )
+
+    def iter_run_metrics(self, limit: int = 20) -> Iterator[dict]:
+        cursor = self._conn.execute(
+            "SELECT metrics_json FROM run_metrics ORDER BY id DESC LIMIT ?",
+            (limit,),
+        )
+        for row in cursor:
+            yield json.loads(row["metrics_json"])
+
+    def get_metadata(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM metadata WHERE key = ?", (key,)).fetchone()
+        return str(row["value"]) if row else None
+
+    def set_metadata(self, key: str, value: str) -> None:
+        with self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO metadata(key, value) VALUES (?, ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value
+                """,
+                (key, value),
+            )
+
+    def mark_cold(self, final_statuses: Sequence[str], cutoff_ns: int) -> int:
+        """
+        Flag notes as cold when their processing_status is final and their
+        mtime is older than `cutoff_ns`; every other note becomes hot.
+
+        Returns:
+            Number of cold notes.
+        """
+        statuses = [status.lower() for status in final_statuses]
+        placeholders = ", ".join("?" for _ in statuses) or "NULL"
+        with self._conn:
+            self._conn.execute(
+                f"""
+                UPDATE notes SET cold = COALESCE(
+                    mtime_ns > 0 AND mtime_ns < ?
+                    AND lower(json_extract(metadata_json, '$.processing_status')) IN ({placeholders}),
+                    0
+                )
+                """,
+                (cutoff_ns, *statuses),
+            )
+        row = self._conn.execute("SELECT COUNT(*) AS total FROM notes WHERE cold = 1").fetchone()
+        return int(row["total"])
+
+    def iter_archivable(self, final_statuses: Sequence[str], cutoff_ns: int) -> Iterator[tuple[str, str]]:
+        """Yield `(path, note_hash)` for loose notes that are final and older than `cutoff_ns`."""
+        statuses = [status.lower() for status in final_statuses]
+        placeholders = ", ".join("?" for _ in statuses) or "NULL"
+        cursor = self._conn.execute(
+            f"""
+            SELECT path, note_hash FROM notes
+            WHERE packed = 0 AND mtime_ns > 0 AND mtime_ns < ?
+              AND lower(json_extract(metadata_json, '$.processing_status')) IN ({placeholders})
+            ORDER BY path
+            """,
+            (cutoff_ns, *statuses),
+        )
+        for row in cursor.fetchall():
+            yield row["path"], row["note_hash"]
+
+    def mark_packed(self, paths: Iterable[str]) -> None:
+        with self._conn:
+            self._conn.executemany("UPDATE notes SET packed = 1, cold = 1 WHERE path = ?", ((path,) for path in paths))
+
+    def iter_note_tiers(self) -> Iterator[tuple[str, bool]]:
+        """Yield `(path, is_cold)` for every stored note."""
+        for row in self._conn.execute("SELECT path, cold FROM notes"):
+            yield row["path"], bool(row["cold"])
+
+    def cold_paths(self) -> Set[str]:
+        return {row["path"] for row in self._conn.execute("SELECT path FROM notes WHERE cold = 1")}
+
+    def cold_dirs(self) -> Dict[str, int]:
+        return {row["path"]: int(row["mtime_ns"]) for row in self._conn.execute("SELECT path, mtime_ns FROM cold_dirs")}
+
+    def replace_cold_dirs(self, dirs: Dict[str, int]) -> None:
+        with self._conn:
+            self._conn.execute("DELETE FROM cold_dirs")
+            self._conn.executemany(
+                "INSERT INTO cold_dirs(path, mtime_ns) VALUES (?, ?)",
+                sorted(dirs.items()),
+            )
 
     def iter_notes(self) -> Iterator[tuple[str, str]]:
         cursor = self._conn.execute("SELECT path, note_hash FROM notes")
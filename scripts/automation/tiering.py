@@ -0,0 +1,154 @@
+"""Hot/cold tiering: skip finished, old captures on routine runs."""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Optional, Set
+
+from . import metrics
+from .config import TieringConfig
+from .store import AutomationStore
+
+if TYPE_CHECKING:
+    from .sharding import Shard
+
+LOG = logging.getLogger(__name__)
+
+LAST_FULL_SCAN_KEY = "tiering.last_full_scan"
+# A sharded full scan only covers its own notes, so each shard tracks its own.
+SHARD_FULL_SCAN_KEY = "tiering.last_full_scan.shard.{index}/{count}"
+
+
+@dataclass(slots=True)
+class ColdSet:
+    """Cold notes and prunable directories loaded for a hot-tier run."""
+
+    paths: Set[str] = field(default_factory=set)
+    dirs: Dict[str, int] = field(default_factory=dict)
+
+    def prune_dir(self, entry: os.DirEntry) -> bool:
+        """Skip a cold directory unless its entries changed since it was classified."""
+        recorded = self.dirs.get(entry.path)
+        if recorded is None:
+            return False
+        try:
+            current = entry.stat(follow_symlinks=False).st_mtime_ns
+        except OSError:
+            return False
+        if current != recorded:
+            return False
+        metrics.current().add("tiering.dirs_pruned")
+        return True
+
+
+def full_scan_key(shard: Optional["Shard"] = None) -> str:
+    """Metadata key recording the last full scan of the vault, or of one shard."""
+    if shard is None:
+        return LAST_FULL_SCAN_KEY
+    return SHARD_FULL_SCAN_KEY.format(index=shard.index, count=shard.count)
+
+
+def full_scan_due(
+    store: AutomationStore,
+    tiering: TieringConfig,
+    now: Optional[float] = None,
+    shard: Optional["Shard"] = None,
+) -> bool:
+    """Return True when tiering is off or the last full scan is older than the interval."""
+    if not tiering.enabled:
+        return True
+    return rehash_due(store, tiering, now, shard)
+
+
+def rehash_due(
+    store: AutomationStore,
+    tiering: TieringConfig,
+    now: Optional[float] = None,
+    shard: Optional["Shard"] = None,
+) -> bool:
+    """
+    Return True when the last full scan that re-hashed every note is older
+    than `full_scan_interval_hours`. Routine runs trust the parse cache's
+    hashes; this bounds how long an edit its stamp missed can go unseen,
+    whether or not tiering is enabled. For a `shard`, a whole-vault scan or
+    a scan of that shard counts.
+    """
+    keys = [LAST_FULL_SCAN_KEY] if shard is None else [LAST_FULL_SCAN_KEY, full_scan_key(shard)]
+    stamps = [float(value) for value in map(store.get_metadata, keys) if value is not None]
+    if not stamps:
+        return True
+    now = time.time() if now is None else now
+    return now - max(stamps) >= tiering.full_scan_interval_hours * 3600
+
+
+def record_full_scan(
+    store: AutomationStore,
+    now: Optional[float] = None,
+    shard: Optional["Shard"] = None,
+) -> None:
+    """Note that every note (of `shard`, when given) was just read and hashed."""
+    store.set_metadata(full_scan_key(shard), str(time.time() if now is None else now))
+
+
+def load_cold_set(store: AutomationStore) -> ColdSet:
+    return ColdSet(paths=store.cold_paths(), dirs=store.cold_dirs())
+
+
+def _leaf_mtime(directory: str) -> Optional[int]:
+    """Return the directory's mtime when it has no subdirectories, else None."""
+    try:
+        with os.scandir(directory) as iterator:
+            if any(entry.is_dir(follow_symlinks=False) for entry in iterator):
+                return None
+        return os.stat(directory).st_mtime_ns
+    except OSError:
+        return None
+
+
+def classify(
+    store: AutomationStore,
+    tiering: TieringConfig,
+    capture_dir: Path,
+    full_scan: bool,
+    now: Optional[float] = None,
+) -> int:
+    """
+    Re-tier stored notes after a refresh.
+
+    Notes are re-flagged on every run. Prunable directories (leaf directories
+    holding only cold notes) are recomputed on full scans only, because a
+    hot-tier run cannot see changes inside directories it skipped.
+
+    Returns:
+        Number of cold notes.
+    """
+    now = time.time() if now is None else now
+    cutoff_ns = int((now - tiering.cold_after_days * 86400) * 1_000_000_000)
+    with metrics.current().stage("tiering.classify"):
+        cold = store.mark_cold(tiering.final_statuses, cutoff_ns)
+        if not full_scan:
+            return cold
+        hot_dirs: Set[str] = set()
+        cold_dirs: Dict[str, int] = defaultdict(int)
+        for path, is_cold in store.iter_note_tiers():
+            parent = os.path.dirname(path)
+            if is_cold:
+                cold_dirs[parent] += 1
+            else:
+                hot_dirs.add(parent)
+        root = str(capture_dir)
+        prunable: Dict[str, int] = {}
+        for directory in cold_dirs:
+            if directory in hot_dirs or directory == root:
+                continue
+            mtime_ns = _leaf_mtime(directory)
+            if mtime_ns is not None:
+                prunable[directory] = mtime_ns
+        store.replace_cold_dirs(prunable)
+    LOG.debug("Tiering: %d cold notes, %d prunable directories", cold, len(prunable))
+    return cold
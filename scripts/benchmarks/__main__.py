@@ -0,0 +1,7 @@
+"""Run the benchmark suite: `python -m scripts.benchmarks --notes 2000`."""
+
+import sys
+
+from .suite import main
+
+sys.exit(main())
@@ -0,0 +1,150 @@
+"""JSON results format for benchmark runs and regression comparison."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+# Bump when the layout of result files changes incompatibly.
+RESULTS_SCHEMA = 1
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        proc = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return proc.stdout.strip() or None
+
+
+def summarise(samples_ms: Sequence[float]) -> Dict[str, float]:
+    return {
+        "min_ms": round(min(samples_ms), 4),
+        "median_ms": round(statistics.median(samples_ms), 4),
+        "mean_ms": round(statistics.fmean(samples_ms), 4),
+        "stdev_ms": round(statistics.stdev(samples_ms), 4) if len(samples_ms) > 1 else 0.0,
+    }
+
+
+def result_entry(
+    name: str,
+    samples_ms: Sequence[float],
+    params: Optional[Dict[str, Any]] = None,
+    extra: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    entry: Dict[str, Any] = {
+        "name": name,
+        "params": params or {},
+        "samples_ms": [round(sample, 4) for sample in samples_ms],
+        **summarise(samples_ms),
+    }
+    if extra:
+        entry["extra"] = extra
+    return entry
+
+
+def measure(fn: Callable[[], Any], repeat: int, setup: Optional[Callable[[], Any]] = None) -> List[float]:
+    """Time `fn` `repeat` times (running `setup` untimed before each call)."""
+    samples: List[float] = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def build_report(suite: str, results: List[Dict[str, Any]], params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    return {
+        "schema": RESULTS_SCHEMA,
+        "suite": suite,
+        "commit": _git_commit(),
+        "created_at": int(time.time()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": params or {},
+        "results": results,
+    }
+
+
+def write_report(report: Dict[str, Any], destination: Optional[Path]) -> None:
+    payload = json.dumps(report, indent=2)
+    if destination is None or str(destination) == "-":
+        print(payload)
+    else:
+        destination.write_text(payload + "\n", encoding="utf-8")
+
+
+def load_report(path: Path) -> Dict[str, Any]:
+    report = json.loads(path.read_text(encoding="utf-8"))
+    if report.get("schema") != RESULTS_SCHEMA:
+        raise ValueError(f"{path}: unsupported results schema {report.get('schema')!r}")
+    return report
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """
+    Compare median timings of benchmarks present in both reports.
+
+    Returns:
+        One row per shared benchmark with the ratio current/baseline and a
+        `regressed` flag when the ratio exceeds 1 + threshold.
+    """
+    base_by_name = {entry["name"]: entry for entry in baseline["results"]}
+    rows: List[Dict[str, Any]] = []
+    for entry in current["results"]:
+        base = base_by_name.get(entry["name"])
+        if base is None or not base["median_ms"]:
+            continue
+        ratio = entry["median_ms"] / base["median_ms"]
+        rows.append(
+            {
+                "name": entry["name"],
+                "baseline_ms": base["median_ms"],
+                "current_ms": entry["median_ms"],
+                "ratio": round(ratio, 3),
+                "regressed": ratio > 1 + threshold,
+            },
+        )
+    return rows
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("current", type=Path)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="Allowed slowdown before a benchmark counts as regressed (default: 0.10).",
+    )
+    args = parser.parse_args(argv)
+
+    rows = compare(load_report(args.baseline), load_report(args.current), args.threshold)
+    width = max((len(row["name"]) for row in rows), default=10)
+    for row in rows:
+        marker = "REGRESSED" if row["regressed"] else ""
+        print(
+            f"{row['name']:<{width}}  {row['baseline_ms']:>10.3f}  {row['current_ms']:>10.3f}  "
+            f"x{row['ratio']:<6}  {marker}",
+        )
+    return 1 if any(row["regressed"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
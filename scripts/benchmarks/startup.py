@@ -0,0 +1,108 @@
+"""Track CLI startup cost: wall time per invocation and `-X importtime` totals."""
+
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from .results import build_report, result_entry, write_report
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+MINIMAL_CONFIG = """\
+[vault]
+root = "{root}"
+
+[state]
+dir = "{state}"
+
+[consumers.taskwarrior]
+type = "taskwarrior"
+"""
+
+
+def _commands(workdir: Path) -> Dict[str, List[str]]:
+    config_path = workdir / "automations.toml"
+    config_path.write_text(
+        MINIMAL_CONFIG.format(root=workdir / "vault", state=workdir / "state"),
+        encoding="utf-8",
+    )
+    capture_query = str(REPO_ROOT / "scripts" / "capture_query.py")
+    return {
+        "capture_query --version": [capture_query, "--version"],
+        "capture_query --help": [capture_query, "--help"],
+        "automation.cli --list-consumers": [
+            "-m",
+            "scripts.automation.cli",
+            "--config",
+            str(config_path),
+            "--list-consumers",
+        ],
+    }
+
+
+def _import_total_us(stderr: str) -> int:
+    """Sum the self-time column of `-X importtime` output (microseconds)."""
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line.split("|")
+        try:
+            total += int(fields[0].split(":", 1)[1])
+        except (IndexError, ValueError):
+            continue
+    return total
+
+
+def measure(name: str, command: Sequence[str], repeat: int) -> Dict[str, Any]:
+    walls: List[float] = []
+    imports: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, *command],
+            cwd=REPO_ROOT,
+            check=True,
+            capture_output=True,
+        )
+        walls.append((time.perf_counter() - started) * 1000)
+        traced = subprocess.run(
+            [sys.executable, "-X", "importtime", *command],
+            cwd=REPO_ROOT,
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        imports.append(_import_total_us(traced.stderr) / 1000)
+    return result_entry(
+        f"startup[{name}]",
+        walls,
+        extra={"import_ms": [round(value, 3) for value in imports]},
+    )
+
+
+def run(repeat: int = 5) -> List[Dict[str, Any]]:
+    with tempfile.TemporaryDirectory(prefix="para-startup-") as tmp:
+        workdir = Path(tmp)
+        return [measure(name, command, repeat) for name, command in _commands(workdir).items()]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5, help="Invocations per command (default: 5).")
+    parser.add_argument("--output", type=Path, help="Write JSON results here instead of STDOUT.")
+    args = parser.parse_args(argv)
+
+    report = build_report("startup", run(args.repeat), {"repeat": args.repeat})
+    write_report(report, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
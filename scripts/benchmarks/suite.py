@@ -0,0 +1,468 @@
+"""Micro/macro benchmarks for capture_query.py and scripts.automation."""
+
+from __future__ import annotations
+
+import argparse
+import shutil
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from scripts import capture_query
+from scripts.automation.config import AutomationConfig, ConsumerConfig
+from scripts.automation.consumers.taskwarrior import TaskWarriorConsumer
+from scripts.automation.consumers.taskwarrior_backends import FakeBackend
+from scripts.automation.emitter import NoteEmitter
+from scripts.automation.frontmatter import read_note as automation_read_note
+from scripts.automation.notes import NotePayload, iter_note_payloads
+from scripts.automation.selectors import Selector
+from scripts.automation.store import AutomationStore
+from scripts.vault.index import ParseCache
+from scripts.vault.walk import walk_markdown
+
+from .results import build_report, measure, result_entry, write_report
+from .vault import DEFAULT_SPEC, SHAPES, WORDS, VaultSpec, generate_vault
+
+BENCHMARKS = (
+    "read_note",
+    "parse_cache",
+    "matches_filters",
+    "select_notes",
+    "iter_note_payloads",
+    "payloads",
+    "emitter",
+    "taskwarrior",
+)
+
+# 200 keywords: the vault vocabulary plus words that never occur.
+KEYWORDS = list(WORDS) + [f"keyword{index:03d}" for index in range(200 - len(WORDS))]
+
+FILTER_CASES: Dict[str, List[str]] = {
+    "tag": ["--tag", "todo"],
+    "where": ["--where", "processing_status=raw", "--location", "city=Champaign"],
+    "search": ["--search", "budget", "--search", "review"],
+    "search_any[1]": ["--search-any", "keyword000"],
+    "search_any[200]": [arg for index in range(200) for arg in ("--search-any", f"keyword{index:03d}")],
+    "search_all[200]": [arg for keyword in KEYWORDS for arg in ("--search", keyword)],
+    "regex": ["--regex", "--search", r"bud\w+t", "--search-any", r"re(view|lease)"],
+}
+
+
+def _global_config(root: Path, capture_dir: Path, state_dir: Path) -> AutomationConfig:
+    return AutomationConfig(
+        vault_root=root,
+        capture_dir=capture_dir,
+        state_dir=state_dir,
+        database_path=state_dir / "bench.db",
+        log_level="WARNING",
+        consumers=(),
+    )
+
+
+def _ignorecase_matcher(required: Sequence[str], optional: Sequence[str]) -> Callable[[str], bool]:
+    """ContentMatcher's literal matching without folding bodies: every pattern compiled IGNORECASE."""
+    import re
+
+    patterns = [re.compile(re.escape(needle), re.IGNORECASE) for needle in required]
+    any_pattern = (
+        re.compile(capture_query.literal_trie_pattern(needle.lower() for needle in optional), re.IGNORECASE)
+        if optional
+        else None
+    )
+
+    def matches(text: str) -> bool:
+        if any_pattern is not None and any_pattern.search(text) is None:
+            return False
+        return all(pattern.search(text) is not None for pattern in patterns)
+
+    return matches
+
+
+class Suite:
+    """Runs every benchmark against one generated vault."""
+
+    def __init__(
+        self,
+        root: Path,
+        spec: VaultSpec,
+        repeat: int,
+        existing_tasks: int = 10000,
+        payloads: int = 100000,
+    ) -> None:
+        self.root = root
+        self.spec = spec
+        self.repeat = repeat
+        self.existing_tasks = existing_tasks
+        self.payload_count = payloads
+        self.capture_dir = root / spec.capture_dir
+        self.state_dir = root / "state"
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        self.paths = sorted(self.capture_dir.rglob("*.md"))
+        self.results: List[Dict[str, Any]] = []
+        self._db_counter = 0
+
+    def _record(self, name: str, fn: Callable[[], Any], setup: Optional[Callable[[], Any]] = None, **params: Any) -> None:
+        samples = measure(fn, self.repeat, setup)
+        self.results.append(result_entry(name, samples, {"notes": len(self.paths), **params}))
+
+    def _fresh_store(self) -> AutomationStore:
+        self._db_counter += 1
+        return AutomationStore(self.state_dir / f"bench-{self._db_counter}.db")
+
+    def bench_read_note(self) -> None:
+        self._record(
+            "capture_query.read_note",
+            lambda: [capture_query.read_note(path) for path in self.paths],
+        )
+        self._record(
+            "automation.read_note",
+            lambda: [automation_read_note(path) for path in self.paths],
+        )
+        self._record(
+            "automation.read_note[blake2b]",
+            lambda: [automation_read_note(path, "blake2b") for path in self.paths],
+            hash_algorithm="blake2b",
+        )
+
+    def bench_parse_cache(self) -> None:
+        cache_path = self.state_dir / "parse-cache.sqlite"
+        holder: Dict[str, ParseCache] = {}
+
+        def fresh() -> None:
+            if "cache" in holder:
+                holder["cache"].close()
+            for suffix in ("", "-wal", "-shm"):
+                Path(f"{cache_path}{suffix}").unlink(missing_ok=True)
+            holder["cache"] = ParseCache(cache_path)
+
+        def query() -> None:
+            cache = holder["cache"]
+            for path in self.paths:
+                capture_query.read_note(path, cache)
+            cache.flush()
+
+        def automation() -> None:
+            cache = holder["cache"]
+            for path in self.paths:
+                automation_read_note(path, cache=cache)
+            cache.flush()
+
+        self._record("capture_query.read_note[cache cold]", query, setup=fresh)
+
+        def warm_from_query() -> None:
+            fresh()
+            query()
+
+        self._record("capture_query.read_note[cache warm]", query, setup=warm_from_query)
+        # capture_query leaves no hash, so automation still reads and hashes
+        # but skips the YAML parse.
+        self._record("automation.read_note[cache from capture_query]", automation, setup=warm_from_query)
+
+        def warm_from_automation() -> None:
+            fresh()
+            automation()
+
+        self._record("automation.read_note[cache warm]", automation, setup=warm_from_automation)
+        holder.pop("cache").close()
+
+    def bench_matches_filters(self) -> None:
+        notes = [capture_query.read_note(path) for path in self.paths]
+        for case, argv in FILTER_CASES.items():
+            filters = capture_query.build_filters(capture_query.parse_args(argv))
+            self._record(
+                f"capture_query.matches_filters[{case}]",
+                lambda filters=filters: [capture_query.matches_filters(note, filters) for note in notes],
+                filter=case,
+            )
+        # ContentMatcher folds each body once for case-insensitive literals;
+        # the [ignorecase] rows search the original text with the same
+        # patterns compiled IGNORECASE instead, to keep that choice honest.
+        for case in ("search", "search_any[1]", "search_any[200]", "search_all[200]"):
+            args = capture_query.parse_args(FILTER_CASES[case])
+            matcher = _ignorecase_matcher(args.search or [], args.search_any or [])
+            self._record(
+                f"capture_query.matches_filters[{case}, ignorecase]",
+                lambda matcher=matcher: [matcher(note.content) for note in notes],
+                filter=case,
+            )
+
+    def bench_select_notes(self) -> None:
+        notes = [capture_query.read_note(path) for path in self.paths]
+        top = capture_query.build_filters(capture_query.parse_args(["--limit", "20"]))
+        every = capture_query.build_filters(capture_query.parse_args([]))
+        self._record(
+            "capture_query.select_notes[sort]",
+            lambda: capture_query.select_notes(notes, every, "timestamp", True, None),
+        )
+        self._record(
+            "capture_query.select_notes[top20]",
+            lambda: capture_query.select_notes(notes, top, "timestamp", True, None),
+        )
+        ordered = sorted(
+            ((capture_query.sort_key(note, "timestamp", True), note) for note in notes),
+            key=lambda item: item[0],
+        )
+        middle = ordered[len(ordered) // 2][0]
+        self._record(
+            "capture_query.select_presorted[top20]",
+            lambda: capture_query.select_presorted(ordered, top, True, middle),
+        )
+
+    def bench_iter_note_payloads(self) -> None:
+        self._record(
+            "vault.rglob_sorted",
+            lambda: [path for path in sorted(self.capture_dir.rglob("*.md")) if path.is_file()],
+        )
+        self._record(
+            "vault.walk_markdown[sorted]",
+            lambda: list(walk_markdown(self.capture_dir)),
+        )
+        self._record(
+            "vault.walk_markdown[unsorted]",
+            lambda: list(walk_markdown(self.capture_dir, sort=False)),
+        )
+        self._record(
+            "automation.iter_note_payloads",
+            lambda: list(iter_note_payloads(self.root, self.capture_dir)),
+        )
+
+    def _payload_frontmatters(self) -> List[Dict[str, Any]]:
+        """
+        Build `payload_count` frontmatter dicts cycled from the vault's notes.
+
+        List values are rebuilt with fresh string objects, as a YAML parser
+        would produce them, so interning has something to share.
+        """
+        templates = [automation_read_note(path).frontmatter for path in self.paths[:1000]]
+        frontmatters: List[Dict[str, Any]] = []
+        for index in range(self.payload_count):
+            template = templates[index % len(templates)]
+            frontmatters.append(
+                {
+                    key: [(str(entry) + ".")[:-1] for entry in value] if isinstance(value, list) else value
+                    for key, value in template.items()
+                },
+            )
+        return frontmatters
+
+    def bench_payloads(self) -> None:
+        frontmatters = self._payload_frontmatters()
+        path = self.paths[0]
+
+        def build() -> List[NotePayload]:
+            return [NotePayload(path, frontmatter, "", b"", 0) for frontmatter in frontmatters]
+
+        tracemalloc.start()
+        payloads = build()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        memory = {"peak_bytes": peak, "bytes_per_payload": round(peak / max(len(payloads), 1), 1)}
+
+        samples = measure(build, self.repeat)
+        self.results.append(
+            result_entry("automation.NotePayload.build", samples, {"payloads": len(payloads)}, memory),
+        )
+        probes = ("todo", "TODO", "tag0001", "missing")
+        samples = measure(
+            lambda: [payload.has_tag(tag) for payload in payloads for tag in probes],
+            self.repeat,
+        )
+        self.results.append(
+            result_entry("automation.NotePayload.has_tag", samples, {"payloads": len(payloads), "probes": len(probes)}),
+        )
+
+    def bench_emitter(self) -> None:
+        payloads = list(iter_note_payloads(self.root, self.capture_dir))
+        holder: Dict[str, Any] = {}
+
+        def cold_setup() -> None:
+            holder["store"] = self._fresh_store()
+
+        self._record(
+            "automation.NoteEmitter.refresh[cold]",
+            lambda: NoteEmitter(holder["store"]).refresh(payloads),
+            setup=cold_setup,
+        )
+
+        warm_store = self._fresh_store()
+        emitter = NoteEmitter(warm_store)
+        emitter.refresh(payloads)
+        self._record(
+            "automation.NoteEmitter.refresh[warm]",
+            lambda: emitter.refresh(payloads),
+        )
+        self._record(
+            "automation.NoteEmitter.pending_paths",
+            lambda: emitter.pending_paths("bench"),
+        )
+        selector = Selector.from_options(
+            {"tags": ["todo"], "fields": {"processing_status": "raw"}},
+            self.capture_dir,
+        )
+        self._record(
+            "automation.NoteEmitter.pending_paths[selector]",
+            lambda: emitter.pending_paths("bench", selector),
+        )
+        self._record(
+            "automation.NoteEmitter.pending_for_consumer",
+            lambda: list(emitter.pending_for_consumer("bench")),
+        )
+
+        # A quarter of the notes deleted and another quarter renamed.
+        quarter = len(payloads) // 4
+        renamed = [
+            NotePayload(payload.path.with_name(f"renamed-{payload.path.name}"), payload.frontmatter, payload.note_hash, b"", 0)
+            for payload in payloads[quarter : 2 * quarter]
+        ]
+        survivors = [payload.path for payload in payloads[2 * quarter :]] + [payload.path for payload in renamed]
+
+        def purge_setup() -> None:
+            store = self._fresh_store()
+            NoteEmitter(store).refresh(payloads)
+            store.mark_not_applicable("bench", ((payload.path, payload.note_hash) for payload in payloads))
+            for payload in renamed:
+                store.upsert_note(payload)
+            holder["store"] = store
+
+        self._record(
+            "automation.AutomationStore.purge_missing",
+            lambda: holder["store"].purge_missing(survivors),
+            setup=purge_setup,
+            deleted=quarter,
+            renamed=len(renamed),
+        )
+
+    def _seed_fake_taskwarrior(self, data_dir: Path) -> None:
+        """Populate a fake Taskwarrior store with `existing_tasks` distinct tasks."""
+        data_dir.mkdir(parents=True, exist_ok=True)
+        backend = FakeBackend(data_dir / "fake-tasks.jsonl")
+        backend.import_tasks(
+            [
+                {
+                    "description": f"Existing task {index}",
+                    "tags": [f"tag{index % 200:04d}", "next"],
+                    "project": f"project{index % 25}",
+                }
+                for index in range(self.existing_tasks)
+            ],
+        )
+
+    def _taskwarrior_consumer(self, data_dir: Path) -> TaskWarriorConsumer:
+        global_config = _global_config(self.root, self.capture_dir, self.state_dir)
+        consumer_config = ConsumerConfig(
+            name="taskwarrior",
+            type="taskwarrior",
+            options={
+                "backend": "fake",
+                "data_directory": str(data_dir),
+                "backup": {"enabled": False},
+            },
+        )
+        return TaskWarriorConsumer(consumer_config, global_config)
+
+    def bench_taskwarrior(self) -> None:
+        payloads = list(iter_note_payloads(self.root, self.capture_dir))
+        template = self.state_dir / "taskwarrior-template"
+        self._seed_fake_taskwarrior(template)
+        holder: Dict[str, Any] = {}
+
+        def fresh_data_dir() -> Path:
+            self._db_counter += 1
+            data_dir = self.state_dir / f"taskwarrior-{self._db_counter}"
+            shutil.copytree(template, data_dir)
+            return data_dir
+
+        self._record(
+            "taskwarrior.load[fake]",
+            lambda: self._taskwarrior_consumer(holder["data_dir"]),
+            setup=lambda: holder.update(data_dir=fresh_data_dir()),
+            existing_tasks=self.existing_tasks,
+        )
+
+        def setup() -> None:
+            store = self._fresh_store()
+            emitter = NoteEmitter(store)
+            holder["store"] = store
+            holder["emitter"] = emitter
+            emitter.refresh(payloads)
+            holder["consumer"] = self._taskwarrior_consumer(fresh_data_dir())
+
+        def dispatch() -> None:
+            consumer = holder["consumer"]
+            store = holder["store"]
+            for state in holder["emitter"].pending_for_consumer(consumer.name):
+                if consumer.matches(state):
+                    consumer.handle(state, store)
+
+        self._record(
+            "taskwarrior.dispatch[fake]",
+            dispatch,
+            setup=setup,
+            existing_tasks=self.existing_tasks,
+        )
+
+    def run(self, selected: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        for name in BENCHMARKS:
+            if selected and name not in selected:
+                continue
+            getattr(self, f"bench_{name}")()
+        return self.results
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--notes", type=int, default=2000, help="Synthetic notes to generate.")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SPEC.seed)
+    parser.add_argument("--shape", choices=SHAPES, default=DEFAULT_SPEC.shape)
+    parser.add_argument("--body-words", type=int, default=DEFAULT_SPEC.body_words)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--existing-tasks",
+        type=int,
+        default=10000,
+        help="Tasks pre-loaded into the fake Taskwarrior store (default: 10000).",
+    )
+    parser.add_argument(
+        "--payloads",
+        type=int,
+        default=100000,
+        help="NotePayload objects built by the payloads benchmark (default: 100000).",
+    )
+    parser.add_argument(
+        "--bench",
+        action="append",
+        choices=BENCHMARKS,
+        help="Only run the named benchmark group (repeatable).",
+    )
+    parser.add_argument(
+        "--vault",
+        type=Path,
+        help="Reuse an existing generated vault instead of a temporary one.",
+    )
+    parser.add_argument("--output", type=Path, help="Write JSON results here (default: STDOUT).")
+    args = parser.parse_args(argv)
+
+    spec = VaultSpec(notes=args.notes, seed=args.seed, shape=args.shape, body_words=args.body_words)
+    with tempfile.TemporaryDirectory(prefix="para-bench-") as tmp:
+        root = args.vault or Path(tmp)
+        if args.vault is None or not (root / spec.capture_dir).exists():
+            generate_vault(root, spec)
+        results = Suite(root, spec, args.repeat, args.existing_tasks, args.payloads).run(args.bench)
+
+    params = {
+        "notes": spec.notes,
+        "seed": spec.seed,
+        "shape": spec.shape,
+        "body_words": spec.body_words,
+        "repeat": args.repeat,
+        "existing_tasks": args.existing_tasks,
+        "payloads": args.payloads,
+    }
+    write_report(build_report("python-tooling", results, params), args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""Deterministic synthetic capture-vault generator for benchmarks."""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+WORDS = (
+    "capture inbox project area resource archive review weekly plan idea task "
+    "meeting note draft research paper reading follow up call email budget "
+    "design prototype release bug feature refactor deploy garden health travel"
+).split()
+
+MODALITIES = ("text", "audio", "image", "video", "clipboard")
+CONTEXTS = ("home", "work", "commute", "errand", "deep-work", "phone")
+SOURCES = ("obsidian", "web", "mobile", "email", "voice")
+CITIES = ("Champaign", "Chicago", "Urbana", "Seattle", "Berlin")
+STATUSES = ("raw", "raw", "raw", "organized", "archived")
+
+SHAPES = ("minimal", "capture")
+
+
+@dataclass(slots=True)
+class VaultSpec:
+    """Parameters describing a synthetic capture vault."""
+
+    notes: int = 1000
+    seed: int = 1234
+    shape: str = "capture"
+    body_words: int = 80
+    tags_per_note: int = 3
+    tag_cardinality: int = 50
+    todo_ratio: float = 0.1
+    subdirs: int = 0
+    capture_dir: str = "capture/raw_capture"
+
+
+DEFAULT_SPEC = VaultSpec()
+
+
+def _timestamp(rng: random.Random) -> datetime:
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return base + timedelta(seconds=rng.randrange(0, 2 * 365 * 24 * 3600))
+
+
+def _tags(rng: random.Random, spec: VaultSpec) -> List[str]:
+    pool = [f"tag{index:04d}" for index in range(max(spec.tag_cardinality, 1))]
+    count = min(spec.tags_per_note, len(pool))
+    tags = rng.sample(pool, count)
+    if rng.random() < spec.todo_ratio:
+        tags.append("todo")
+        tags.append(f"project:{rng.choice(WORDS)}")
+    return tags
+
+
+def _yaml_list(values: Sequence[str]) -> str:
+    return "[" + ", ".join(values) + "]"
+
+
+def _frontmatter(rng: random.Random, spec: VaultSpec, index: int) -> List[str]:
+    stamp = _timestamp(rng)
+    tags = _tags(rng, spec)
+    lines = [f"id: note-{index:06d}", f"tags: {_yaml_list(tags)}"]
+    if spec.shape == "minimal":
+        return lines
+    edited = stamp + timedelta(days=rng.randrange(0, 30))
+    lines.extend(
+        [
+            f'timestamp: "{stamp.isoformat()}"',
+            f'capture_id: "{stamp.isoformat()}"',
+            f"aliases: [{rng.choice(WORDS)}-{index}]",
+            f"modalities: {_yaml_list(rng.sample(MODALITIES, rng.randint(1, 2)))}",
+            f"context: {_yaml_list(rng.sample(CONTEXTS, rng.randint(1, 2)))}",
+            f"sources: {_yaml_list(rng.sample(SOURCES, 1))}",
+            "location:",
+            f"  city: {rng.choice(CITIES)}",
+            f"  latitude: {rng.uniform(-90, 90):.4f}",
+            f"  longitude: {rng.uniform(-180, 180):.4f}",
+            "metadata:",
+            f"  source: {rng.choice(SOURCES)}",
+            f"  device: device-{rng.randrange(5)}",
+            f"processing_status: {rng.choice(STATUSES)}",
+            f'created_date: "{stamp.date().isoformat()}"',
+            f'last_edited_date: "{edited.date().isoformat()}"',
+        ],
+    )
+    return lines
+
+
+def _body(rng: random.Random, spec: VaultSpec) -> str:
+    words = [rng.choice(WORDS) for _ in range(max(spec.body_words, 1))]
+    lines: List[str] = ["## Content", ""]
+    for start in range(0, len(words), 12):
+        lines.append(" ".join(words[start : start + 12]))
+    return "\n".join(lines) + "\n"
+
+
+def render_note(spec: VaultSpec, index: int) -> str:
+    """Render note `index` of `spec`; identical inputs always give identical text."""
+    rng = random.Random(f"{spec.seed}:{index}")
+    frontmatter = "\n".join(_frontmatter(rng, spec, index))
+    return f"---\n{frontmatter}\n---\n{_body(rng, spec)}"
+
+
+def generate_vault(root: Path, spec: VaultSpec) -> Dict[str, object]:
+    """
+    Write a synthetic vault under `root`.
+
+    Returns:
+        Summary with the capture directory, note count and total bytes written.
+    """
+    if spec.shape not in SHAPES:
+        raise ValueError(f"Unknown frontmatter shape '{spec.shape}' (expected one of {SHAPES}).")
+    capture_dir = root / spec.capture_dir
+    capture_dir.mkdir(parents=True, exist_ok=True)
+    total_bytes = 0
+    for index in range(spec.notes):
+        directory = capture_dir
+        if spec.subdirs:
+            directory = capture_dir / f"batch{index % spec.subdirs:03d}"
+            directory.mkdir(exist_ok=True)
+        data = render_note(spec, index).encode("utf-8")
+        (directory / f"capture-{index:06d}.md").write_bytes(data)
+        total_bytes += len(data)
+    return {"capture_dir": str(capture_dir), "notes": spec.notes, "bytes": total_bytes}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("root", type=Path, help="Vault root to populate.")
+    parser.add_argument("--notes", type=int, default=DEFAULT_SPEC.notes)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SPEC.seed)
+    parser.add_argument("--shape", choices=SHAPES, default=DEFAULT_SPEC.shape)
+    parser.add_argument("--body-words", type=int, default=DEFAULT_SPEC.body_words)
+    parser.add_argument("--tags-per-note", type=int, default=DEFAULT_SPEC.tags_per_note)
+    parser.add_argument("--tag-cardinality", type=int, default=DEFAULT_SPEC.tag_cardinality)
+    parser.add_argument("--todo-ratio", type=float, default=DEFAULT_SPEC.todo_ratio)
+    parser.add_argument("--subdirs", type=int, default=DEFAULT_SPEC.subdirs)
+    args = parser.parse_args(argv)
+
+    spec = VaultSpec(
+        notes=args.notes,
+        seed=args.seed,
+        shape=args.shape,
+        body_words=args.body_words,
+        tags_per_note=args.tags_per_note,
+        tag_cardinality=args.tag_cardinality,
+        todo_ratio=args.todo_ratio,
+        subdirs=args.subdirs,
+    )
+    summary = generate_vault(args.root, spec)
+    print(f"Wrote {summary['notes']} notes ({summary['bytes']} bytes) to {summary['capture_dir']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
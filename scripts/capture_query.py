@@ -2,70 +2,86 @@
 """Query raw capture notes using flexible filters for automation pipelines."""
 from __future__ import annotations
 
-import argparse
-import json
+import os
 import sys
-from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    TextIO,
+    Tuple,
+)
 
-try:
-    import yaml
-except ImportError as exc:  # pragma: no cover - dependency hint
-    sys.stderr.write(
-        "capture_query.py requires PyYAML (pip install pyyaml) to parse note frontmatter.\n",
-    )
-    raise SystemExit(2) from exc
+if TYPE_CHECKING:  # pragma: no cover - imported lazily at runtime
+    import argparse
+    import socket
 
+    from scripts.vault.index import FileStamp, ParseCache
+    from scripts.vault.index import ParsedNote as Note
 
-class FrontmatterLoader(yaml.SafeLoader):
-    """YAML loader that keeps timestamp-like scalars as strings."""
+if __package__ in (None, ""):
+    # Allow `python scripts/capture_query.py` to import sibling packages.
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
+SOCKET_ENV = "CAPTURE_QUERY_SOCKET"
+# Exit status a server uses when asked about a vault it does not serve.
+SERVER_WRONG_VAULT = 3
 
-# Remove the implicit resolver for timestamps so ISO strings stay as text.
-for ch, resolvers in list(FrontmatterLoader.yaml_implicit_resolvers.items()):
-    FrontmatterLoader.yaml_implicit_resolvers[ch] = [
-        (tag, regexp) for tag, regexp in resolvers if tag != "tag:yaml.org,2002:timestamp"
-    ]
+# PyYAML and the timestamp-less loader are created on first use so that
+# `--help`, `--version` and server-forwarded queries never pay for them.
+_yaml_module: Any = None
 
 
-def yaml_load(text: str) -> Dict[str, Any]:
-    if not text.strip():
-        return {}
-    data = yaml.load(text, Loader=FrontmatterLoader)
-    if data is None:
-        return {}
-    if not isinstance(data, dict):
-        raise ValueError("Frontmatter must parse to a mapping")
-    return data
-
-
-@dataclass
-class Note:
-    path: Path
-    frontmatter: Dict[str, Any]
-    content: str
-    raw_text: str
-
-
-def read_note(path: Path) -> Note:
-    raw = path.read_text(encoding="utf-8")
-    frontmatter: Dict[str, Any] = {}
-    content = raw
-
-    if raw.startswith("---"):
-        lines = raw.splitlines(keepends=True)
-        if len(lines) > 0 and lines[0].strip() == "---":
-            closing_idx: Optional[int] = None
-            for idx in range(1, len(lines)):
-                if lines[idx].strip() == "---":
-                    closing_idx = idx
-                    break
-            if closing_idx is not None:
-                fm_text = "".join(lines[1:closing_idx])
-                frontmatter = yaml_load(fm_text)
-                content = "".join(lines[closing_idx + 1 :])
-    return Note(path=path, frontmatter=frontmatter, content=content, raw_text=raw)
+def load_yaml_module() -> Any:
+    global _yaml_module
+    if _yaml_module is None:
+        try:
+            import yaml
+        except ImportError as exc:  # pragma: no cover - dependency hint
+            sys.stderr.write(
+                "capture_query.py requires PyYAML (pip install pyyaml) to parse note frontmatter.\n",
+            )
+            raise SystemExit(2) from exc
+        _yaml_module = yaml
+    return _yaml_module
+
+
+def frontmatter_loader() -> Any:
+    """Return a YAML loader that keeps timestamp-like scalars as strings."""
+    load_yaml_module()
+    from scripts.vault.frontmatter import frontmatter_loader as shared_loader
+
+    return shared_loader()
+
+
+def read_note(path: Path, cache: Optional[ParseCache] = None, keep_bytes: bool = False) -> Note:
+    """
+    Parse one note through the shared core in `scripts.vault.index`.
+
+    With a `cache`, unchanged notes skip the YAML parse and their bodies are
+    only read if a content filter or the output format needs them.
+    """
+    load_yaml_module()
+    from scripts.vault.index import load_note
+
+    return load_note(path, cache, keep_bytes)
+
+
+def open_cache(args: argparse.Namespace) -> Optional[ParseCache]:
+    """Open the parse cache selected by --cache/--no-cache (None when disabled)."""
+    if args.no_cache:
+        return None
+    from scripts.vault.index import ParseCache, default_cache_path
+
+    return ParseCache.open(args.cache.expanduser() if args.cache else default_cache_path())
 
 
 def ensure_list(value: Any) -> List[Any]:
@@ -83,6 +99,8 @@ def normalize_str_list(values: Optional[Sequence[Any]]) -> List[str]:
 
 
 def parse_key_value(expr: str) -> Tuple[str, str]:
+    import argparse
+
     if "=" not in expr:
         raise argparse.ArgumentTypeError(f"Expected KEY=VALUE, got: {expr}")
     key, value = expr.split("=", 1)
@@ -94,8 +112,9 @@ def parse_key_value(expr: str) -> Tuple[str, str]:
 
 
 def parse_value(value: str) -> Any:
+    yaml = load_yaml_module()
     try:
-        loaded = yaml.load(value, Loader=FrontmatterLoader)
+        loaded = yaml.load(value, Loader=frontmatter_loader())
     except yaml.YAMLError:
         return value
     return loaded
@@ -111,8 +130,91 @@ def get_by_path(data: Dict[str, Any], path: Sequence[str]) -> Any:
     return current
 
 
-@dataclass
-class Filters:
+def literal_trie_pattern(words: Iterable[str]) -> str:
+    """
+    Build one regex matching any of `words`, factored by common prefix.
+
+    Alternatives at each trie node differ in their first character, so the
+    regex engine rejects a position after one comparison per branch instead of
+    trying every word, and the optional tails make each match the longest
+    word starting there.
+    """
+    import re
+
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node: Dict[str, Any]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            return f"(?:{body})?"
+        return body
+
+    return build(trie)
+
+
+class ContentMatcher:
+    """
+    Match note bodies against --search/--search-any needles.
+
+    Every `required` needle and at least one `optional` needle must occur.
+    All patterns are prepared once per query: literal needles are case-folded
+    up front and the optional ones are merged into a single prefix-trie regex,
+    so one scan answers `--search-any` however many values it has. Literal
+    matching folds each body once: a C-speed copy that lets the regex engine
+    use its fast literal search, where IGNORECASE is several times slower on
+    notes that do not match (see the `matches_filters[..., ignorecase]`
+    benchmarks). With `regex=True`, optional patterns are joined by
+    alternation and required ones are compiled individually, honouring
+    IGNORECASE unless `case_sensitive` is set.
+    """
+
+    def __init__(
+        self,
+        required: Sequence[str],
+        optional: Sequence[str],
+        regex: bool = False,
+        case_sensitive: bool = False,
+    ) -> None:
+        import re
+
+        self.regex = regex
+        self.case_sensitive = case_sensitive
+        required = [needle for needle in dict.fromkeys(required) if needle]
+        optional = [needle for needle in dict.fromkeys(optional) if needle]
+        self._any: Any = None
+        if regex:
+            flags = 0 if case_sensitive else re.IGNORECASE
+            self._all: List[Any] = [re.compile(pattern, flags) for pattern in required]
+            if optional:
+                self._any = re.compile("|".join(f"(?:{pattern})" for pattern in optional), flags)
+            return
+        if not case_sensitive:
+            required = [needle.lower() for needle in required]
+            optional = [needle.lower() for needle in optional]
+        self._needles = list(dict.fromkeys(required))
+        if optional:
+            self._any = re.compile(literal_trie_pattern(optional))
+
+    def __call__(self, text: str) -> bool:
+        if self.regex:
+            if self._any is not None and self._any.search(text) is None:
+                return False
+            return all(pattern.search(text) is not None for pattern in self._all)
+        haystack = text if self.case_sensitive else text.lower()
+        if self._any is not None and self._any.search(haystack) is None:
+            return False
+        return all(needle in haystack for needle in self._needles)
+
+
+class Filters(NamedTuple):
     any_tags: List[str]
     require_all_tags: bool
     timestamps: List[str]
@@ -129,15 +231,23 @@ class Filters:
     ids: List[str]
     aliases: List[str]
     where_clauses: List[Tuple[List[str], Any]]
-    contains: List[str]
     case_sensitive: bool
     limit: Optional[int]
+    content: Optional[ContentMatcher] = None
 
 
 def build_filters(args: argparse.Namespace) -> Filters:
     where: List[Tuple[List[str], Any]] = []
     for key, value in args.where or []:
         where.append((key.split("."), parse_value(value)))
+    content = None
+    if args.search or args.search_any:
+        content = ContentMatcher(
+            normalize_str_list(args.search),
+            normalize_str_list(args.search_any),
+            regex=args.regex,
+            case_sensitive=args.case_sensitive,
+        )
     filters = Filters(
         any_tags=normalize_str_list(args.tag),
         require_all_tags=args.require_all_tags,
@@ -155,9 +265,9 @@ def build_filters(args: argparse.Namespace) -> Filters:
         ids=normalize_str_list(args.id),
         aliases=normalize_str_list(args.alias),
         where_clauses=where,
-        contains=normalize_str_list(args.search),
         case_sensitive=args.case_sensitive,
         limit=args.limit,
+        content=content,
     )
     return filters
 
@@ -248,50 +358,141 @@ def matches_filters(note: Note, filters: Filters) -> bool:
             if str(actual) != str(expected):
                 return False
 
-    if filters.contains:
-        haystack = note.content if filters.case_sensitive else note.content.lower()
-        for needle in filters.contains:
-            probe = needle if filters.case_sensitive else needle.lower()
-            if probe not in haystack:
-                return False
+    if filters.content is not None and not filters.content(note.content):
+        return False
 
     return True
 
 
-def iter_notes(capture_dir: Path) -> Iterable[Note]:
-    if not capture_dir.exists():
-        raise FileNotFoundError(f"Capture directory not found: {capture_dir}")
-    for path in sorted(capture_dir.rglob("*.md")):
-        if path.is_file():
-            yield read_note(path)
+def iter_notes(
+    capture_dir: Path,
+    ignore: Optional[Sequence[str]] = None,
+    sort: bool = True,
+    archive_dir: Optional[Path] = None,
+    cache: Optional[ParseCache] = None,
+) -> Iterable[Note]:
+    """
+    Yield loose notes and, when `archive_dir` holds an archive, packed notes.
+
+    A loose file shadows a packed note with the same path. With `sort`, both
+    streams are merged in path order. Loose notes go through `cache`.
+    """
+    load_yaml_module()
+    from scripts.vault.index import CaptureIndex
+    from scripts.vault.walk import DEFAULT_IGNORES, is_ignored_path
 
+    captures = CaptureIndex(capture_dir, DEFAULT_IGNORES if ignore is None else ignore, cache)
+    ignore = captures.ignore
+    loose = captures.paths(sort)
+    index = open_archive(archive_dir)
+    if index is None:
+        for path in loose:
+            yield captures.load(path)
+        return
 
-def output_notes(notes: List[Note], fmt: str) -> None:
+    packed = [
+        (capture_dir / entry.path, entry)
+        for entry in index
+        if not is_ignored_path(capture_dir / entry.path, capture_dir, ignore)
+    ]
+    if not sort:
+        seen: Set[Path] = set()
+        for path in loose:
+            seen.add(path)
+            yield captures.load(path)
+        for path, entry in packed:
+            if path not in seen:
+                yield packed_note(index, path, entry)
+        return
+
+    import heapq
+
+    packed.sort(key=lambda item: item[0])
+    # Loose files sort before packed copies of the same path (False < True).
+    merged = heapq.merge(
+        ((path, False, None) for path in loose),
+        ((path, True, entry) for path, entry in packed),
+        key=lambda item: (item[0], item[1]),
+    )
+    previous: Optional[Path] = None
+    for path, is_packed, entry in merged:
+        if path == previous:
+            continue
+        previous = path
+        yield packed_note(index, path, entry) if is_packed else captures.load(path)
+
+
+def open_archive(archive_dir: Optional[Path]) -> Any:
+    """Return an `ArchiveIndex` for `archive_dir`, or None when there is no archive."""
+    if archive_dir is None or not archive_dir.is_dir():
+        return None
+    from scripts.vault.archive import ArchiveIndex
+
+    index = ArchiveIndex(archive_dir)
+    return index if len(index) else None
+
+
+def packed_note(index: Any, path: Path, entry: Any) -> Note:
+    """
+    Build one packed note from its index entry; nothing is decompressed until
+    a content filter or the output format reads the body.
+    """
+    from scripts.vault.archive import PackedNote
+
+    return PackedNote.from_entry(index, path, entry)
+
+
+def ignore_patterns(extra: Optional[Sequence[str]]) -> Tuple[str, ...]:
+    """Default ignore globs plus any given with --ignore."""
+    from scripts.vault.walk import DEFAULT_IGNORES
+
+    return DEFAULT_IGNORES + tuple(extra or ())
+
+
+def output_notes(notes: List[Note], fmt: str, out: Optional[TextIO] = None) -> None:
+    import json
+
+    out = out or sys.stdout
     for idx, note in enumerate(notes):
         if fmt == "markdown":
-            sys.stdout.write(note.raw_text.rstrip("\n"))
-            sys.stdout.write("\n")
+            out.write(note.raw_text.rstrip("\n"))
+            out.write("\n")
             if idx != len(notes) - 1:
-                sys.stdout.write("\n")
+                out.write("\n")
         elif fmt == "content":
-            sys.stdout.write(note.content.rstrip("\n"))
-            sys.stdout.write("\n")
+            out.write(note.content.rstrip("\n"))
+            out.write("\n")
             if idx != len(notes) - 1:
-                sys.stdout.write("\n")
+                out.write("\n")
         elif fmt == "paths":
-            sys.stdout.write(f"{note.path}\n")
+            out.write(f"{note.path}\n")
         elif fmt == "json":
             payload = {
                 "path": str(note.path),
                 "frontmatter": note.frontmatter,
                 "content": note.content,
             }
-            sys.stdout.write(json.dumps(payload, ensure_ascii=False) + "\n")
+            out.write(json.dumps(payload, ensure_ascii=False) + "\n")
         else:
             raise ValueError(f"Unsupported format: {fmt}")
 
 
+def add_cache_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--cache",
+        type=Path,
+        metavar="PATH",
+        help=(
+            "Parse cache shared with scripts.automation (default: $PARA_ORGANIZE_CACHE or "
+            "$XDG_CACHE_HOME/para-organize/notes.sqlite)."
+        ),
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Parse every note without the parse cache.")
+
+
 def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    import argparse
+
     parser = argparse.ArgumentParser(
         description=(
             "Search frontmatter-driven capture notes like a lightweight database. "
@@ -300,7 +501,7 @@ def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
     )
     parser.add_argument(
         "--root",
-        default=Path.cwd(),
+        default=Path("."),
         type=Path,
         help="Vault root directory; defaults to current working directory.",
     )
@@ -310,6 +511,31 @@ def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
         type=Path,
         help="Relative or absolute path to the raw capture folder.",
     )
+    parser.add_argument(
+        "--archive-dir",
+        default=Path("capture/archive"),
+        type=Path,
+        help=(
+            "Archive of packed notes (from `python -m scripts.automation.cli archive`), "
+            "relative to --root unless absolute; read when present."
+        ),
+    )
+    parser.add_argument(
+        "--ignore",
+        action="append",
+        metavar="GLOB",
+        help=(
+            "Skip files or directories matching GLOB (repeatable). Globs without '/' "
+            "match names at any depth; others match paths relative to the capture folder. "
+            ".git and .trash are always skipped."
+        ),
+    )
+    parser.add_argument(
+        "--unsorted",
+        action="store_true",
+        help="Emit notes in filesystem order instead of sorting by path (streams sooner).",
+    )
+    add_cache_arguments(parser)
     parser.add_argument(
         "--timestamp",
         action="append",
@@ -416,12 +642,24 @@ def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
     parser.add_argument(
         "--search",
         action="append",
-        help="Substring match against the Markdown content. Repeatable.",
+        help="Substring match against the Markdown content. Repeatable; every value must match.",
+    )
+    parser.add_argument(
+        "--search-any",
+        dest="search_any",
+        action="append",
+        metavar="TEXT",
+        help="Match notes whose content contains at least one of these values. Repeatable.",
+    )
+    parser.add_argument(
+        "--regex",
+        action="store_true",
+        help="Treat --search and --search-any values as Python regular expressions.",
     )
     parser.add_argument(
         "--case-sensitive",
         action="store_true",
-        help="Make --search comparisons case-sensitive.",
+        help="Make --search/--search-any comparisons case-sensitive.",
     )
     parser.add_argument(
         "--format",
@@ -434,6 +672,48 @@ def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
         type=int,
         help="Stop after emitting N matches.",
     )
+    parser.add_argument(
+        "--sort-by",
+        dest="sort_by",
+        metavar="FIELD",
+        help=(
+            "Order matches by a dotted frontmatter field (e.g., timestamp, metadata.source) "
+            "or 'path'. With --limit only the top N are kept in memory."
+        ),
+    )
+    parser.add_argument(
+        "--desc",
+        action="store_true",
+        help="Sort in descending order (newest first for timestamps).",
+    )
+    parser.add_argument(
+        "--after",
+        metavar="CURSOR",
+        help="Resume after the cursor printed to STDERR by a previous --limit query.",
+    )
+    parser.add_argument(
+        "--follow",
+        action="store_true",
+        help=(
+            "After the initial results, keep watching the capture folder and print "
+            "notes that are created or modified and match the filters."
+        ),
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=2.0,
+        metavar="SECONDS",
+        help="Rescan interval for --follow where inotify is unavailable (default: 2).",
+    )
+    parser.add_argument(
+        "--server",
+        metavar="SOCKET",
+        help=(
+            "Forward the query to a running `capture_query.py serve` instance "
+            f"(also read from ${SOCKET_ENV}); falls back to a local scan when unreachable."
+        ),
+    )
     parser.add_argument(
         "--version",
         action="version",
@@ -442,6 +722,15 @@ def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
 
     args = parser.parse_args(argv)
 
+    if args.regex:
+        import re
+
+        for pattern in (args.search or []) + (args.search_any or []):
+            try:
+                re.compile(pattern)
+            except re.error as exc:
+                parser.error(f"invalid regular expression {pattern!r}: {exc}")
+
     # Expand convenience filters into the generic where clause list.
     if args.location:
         args.where = (args.where or []) + [
@@ -455,28 +744,744 @@ def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
     return args
 
 
-def main(argv: Optional[Sequence[str]] = None) -> int:
-    args = parse_args(argv)
-    capture_dir = args.capture_dir
-    if not capture_dir.is_absolute():
-        capture_dir = (args.root / capture_dir).resolve()
+def resolve_capture_dir(root: Path, capture_dir: Path) -> Path:
+    if capture_dir.is_absolute():
+        return capture_dir
+    return (root / capture_dir).resolve()
+
+
+SortKey = Tuple[Any, ...]
+# Bump when the layout of sort keys (and therefore cursors) changes.
+CURSOR_VERSION = 1
+
+
+def sort_key(note: Note, field: Optional[str], desc: bool = False) -> SortKey:
+    """
+    Total order for notes by a dotted frontmatter field (or `path`).
+
+    Keys are `(missing, kind, value, path)`: numbers compare numerically and
+    everything else as text, the path breaks ties, and notes without the
+    field come last in both directions.
+    """
+    path = str(note.path)
+    value: Any = path if field in (None, "path") else get_by_path(note.frontmatter, field.split("."))
+    missing = value is None or value == [] or value == ""
+    if missing:
+        return (int(not desc), 0, "", path)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (int(desc), 0, float(value), path)
+    if isinstance(value, list):
+        value = ", ".join(str(item) for item in value)
+    return (int(desc), 1, str(value), path)
+
+
+def encode_cursor(field: Optional[str], desc: bool, key: SortKey) -> str:
+    import base64
+    import json
+
+    payload = {"v": CURSOR_VERSION, "sort": field or "path", "desc": desc, "key": list(key)}
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
 
+
+def decode_cursor(token: str, field: Optional[str], desc: bool) -> SortKey:
+    """Return the sort key stored in a cursor, checking it belongs to this ordering."""
+    import base64
+    import json
+
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw.decode("utf-8"))
+        key = tuple(payload["key"])
+    except (ValueError, KeyError, TypeError) as exc:
+        raise ValueError("Malformed --after cursor") from exc
+    if payload.get("v") != CURSOR_VERSION or len(key) != 4:
+        raise ValueError("Unsupported --after cursor version")
+    if payload.get("sort") != (field or "path") or bool(payload.get("desc")) != desc:
+        raise ValueError(
+            f"--after cursor was issued for --sort-by {payload.get('sort')}"
+            f"{' --desc' if payload.get('desc') else ''}",
+        )
+    return key
+
+
+def select_notes(
+    notes: Iterable[Note],
+    filters: Filters,
+    field: Optional[str],
+    desc: bool,
+    after: Optional[SortKey],
+) -> List[Tuple[SortKey, Note]]:
+    """
+    Return matches in sort order, after `after`, bounded by `filters.limit`.
+
+    With a limit only `limit` candidates are held at once (heapq's bounded
+    selection); without one every match is sorted.
+    """
+    import heapq
+
+    def candidates() -> Iterable[Tuple[SortKey, Note]]:
+        for note in notes:
+            if not matches_filters(note, filters):
+                continue
+            key = sort_key(note, field, desc)
+            if after is not None and (key <= after if not desc else key >= after):
+                continue
+            yield key, note
+
+    by_key = lambda item: item[0]  # noqa: E731 - keys are unique (path tiebreak)
+    if filters.limit:
+        pick = heapq.nlargest if desc else heapq.nsmallest
+        return pick(filters.limit, candidates(), key=by_key)
+    return sorted(candidates(), key=by_key, reverse=desc)
+
+
+def select_presorted(
+    ordered: Sequence[Tuple[SortKey, Note]],
+    filters: Filters,
+    desc: bool,
+    after: Optional[SortKey],
+) -> List[Tuple[SortKey, Note]]:
+    """
+    Page through notes already sorted ascending by their sort key, starting
+    right after the cursor found by bisection (walked backwards for --desc).
+    """
+    import bisect
+
+    by_key = lambda item: item[0]  # noqa: E731
+    if desc:
+        end = len(ordered) if after is None else bisect.bisect_left(ordered, after, key=by_key)
+        indices: Iterable[int] = range(end - 1, -1, -1)
+    else:
+        start = 0 if after is None else bisect.bisect_right(ordered, after, key=by_key)
+        indices = range(start, len(ordered))
+    selected: List[Tuple[SortKey, Note]] = []
+    for index in indices:
+        key, note = ordered[index]
+        if matches_filters(note, filters):
+            selected.append((key, note))
+            if filters.limit and len(selected) >= filters.limit:
+                break
+    return selected
+
+
+def run_query(
+    args: argparse.Namespace,
+    notes: Iterable[Note],
+    out: Optional[TextIO] = None,
+    ordered: Optional[Callable[[Optional[str], bool], Sequence[Tuple[SortKey, Note]]]] = None,
+) -> int:
+    """
+    Filter, order and print notes.
+
+    Args:
+        notes: Notes in path order (or filesystem order with --unsorted).
+        ordered: Optional provider of notes sorted ascending by their
+            `(field, desc)` sort keys, e.g. the server's cached index; used
+            instead of sorting `notes` when --sort-by, --desc or --after is
+            given.
+    """
     filters = build_filters(args)
+    field, desc = args.sort_by, args.desc
+    try:
+        after = decode_cursor(args.after, field, desc) if args.after else None
+    except ValueError as exc:
+        sys.stderr.write(f"Error: {exc}\n")
+        return 2
 
-    matches: List[Note] = []
+    streaming = field is None and after is None and not desc
     try:
-        for note in iter_notes(capture_dir):
-            if matches_filters(note, filters):
-                matches.append(note)
-                if filters.limit and len(matches) >= filters.limit:
-                    break
+        if streaming:
+            matches = []
+            for note in notes:
+                if matches_filters(note, filters):
+                    matches.append((None, note))
+                    if filters.limit and len(matches) >= filters.limit:
+                        break
+        elif ordered is not None:
+            matches = select_presorted(ordered(field, desc), filters, desc, after)
+        else:
+            matches = select_notes(notes, filters, field, desc, after)
     except FileNotFoundError as exc:
         sys.stderr.write(f"Error: {exc}\n")
         return 2
 
-    output_notes(matches, args.format)
+    output_notes([note for _, note in matches], args.format, out)
+    # Only paged queries (--sort-by, --desc or --after) get a cursor; a plain
+    # --limit keeps stderr quiet for scripts.
+    if filters.limit and len(matches) >= filters.limit and not streaming:
+        last_key = matches[-1][0] or sort_key(matches[-1][1], field, desc)
+        sys.stderr.write(f"Next page: --after {encode_cursor(field, desc, last_key)}\n")
     return 0
 
 
+# ----------------------------------------------------------------------------
+# Follow mode
+
+# Time given to a burst of inotify events (editors write in several steps)
+# before the changed files are read.
+FOLLOW_SETTLE_SECONDS = 0.1
+
+
+class FollowOutput:
+    """Stdout wrapper that remembers whether the initial results printed anything."""
+
+    def __init__(self, stream: TextIO) -> None:
+        self.stream = stream
+        self.written = False
+
+    def write(self, text: str) -> int:
+        self.written = True
+        return self.stream.write(text)
+
+
+def file_stamp(path: Path) -> Optional[FileStamp]:
+    """`FileStamp` of a regular file, or None when it is gone or not a file."""
+    import stat as stat_module
+
+    from scripts.vault.index import FileStamp
+
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    if not stat_module.S_ISREG(stat.st_mode):
+        return None
+    return FileStamp.of(stat)
+
+
+def snapshot_stamps(capture_dir: Path, ignore: Sequence[str]) -> Dict[Path, FileStamp]:
+    from scripts.vault.walk import walk_markdown
+
+    stamps: Dict[Path, FileStamp] = {}
+    for path in walk_markdown(capture_dir, ignore, sort=False):
+        stamp = file_stamp(path)
+        if stamp is not None:
+            stamps[path] = stamp
+    return stamps
+
+
+def changed_candidates(
+    changed: Set[Path],
+    capture_dir: Path,
+    ignore: Sequence[str],
+    stamps: Dict[Path, FileStamp],
+) -> Set[Path]:
+    """Expand watcher output into note paths to re-check, forgetting removed ones."""
+    from scripts.vault.walk import is_ignored_path, walk_markdown
+
+    candidates: Set[Path] = set()
+    for path in changed:
+        if is_ignored_path(path, capture_dir, ignore):
+            continue
+        if path.is_dir():
+            candidates.update(
+                child
+                for child in walk_markdown(path, ignore, sort=False)
+                if not is_ignored_path(child, capture_dir, ignore)
+            )
+        elif path.suffix == ".md":
+            candidates.add(path)
+        elif not path.exists():
+            for known in [known for known in stamps if path in known.parents]:
+                del stamps[known]
+    return candidates
+
+
+def follow_notes(
+    args: argparse.Namespace,
+    capture_dir: Path,
+    watcher: Any,
+    stamps: Dict[Path, FileStamp],
+    cache: Optional[ParseCache] = None,
+    printed: bool = True,
+) -> int:
+    """
+    Print notes created or modified after the initial query, until interrupted.
+
+    `stamps` holds the `FileStamp` of every note as of the initial
+    query; a note is printed again only when its stamp changes. Blocks in
+    the watcher between changes, so an idle follower costs no CPU with
+    inotify and one stat walk per poll interval without it. Removals are
+    not reported, and --limit/--sort-by only apply to the initial results.
+    """
+    import time
+
+    filters = build_filters(args)._replace(limit=None)
+    ignore = ignore_patterns(args.ignore)
+    separate = args.format in ("markdown", "content")
+    while True:
+        changed = watcher.wait()
+        if watcher.fileno() is not None:
+            while changed is not None:
+                time.sleep(FOLLOW_SETTLE_SECONDS)
+                more = watcher.read_events()
+                if not more:
+                    changed = None if more is None else changed
+                    break
+                changed |= more
+        if changed is None:
+            # Events were lost; diff a fresh snapshot instead.
+            fresh = snapshot_stamps(capture_dir, ignore)
+            for gone in [path for path in stamps if path not in fresh]:
+                del stamps[gone]
+            candidates = set(fresh)
+        else:
+            candidates = changed_candidates(changed, capture_dir, ignore, stamps)
+
+        batch: List[Note] = []
+        for path in sorted(candidates):
+            stamp = file_stamp(path)
+            if stamp is None:
+                stamps.pop(path, None)
+                continue
+            if stamps.get(path) == stamp:
+                continue
+            stamps[path] = stamp
+            try:
+                note = read_note(path, cache)
+            except (OSError, UnicodeDecodeError, ValueError, load_yaml_module().YAMLError) as exc:
+                sys.stderr.write(f"Warning: skipping {path}: {exc}\n")
+                continue
+            if matches_filters(note, filters):
+                batch.append(note)
+        if cache is not None:
+            cache.flush()
+        if not batch:
+            continue
+        if printed and separate:
+            sys.stdout.write("\n")
+        output_notes(batch, args.format)
+        sys.stdout.flush()
+        printed = True
+
+
+# ----------------------------------------------------------------------------
+# Server mode
+
+
+def default_socket_path() -> Path:
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return Path(runtime_dir) / "para-organize" / "capture-query.sock"
+    import tempfile
+
+    return Path(tempfile.gettempdir()) / f"para-organize-{os.getuid()}" / "capture-query.sock"
+
+
+class VaultModel:
+    """In-memory copy of the capture folder, refreshed from watcher events."""
+
+    def __init__(
+        self,
+        capture_dir: Path,
+        ignore: Sequence[str] = (),
+        archive_dir: Optional[Path] = None,
+        cache: Optional[ParseCache] = None,
+    ) -> None:
+        self.capture_dir = capture_dir
+        self.ignore = tuple(ignore)
+        self.archive_dir = archive_dir
+        self.cache = cache
+        self._notes: Dict[Path, Tuple[FileStamp, Note]] = {}
+        self._packed: Dict[Path, Note] = {}
+        self._archive: Any = None
+        self._ordered: Optional[List[Note]] = None
+        # Sort orders built from one `_ordered` snapshot, keyed by (field, desc).
+        self._sorted: Dict[Tuple[Optional[str], bool], List[Tuple[SortKey, Note]]] = {}
+        self._sorted_from: Optional[List[Note]] = None
+
+    def reload(self) -> None:
+        from scripts.vault.walk import walk_markdown
+
+        self._notes.clear()
+        self._packed.clear()
+        self._archive = None
+        self._ordered = None
+        for path in walk_markdown(self.capture_dir, self.ignore, sort=False):
+            self._refresh_path(path)
+        self._refresh_archive()
+        if self.cache is not None:
+            self.cache.flush()
+
+    def _refresh_archive(self) -> None:
+        """Pick up notes packed since the last call (the index is append-only)."""
+        from scripts.vault.walk import is_ignored_path
+
+        if self._archive is None:
+            self._archive = open_archive(self.archive_dir)
+            entries = list(self._archive) if self._archive is not None else []
+        else:
+            entries = self._archive.refresh()
+        for entry in entries:
+            path = self.capture_dir / entry.path
+            if is_ignored_path(path, self.capture_dir, self.ignore):
+                continue
+            self._packed[path] = packed_note(self._archive, path, entry)
+            self._ordered = None
+
+    def apply(self, changed: Optional[Set[Path]]) -> None:
+        """Apply watcher output; `None` means events were lost and forces a reload."""
+        from scripts.vault.walk import is_ignored_path, walk_markdown
+
+        if changed is None:
+            self.reload()
+            return
+        # Archiving deletes loose files after indexing them, so read the index
+        # first and the packed copies replace the removed files.
+        self._refresh_archive()
+        for path in changed:
+            if is_ignored_path(path, self.capture_dir, self.ignore):
+                continue
+            if path.is_dir():
+                for child in walk_markdown(path, self.ignore, sort=False):
+                    self._refresh_path(child)
+            elif path.suffix == ".md":
+                self._refresh_path(path)
+            elif not path.exists():
+                # A directory was removed or moved away; drop everything beneath it.
+                for known in [known for known in self._notes if path in known.parents]:
+                    self._forget(known)
+        if self.cache is not None:
+            self.cache.flush()
+
+    def _forget(self, path: Path) -> None:
+        if self._notes.pop(path, None) is not None:
+            self._ordered = None
+
+    def _refresh_path(self, path: Path) -> None:
+        import stat as stat_module
+
+        from scripts.vault.index import FileStamp
+
+        try:
+            stat = path.stat()
+        except OSError:
+            self._forget(path)
+            return
+        if not stat_module.S_ISREG(stat.st_mode):
+            self._forget(path)
+            return
+        stamp = FileStamp.of(stat)
+        cached = self._notes.get(path)
+        if cached is not None and cached[0] == stamp:
+            return
+        try:
+            # Bodies stay in memory so content filters never touch the disk.
+            note = read_note(path, self.cache, keep_bytes=True)
+        except (OSError, UnicodeDecodeError, ValueError, load_yaml_module().YAMLError) as exc:
+            sys.stderr.write(f"Warning: skipping {path}: {exc}\n")
+            self._forget(path)
+            return
+        self._notes[path] = (stamp, note)
+        self._ordered = None
+
+    def notes(self) -> List[Note]:
+        if self._ordered is None:
+            notes = dict(self._packed)
+            notes.update((path, cached[1]) for path, cached in self._notes.items())
+            self._ordered = [notes[path] for path in sorted(notes)]
+        return self._ordered
+
+    def sorted_by(self, field: Optional[str], desc: bool) -> List[Tuple[SortKey, Note]]:
+        """Return notes ascending by sort key, cached until the vault changes."""
+        notes = self.notes()
+        if self._sorted_from is not notes:
+            self._sorted = {}
+            self._sorted_from = notes
+        ordered = self._sorted.get((field, desc))
+        if ordered is None:
+            ordered = sorted(((sort_key(note, field, desc), note) for note in notes), key=lambda item: item[0])
+            self._sorted[(field, desc)] = ordered
+        return ordered
+
+
+def answer_request(request: Dict[str, Any], model: VaultModel) -> Dict[str, Any]:
+    import contextlib
+    import io
+
+    from scripts.vault.walk import is_ignored_path
+
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    status = 0
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            args = parse_args([str(arg) for arg in request.get("argv", [])])
+        except SystemExit as exc:
+            status = exc.code if isinstance(exc.code, int) else 2
+        else:
+            cwd = Path(str(request.get("cwd") or "."))
+            capture_dir = resolve_capture_dir(cwd / args.root, args.capture_dir)
+            if capture_dir != model.capture_dir:
+                status = SERVER_WRONG_VAULT
+                sys.stderr.write(f"Server does not serve {capture_dir}\n")
+            else:
+                notes: Iterable[Note] = model.notes()
+                ordered: Optional[Callable[[Optional[str], bool], List[Tuple[SortKey, Note]]]] = model.sorted_by
+                extra_ignores = [glob for glob in args.ignore or () if glob not in model.ignore]
+                if extra_ignores:
+                    # The cached sort orders cover the whole vault.
+                    ordered = None
+                    notes = (
+                        note
+                        for note in notes
+                        if not is_ignored_path(note.path, model.capture_dir, extra_ignores)
+                    )
+                status = run_query(args, notes, stdout, ordered)
+    return {"status": status, "stdout": stdout.getvalue(), "stderr": stderr.getvalue()}
+
+
+def handle_connection(conn: socket.socket, model: VaultModel) -> None:
+    import json
+
+    conn.settimeout(5.0)
+    buffer = b""
+    try:
+        while not buffer.endswith(b"\n"):
+            chunk = conn.recv(65536)
+            if not chunk:
+                break
+            buffer += chunk
+        request = json.loads(buffer.decode("utf-8") or "{}")
+    except (OSError, ValueError) as exc:
+        response = {"status": 2, "stdout": "", "stderr": f"Bad request: {exc}\n"}
+    else:
+        try:
+            response = answer_request(request, model)
+        except Exception as exc:  # noqa: BLE001 - one failing query must not stop the server
+            response = {"status": 2, "stdout": "", "stderr": f"Error: {exc}\n"}
+    try:
+        conn.sendall(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+    except OSError:
+        pass
+
+
+def _remove_stale_socket(path: Path) -> None:
+    import socket
+
+    if not path.exists():
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(str(path))
+    except OSError:
+        path.unlink()
+    else:
+        raise SystemExit(f"Another capture_query server is listening on {path}")
+    finally:
+        probe.close()
+
+
+def parse_serve_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="capture_query.py serve",
+        description=(
+            "Keep the capture folder parsed in memory and answer queries over a Unix socket."
+        ),
+    )
+    parser.add_argument(
+        "--root",
+        default=Path("."),
+        type=Path,
+        help="Vault root directory; defaults to current working directory.",
+    )
+    parser.add_argument(
+        "--capture-dir",
+        default=Path("capture/raw_capture"),
+        type=Path,
+        help="Relative or absolute path to the raw capture folder.",
+    )
+    parser.add_argument(
+        "--archive-dir",
+        default=Path("capture/archive"),
+        type=Path,
+        help="Archive of packed notes, relative to --root unless absolute; served when present.",
+    )
+    parser.add_argument(
+        "--ignore",
+        action="append",
+        metavar="GLOB",
+        help="Skip files or directories matching GLOB (repeatable); .git and .trash are always skipped.",
+    )
+    add_cache_arguments(parser)
+    parser.add_argument(
+        "--socket",
+        type=Path,
+        default=None,
+        help=f"Socket path (default: ${SOCKET_ENV} or $XDG_RUNTIME_DIR/para-organize/capture-query.sock).",
+    )
+    args = parser.parse_args(argv)
+    if args.socket is None:
+        env_socket = os.environ.get(SOCKET_ENV)
+        args.socket = Path(env_socket) if env_socket else default_socket_path()
+    return args
+
+
+def serve(argv: Optional[Sequence[str]] = None) -> int:
+    import selectors
+    import signal
+    import socket
+
+    from scripts.vault.watch import open_watcher
+
+    args = parse_serve_args(argv)
+    capture_dir = resolve_capture_dir(args.root, args.capture_dir)
+    if not capture_dir.exists():
+        sys.stderr.write(f"Error: Capture directory not found: {capture_dir}\n")
+        return 2
+
+    watcher = open_watcher(capture_dir)
+    model = VaultModel(
+        capture_dir,
+        ignore_patterns(args.ignore),
+        resolve_capture_dir(args.root, args.archive_dir),
+        open_cache(args),
+    )
+    model.reload()
+
+    socket_path: Path = args.socket
+    socket_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    _remove_stale_socket(socket_path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(str(socket_path))
+    os.chmod(socket_path, 0o600)
+    server.listen(16)
+
+    selector = selectors.DefaultSelector()
+    selector.register(server, selectors.EVENT_READ, "client")
+    if watcher.fileno() is not None:
+        selector.register(watcher.fileno(), selectors.EVENT_READ, "watch")
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    sys.stderr.write(f"Serving {capture_dir} ({len(model.notes())} notes) on {socket_path}\n")
+
+    try:
+        while True:
+            for key, _ in selector.select():
+                # Drain pending changes before every answer so a write followed
+                # by a query never observes stale data.
+                model.apply(watcher.read_events())
+                if key.data != "client":
+                    continue
+                conn, _ = server.accept()
+                with conn:
+                    handle_connection(conn, model)
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        selector.close()
+        server.close()
+        watcher.close()
+        try:
+            socket_path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def forward_to_server(socket_path: Path, argv: Sequence[str]) -> Optional[int]:
+    """Send a query to a running server; returns None when a local scan is needed."""
+    import json
+    import socket
+
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(str(socket_path))
+        request = {"argv": list(argv), "cwd": os.getcwd()}
+        client.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        chunks: List[bytes] = []
+        while True:
+            chunk = client.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    except OSError:
+        return None
+    finally:
+        client.close()
+    try:
+        response = json.loads(b"".join(chunks).decode("utf-8"))
+    except ValueError:
+        return None
+    status = int(response.get("status", 2))
+    if status == SERVER_WRONG_VAULT:
+        return None
+    sys.stdout.write(response.get("stdout", ""))
+    sys.stderr.write(response.get("stderr", ""))
+    return status
+
+
+def _split_server_flag(argv: Sequence[str]) -> Tuple[Optional[str], List[str]]:
+    server = os.environ.get(SOCKET_ENV) or None
+    remaining: List[str] = []
+    items = iter(argv)
+    for item in items:
+        if item == "--server":
+            server = next(items, None)
+        elif item.startswith("--server="):
+            server = item.split("=", 1)[1]
+        else:
+            remaining.append(item)
+    return server, remaining
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if argv and argv[0] == "serve":
+        return serve(argv[1:])
+
+    server, argv = _split_server_flag(argv)
+    # A server answers once; following needs a local watcher.
+    if server and "--follow" not in argv:
+        status = forward_to_server(Path(server).expanduser(), argv)
+        if status is not None:
+            return status
+
+    args = parse_args(argv)
+    capture_dir = resolve_capture_dir(args.root, args.capture_dir)
+    archive_dir = resolve_capture_dir(args.root, args.archive_dir)
+    cache = open_cache(args)
+    watcher = None
+    try:
+        if args.follow:
+            from scripts.vault.watch import open_watcher
+
+            if not capture_dir.is_dir():
+                sys.stderr.write(f"Error: Capture directory not found: {capture_dir}\n")
+                return 2
+            # Watch before the initial scan so nothing lands unseen in between.
+            watcher = open_watcher(capture_dir, interval=args.poll_interval)
+            stamps = snapshot_stamps(capture_dir, ignore_patterns(args.ignore))
+        out = FollowOutput(sys.stdout) if args.follow else None
+        status = run_query(
+            args,
+            iter_notes(
+                capture_dir,
+                ignore_patterns(args.ignore),
+                sort=not args.unsorted,
+                archive_dir=archive_dir,
+                cache=cache,
+            ),
+            out,
+        )
+        if watcher is None or status != 0:
+            return status
+        sys.stdout.flush()
+        return follow_notes(args, capture_dir, watcher, stamps, cache, printed=out.written)
+    except KeyboardInterrupt:
+        return 0
+    except BrokenPipeError:
+        # The reader went away; point stdout at /dev/null so the interpreter's
+        # final flush does not raise again.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    finally:
+        if watcher is not None:
+            watcher.close()
+        if cache is not None:
+            cache.close()
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
@@ -0,0 +1 @@
+"""Shared helpers for reading and watching the capture vault."""
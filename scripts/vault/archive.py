@@ -0,0 +1,361 @@
+"""
+Append-only, compressed archive segments for packed capture notes.
+
+An archive directory holds numbered segment files and one `index.jsonl`.
+Every packed note is compressed on its own and appended to the current
+segment; its index line records the segment, byte offset and length, the
+codec, the note hash and the parsed frontmatter, so a note is read with one
+seek and frontmatter filters never decompress anything; `PackedNote` only
+decompresses its body when it is asked for.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import zlib
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms write unlocked
+    fcntl = None  # type: ignore[assignment]
+
+from .frontmatter import split_bytes
+from .index import ParsedNote
+
+INDEX_NAME = "index.jsonl"
+# Held exclusively by a writer for each batch, so concurrent archivers
+# never interleave segment bytes or index lines.
+WRITER_LOCK_NAME = "writer.lock"
+SEGMENT_PATTERN = "segment-{:06d}.seg"
+DEFAULT_MAX_SEGMENT_BYTES = 64 * 1024 * 1024
+
+
+def _zstd_module() -> Any:
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def default_codec() -> str:
+    """zstd when the `zstandard` package is installed, zlib otherwise."""
+    return "zstd" if _zstd_module() is not None else "zlib"
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return _zstd_module().ZstdCompressor(level=10).compress(data)
+    if codec == "zlib":
+        return zlib.compress(data, 6)
+    raise ValueError(f"Unknown archive codec '{codec}'.")
+
+
+def decompress(blob: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        module = _zstd_module()
+        if module is None:
+            raise RuntimeError("This archive entry needs the 'zstandard' package to read.")
+        return module.ZstdDecompressor().decompress(blob)
+    if codec == "zlib":
+        return zlib.decompress(blob)
+    raise ValueError(f"Unknown archive codec '{codec}'.")
+
+
+@dataclass(slots=True)
+class ArchiveEntry:
+    """Index record for one packed note."""
+
+    path: str
+    segment: str
+    offset: int
+    length: int
+    codec: str
+    note_hash: str
+    size: int
+    mtime_ns: int
+    frontmatter: Dict[str, Any]
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "path": self.path,
+                "segment": self.segment,
+                "offset": self.offset,
+                "length": self.length,
+                "codec": self.codec,
+                "hash": self.note_hash,
+                "size": self.size,
+                "mtime_ns": self.mtime_ns,
+                "frontmatter": self.frontmatter,
+            },
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+
+    @classmethod
+    def from_json(cls, line: str) -> "ArchiveEntry":
+        data = json.loads(line)
+        return cls(
+            path=data["path"],
+            segment=data["segment"],
+            offset=int(data["offset"]),
+            length=int(data["length"]),
+            codec=data["codec"],
+            note_hash=data["hash"],
+            size=int(data["size"]),
+            mtime_ns=int(data["mtime_ns"]),
+            frontmatter=data.get("frontmatter") or {},
+        )
+
+
+class ArchiveIndex:
+    """
+    In-memory view of an archive's index, keyed by note path relative to the
+    capture folder. Later lines for the same path win.
+    """
+
+    def __init__(self, archive_dir: Path) -> None:
+        self.archive_dir = archive_dir
+        self.entries: Dict[str, ArchiveEntry] = {}
+        self._position = 0
+        self.refresh()
+
+    @property
+    def index_path(self) -> Path:
+        return self.archive_dir / INDEX_NAME
+
+    def refresh(self) -> List[ArchiveEntry]:
+        """Load index lines appended since the last call and return them."""
+        added: List[ArchiveEntry] = []
+        try:
+            handle = self.index_path.open("rb")
+        except FileNotFoundError:
+            return added
+        with handle:
+            handle.seek(self._position)
+            for raw in handle:
+                if not raw.endswith(b"\n"):
+                    # A writer is mid-append; pick the line up next time.
+                    break
+                self._position += len(raw)
+                if raw.strip():
+                    entry = ArchiveEntry.from_json(raw.decode("utf-8"))
+                    self.entries[entry.path] = entry
+                    added.append(entry)
+        return added
+
+    def __contains__(self, relative_path: str) -> bool:
+        return relative_path in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, relative_path: str) -> Optional[ArchiveEntry]:
+        return self.entries.get(relative_path)
+
+    def read(self, entry: ArchiveEntry) -> bytes:
+        """Return a packed note's raw bytes with a single seek into its segment."""
+        with (self.archive_dir / entry.segment).open("rb") as handle:
+            handle.seek(entry.offset)
+            blob = handle.read(entry.length)
+        if len(blob) != entry.length:
+            raise ValueError(f"Archive segment {entry.segment} is truncated at {entry.path}.")
+        return decompress(blob, entry.codec)
+
+    def __iter__(self) -> Iterator[ArchiveEntry]:
+        return iter(self.entries.values())
+
+
+@dataclass(slots=True)
+class PackedNote(ParsedNote):
+    """
+    A packed note built from its index entry. The body is decompressed on
+    first access to `raw_bytes`, `raw_text` or `content`, and kept once read;
+    `body_offset` is only known from then on.
+    """
+
+    archive: Optional[ArchiveIndex] = None
+    entry: Optional[ArchiveEntry] = None
+
+    @classmethod
+    def from_entry(cls, archive: ArchiveIndex, path: Path, entry: ArchiveEntry) -> "PackedNote":
+        return cls(
+            path=path,
+            frontmatter=dict(entry.frontmatter),
+            body_offset=0,
+            mtime_ns=entry.mtime_ns,
+            size=entry.size,
+            note_hash=entry.note_hash,
+            archive=archive,
+            entry=entry,
+        )
+
+    @property
+    def raw_bytes(self) -> bytes:
+        if self.data is None:
+            data = self.archive.read(self.entry)
+            self.body_offset = split_bytes(data)[1]
+            self.data = data
+        return self.data
+
+    @property
+    def raw_text(self) -> str:
+        return self.raw_bytes.decode("utf-8")
+
+    @property
+    def content(self) -> str:
+        data = self.raw_bytes
+        return data[self.body_offset :].decode("utf-8")
+
+
+class ArchiveBatch:
+    """
+    Notes appended under one hold of `writer.lock`. Blobs go straight to the
+    segment; the index lines are written when the batch commits, after the
+    segment is fsynced, so an index line never points at bytes that may not
+    be on disk. A batch that fails before committing leaves only unindexed
+    bytes behind, which readers never see.
+    """
+
+    def __init__(self, writer: "ArchiveWriter", number: int, size: int) -> None:
+        self.writer = writer
+        self.entries: List[ArchiveEntry] = []
+        self._number = number
+        self._size = size
+        self._handle: Optional[BinaryIO] = None
+
+    def add(
+        self,
+        relative_path: str,
+        data: bytes,
+        note_hash: str,
+        mtime_ns: int,
+        frontmatter: Dict[str, Any],
+    ) -> ArchiveEntry:
+        """Compress and write one note; it is indexed when the batch commits."""
+        blob = compress(data, self.writer.codec)
+        if self._size and self._size + len(blob) > self.writer.max_segment_bytes:
+            self._close_segment()
+            self._number += 1
+            self._size = 0
+        if self._handle is None:
+            self._handle = (self.writer.archive_dir / SEGMENT_PATTERN.format(self._number)).open("ab")
+            self._size = self._handle.seek(0, os.SEEK_END)
+        self._handle.write(blob)
+        entry = ArchiveEntry(
+            path=relative_path,
+            segment=SEGMENT_PATTERN.format(self._number),
+            offset=self._size,
+            length=len(blob),
+            codec=self.writer.codec,
+            note_hash=note_hash,
+            size=len(data),
+            mtime_ns=mtime_ns,
+            frontmatter=frontmatter,
+        )
+        self._size += len(blob)
+        self.entries.append(entry)
+        return entry
+
+    def _close_segment(self, sync: bool = True) -> None:
+        if self._handle is None:
+            return
+        try:
+            if sync:
+                self._handle.flush()
+                os.fsync(self._handle.fileno())
+        finally:
+            self._handle.close()
+            self._handle = None
+
+    def commit(self) -> None:
+        self._close_segment()
+        if not self.entries:
+            return
+        with (self.writer.archive_dir / INDEX_NAME).open("a", encoding="utf-8") as handle:
+            handle.write("".join(entry.to_json() + "\n" for entry in self.entries))
+            handle.flush()
+            os.fsync(handle.fileno())
+
+    def abort(self) -> None:
+        self._close_segment(sync=False)
+        self.entries = []
+
+
+class ArchiveWriter:
+    """
+    Append notes to the newest segment, rolling over at `max_segment_bytes`.
+    Writes happen in batches that hold `writer.lock` throughout; the newest
+    segment and its size are looked up once per batch under that lock, so
+    several writers may share one archive.
+    """
+
+    def __init__(
+        self,
+        archive_dir: Path,
+        max_segment_bytes: int = DEFAULT_MAX_SEGMENT_BYTES,
+        codec: Optional[str] = None,
+    ) -> None:
+        self.archive_dir = archive_dir
+        self.max_segment_bytes = max_segment_bytes
+        self.codec = codec or default_codec()
+        archive_dir.mkdir(parents=True, exist_ok=True)
+
+    def _current_segment(self) -> Tuple[int, int]:
+        numbers = sorted(
+            int(path.stem.split("-", 1)[1])
+            for path in self.archive_dir.glob("segment-*.seg")
+            if path.stem.split("-", 1)[1].isdigit()
+        )
+        if not numbers:
+            return 1, 0
+        latest = numbers[-1]
+        return latest, (self.archive_dir / SEGMENT_PATTERN.format(latest)).stat().st_size
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+        fd = os.open(self.archive_dir / WRITER_LOCK_NAME, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    @contextmanager
+    def batch(self) -> Iterator[ArchiveBatch]:
+        """
+        Collect appends and commit them together: one fsync of the segment
+        before the index lines are written and one of the index after, so once
+        the block exits every entry in `batch.entries` is durable and the
+        loose files may be deleted.
+        """
+        with self._locked():
+            batch = ArchiveBatch(self, *self._current_segment())
+            try:
+                yield batch
+            except BaseException:
+                batch.abort()
+                raise
+            batch.commit()
+
+    def append(
+        self,
+        relative_path: str,
+        data: bytes,
+        note_hash: str,
+        mtime_ns: int,
+        frontmatter: Dict[str, Any],
+    ) -> ArchiveEntry:
+        """Pack one note in a batch of its own."""
+        with self.batch() as batch:
+            entry = batch.add(relative_path, data, note_hash, mtime_ns, frontmatter)
+        return entry
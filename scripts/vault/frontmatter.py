@@ -0,0 +1,223 @@
+"""
+Frontmatter splitting and YAML loading shared by capture_query, the
+automation pipeline and archive indexes.
+"""
+
+from __future__ import annotations
+
+import mmap
+import re
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+# Created on first use so importing this module never pulls in PyYAML;
+# False records that PyYAML is unavailable.
+_yaml_module: Any = None
+_frontmatter_loader: Any = None
+
+
+def _load_yaml_module() -> Any:
+    global _yaml_module
+    if _yaml_module is None:
+        try:
+            import yaml
+        except ImportError:  # pragma: no cover - fallback to pure-Python parser
+            _yaml_module = False
+        else:
+            _yaml_module = yaml
+    return _yaml_module
+
+
+def frontmatter_loader() -> Any:
+    """
+    Return a YAML loader that keeps timestamp-like scalars as strings.
+
+    Frontmatter parsed this way round-trips through JSON unchanged, which is
+    what capture_query prints, what the automation store records and what
+    archive indexes and the parse cache keep.
+    """
+    global _frontmatter_loader
+    if _frontmatter_loader is None:
+        import yaml
+
+        class FrontmatterLoader(yaml.SafeLoader):
+            """YAML loader that keeps timestamp-like scalars as strings."""
+
+        # Drop the implicit resolver for timestamps so ISO strings stay as text.
+        # The table is inherited from SafeLoader; build a copy rather than
+        # editing it, or every yaml.safe_load in the process loses timestamps.
+        FrontmatterLoader.yaml_implicit_resolvers = {
+            ch: [(tag, regexp) for tag, regexp in resolvers if tag != "tag:yaml.org,2002:timestamp"]
+            for ch, resolvers in yaml.SafeLoader.yaml_implicit_resolvers.items()
+        }
+        _frontmatter_loader = FrontmatterLoader
+    return _frontmatter_loader
+
+
+def split_bytes(data: Union[bytes, mmap.mmap]) -> Tuple[Optional[bytes], int]:
+    """
+    Locate the frontmatter block in raw note bytes (or an mmap).
+
+    The block must open with a `---` line and is closed by the next line that
+    is exactly `---` (surrounding whitespace ignored). Only the frontmatter
+    block is scanned; the body is never touched.
+
+    Returns:
+        The frontmatter bytes (None when there is no closed block) and the
+        offset where the content starts, just past the closing delimiter
+        line (0 without frontmatter).
+    """
+    if data[:3] != b"---":
+        return None, 0
+    size = len(data)
+    end = data.find(b"\n")
+    line_end = size if end == -1 else end + 1
+    if data[:line_end].strip() != b"---":
+        return None, 0
+    start = line_end
+    position = line_end
+    while position < size:
+        end = data.find(b"\n", position)
+        line_end = size if end == -1 else end + 1
+        if data[position:line_end].strip() == b"---":
+            return bytes(data[start:position]), line_end
+        position = line_end
+    return None, 0
+
+
+def load_mapping(text: str) -> Dict[str, Any]:
+    """
+    Parse a frontmatter block into a dict (empty blocks give `{}`).
+
+    Uses PyYAML with `frontmatter_loader` when installed and a small
+    block-style parser otherwise.
+    """
+    if not text.strip():
+        return {}
+    yaml = _load_yaml_module()
+    if not yaml:
+        return _fallback_parse(text)
+    data = yaml.load(text, Loader=frontmatter_loader())
+    if data is None:
+        return {}
+    if not isinstance(data, dict):
+        raise ValueError("Frontmatter must parse to a mapping")
+    return data
+
+
+def _parse_scalar(token: str) -> Any:
+    token = token.strip()
+    if token in {"", "~", "null", "Null", "NULL"}:
+        return None
+    if token.lower() in {"true", "false"}:
+        return token.lower() == "true"
+    if token.startswith("'") and token.endswith("'"):
+        return token[1:-1]
+    if token.startswith('"') and token.endswith('"'):
+        return token[1:-1]
+    if re.fullmatch(r"-?\d+", token):
+        try:
+            return int(token)
+        except ValueError:
+            pass
+    if re.fullmatch(r"-?\d+\.\d+", token):
+        try:
+            return float(token)
+        except ValueError:
+            pass
+    if token.startswith("[") and token.endswith("]"):
+        inner = token[1:-1].strip()
+        if not inner:
+            return []
+        return [_parse_scalar(item) for item in inner.split(",")]
+    if token.startswith("{") and token.endswith("}"):
+        inner = token[1:-1].strip()
+        if not inner:
+            return {}
+        result: Dict[str, Any] = {}
+        for part in inner.split(","):
+            if ":" not in part:
+                continue
+            key, value = part.split(":", 1)
+            result[key.strip()] = _parse_scalar(value.strip())
+        return result
+    return token
+
+
+def _parse_block(lines: List[str], start: int, indent: int) -> Tuple[Dict[str, Any], int]:
+    mapping: Dict[str, Any] = {}
+    index = start
+    total = len(lines)
+
+    while index < total:
+        line = lines[index]
+        stripped = line.strip()
+        if not stripped:
+            index += 1
+            continue
+        current_indent = len(line) - len(line.lstrip(" "))
+        if current_indent < indent:
+            break
+        if ":" not in stripped:
+            break
+        key_part, value_part = line.split(":", 1)
+        key = key_part.strip()
+        value = value_part.strip()
+        index += 1
+        if value:
+            mapping[key] = _parse_scalar(value)
+            continue
+        next_indent = indent + 2
+        seq, new_index = _parse_sequence(lines, index, next_indent)
+        if seq is not None:
+            mapping[key] = seq
+            index = new_index
+            continue
+        nested, new_index = _parse_block(lines, index, next_indent)
+        mapping[key] = nested
+        index = new_index
+
+    return mapping, index
+
+
+def _parse_sequence(lines: List[str], start: int, indent: int) -> Tuple[Optional[List[Any]], int]:
+    items: List[Any] = []
+    index = start
+    total = len(lines)
+    consumed = False
+
+    while index < total:
+        line = lines[index]
+        stripped = line.strip()
+        if not stripped:
+            index += 1
+            continue
+        current_indent = len(line) - len(line.lstrip(" "))
+        if current_indent < indent:
+            break
+        if not stripped.startswith("- "):
+            break
+        consumed = True
+        item_value = stripped[2:].strip()
+        index += 1
+        if item_value:
+            items.append(_parse_scalar(item_value))
+            continue
+        next_indent = current_indent + 2
+        seq, new_index = _parse_sequence(lines, index, next_indent)
+        if seq is not None:
+            items.append(seq)
+            index = new_index
+            continue
+        nested, new_index = _parse_block(lines, index, next_indent)
+        items.append(nested)
+        index = new_index
+
+    if not consumed:
+        return None, start
+    return items, index
+
+
+def _fallback_parse(text: str) -> Dict[str, Any]:
+    lines = text.splitlines()
+    mapping, _ = _parse_block(lines, 0, 0)
+    return mapping
@@ -0,0 +1,338 @@
+"""
+Parsed capture notes and the parse cache shared by capture_query and the
+automation pipeline.
+
+`CaptureIndex` walks a capture folder and yields `ParsedNote`s whose
+frontmatter is parsed once and whose bodies are read only when asked for.
+`ParseCache` persists parsed frontmatter, body offsets and content hashes in
+SQLite, keyed by absolute path and validated by a `FileStamp`, so a note
+parsed by either tool is a cache hit for the other until the file changes.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, NamedTuple, Optional, Sequence
+
+from .frontmatter import load_mapping, split_bytes
+from .walk import DEFAULT_IGNORES, walk_markdown
+
+LOG = logging.getLogger(__name__)
+
+CACHE_ENV = "PARA_ORGANIZE_CACHE"
+# Values of $PARA_ORGANIZE_CACHE that turn the cache off.
+CACHE_DISABLED = ("", "0", "off", "none")
+# Rows written between commits; keeps the write lock short for other readers.
+FLUSH_EVERY = 500
+
+# Bumped whenever the table layout changes; an older cache is rebuilt.
+SCHEMA_VERSION = 2
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    ctime_ns INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    body_offset INTEGER NOT NULL,
+    frontmatter TEXT NOT NULL,
+    note_hash TEXT
+);
+"""
+
+
+def default_cache_path() -> Optional[Path]:
+    """
+    `$PARA_ORGANIZE_CACHE`, else `$XDG_CACHE_HOME/para-organize/notes.sqlite`
+    (or `~/.cache/...`). Returns None when the variable disables the cache.
+    """
+    configured = os.environ.get(CACHE_ENV)
+    if configured is not None:
+        if configured.strip().lower() in CACHE_DISABLED:
+            return None
+        return Path(configured).expanduser()
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(base) / "para-organize" / "notes.sqlite"
+
+
+class FileStamp(NamedTuple):
+    """
+    What `stat` says about a file's contents. Besides mtime and size it
+    holds the inode change time, which every write bumps and `touch -d`
+    cannot set back, and the inode, which changes when an editor replaces
+    the file; a same-size edit with a restored mtime still changes the stamp.
+    """
+
+    mtime_ns: int
+    size: int
+    ctime_ns: int
+    ino: int
+
+    @classmethod
+    def of(cls, stat: os.stat_result) -> "FileStamp":
+        return cls(stat.st_mtime_ns, stat.st_size, stat.st_ctime_ns, stat.st_ino)
+
+
+class CachedNote(NamedTuple):
+    frontmatter: Dict[str, Any]
+    body_offset: int
+    note_hash: Optional[str]
+
+
+class ParseCache:
+    """
+    SQLite cache of parsed notes. Reads never fail: an unreadable row is a
+    miss. The first write error (a locked or read-only database) is logged and
+    turns further writes into no-ops for this instance.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), timeout=2.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self._conn.executescript(
+                f"DROP TABLE IF EXISTS notes; {SCHEMA} PRAGMA user_version = {SCHEMA_VERSION};"
+            )
+        self._pending = 0
+        self.writable = True
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def open(cls, path: Optional[Path]) -> Optional["ParseCache"]:
+        """Open the cache at `path`, or return None (with a warning) when that fails."""
+        if path is None:
+            return None
+        try:
+            return cls(path)
+        except (OSError, sqlite3.Error) as exc:
+            LOG.warning("Parse cache %s unavailable: %s", path, exc)
+            return None
+
+    def get(self, path: str, stamp: FileStamp) -> Optional[CachedNote]:
+        try:
+            row = self._conn.execute(
+                """
+                SELECT mtime_ns, size, ctime_ns, ino, body_offset, frontmatter, note_hash
+                FROM notes WHERE path = ?
+                """,
+                (path,),
+            ).fetchone()
+        except sqlite3.Error:
+            row = None
+        if row is None or FileStamp(*row[:4]) != stamp:
+            self.misses += 1
+            return None
+        try:
+            frontmatter = json.loads(row[5])
+        except ValueError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return CachedNote(frontmatter, int(row[4]), row[6])
+
+    def put(
+        self,
+        path: str,
+        stamp: FileStamp,
+        frontmatter: Dict[str, Any],
+        body_offset: int,
+        note_hash: Optional[str] = None,
+    ) -> None:
+        """
+        Record a parsed note. Frontmatter that does not survive a JSON round
+        trip (non-string keys, binary values) is not cached. A None hash keeps
+        the stored one when the file is unchanged.
+        """
+        if not self.writable:
+            return
+        try:
+            encoded = json.dumps(frontmatter, ensure_ascii=False, separators=(",", ":"))
+        except (TypeError, ValueError):
+            return
+        if json.loads(encoded) != frontmatter:
+            return
+        try:
+            self._conn.execute(
+                """
+                INSERT INTO notes(path, mtime_ns, size, ctime_ns, ino, body_offset, frontmatter, note_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                    note_hash = CASE
+                        WHEN excluded.note_hash IS NULL
+                            AND notes.mtime_ns = excluded.mtime_ns
+                            AND notes.size = excluded.size
+                            AND notes.ctime_ns = excluded.ctime_ns
+                            AND notes.ino = excluded.ino
+                        THEN notes.note_hash
+                        ELSE excluded.note_hash
+                    END,
+                    mtime_ns = excluded.mtime_ns,
+                    size = excluded.size,
+                    ctime_ns = excluded.ctime_ns,
+                    ino = excluded.ino,
+                    body_offset = excluded.body_offset,
+                    frontmatter = excluded.frontmatter
+                """,
+                (path, *stamp, body_offset, encoded, note_hash),
+            )
+        except sqlite3.Error as exc:
+            self._disable(exc)
+            return
+        self._pending += 1
+        if self._pending >= FLUSH_EVERY:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        self._pending = 0
+        try:
+            self._conn.commit()
+        except sqlite3.Error as exc:
+            self._disable(exc)
+
+    def _disable(self, exc: Exception) -> None:
+        LOG.warning("Parse cache %s is not writable, continuing without it: %s", self.path, exc)
+        self.writable = False
+        self._pending = 0
+        try:
+            self._conn.rollback()
+        except sqlite3.Error:
+            pass
+
+    def close(self) -> None:
+        self.flush()
+        self._conn.close()
+
+    def __enter__(self) -> "ParseCache":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+@dataclass(slots=True)
+class ParsedNote:
+    """
+    A capture note with parsed frontmatter. The body is read from disk on
+    first access to `raw_bytes`, `raw_text` or `content` unless `data` was
+    already loaded, and is kept once read.
+    """
+
+    path: Path
+    frontmatter: Dict[str, Any]
+    body_offset: int
+    mtime_ns: int = 0
+    size: int = 0
+    note_hash: Optional[str] = None
+    data: Optional[bytes] = None
+
+    @property
+    def raw_bytes(self) -> bytes:
+        if self.data is None:
+            self.data = self.path.read_bytes()
+        return self.data
+
+    @property
+    def raw_text(self) -> str:
+        return self.raw_bytes.decode("utf-8")
+
+    @property
+    def content(self) -> str:
+        return self.raw_bytes[self.body_offset :].decode("utf-8")
+
+
+def parse_bytes(
+    path: Path,
+    data: bytes,
+    mtime_ns: int = 0,
+    frontmatter: Optional[Dict[str, Any]] = None,
+) -> ParsedNote:
+    """Build a note from bytes in memory; a known `frontmatter` skips the YAML parse."""
+    fm_bytes, body_offset = split_bytes(data)
+    if frontmatter is None:
+        frontmatter = load_mapping(fm_bytes.decode("utf-8")) if fm_bytes is not None else {}
+    return ParsedNote(
+        path=path,
+        frontmatter=frontmatter,
+        body_offset=body_offset,
+        mtime_ns=mtime_ns,
+        size=len(data),
+        data=data,
+    )
+
+
+def load_note(path: Path, cache: Optional[ParseCache] = None, keep_bytes: bool = False) -> ParsedNote:
+    """
+    Parse one note, consulting `cache` first.
+
+    A cache hit costs one `stat` and leaves the body unread (unless
+    `keep_bytes`); a miss reads the file once and records the result.
+    """
+    cached: Optional[CachedNote] = None
+    stamp = None
+    if cache is not None:
+        stat = os.stat(path)
+        stamp = FileStamp.of(stat)
+        cached = cache.get(str(path), stamp)
+        if cached is not None and not keep_bytes:
+            return ParsedNote(
+                path=path,
+                frontmatter=cached.frontmatter,
+                body_offset=cached.body_offset,
+                mtime_ns=stat.st_mtime_ns,
+                size=stat.st_size,
+                note_hash=cached.note_hash,
+            )
+    with path.open("rb") as handle:
+        stat = os.fstat(handle.fileno())
+        data = handle.read()
+    if cached is not None and stamp != FileStamp.of(stat):
+        # Rewritten between the stat and the read.
+        cached = None
+    note = parse_bytes(path, data, stat.st_mtime_ns, cached.frontmatter if cached is not None else None)
+    if cache is not None and cached is None:
+        cache.put(str(path), FileStamp.of(stat), note.frontmatter, note.body_offset)
+    return note
+
+
+class CaptureIndex:
+    """Iterate a capture folder as `ParsedNote`s, backed by an optional `ParseCache`."""
+
+    def __init__(
+        self,
+        capture_dir: Path,
+        ignore: Sequence[str] = DEFAULT_IGNORES,
+        cache: Optional[ParseCache] = None,
+    ) -> None:
+        self.capture_dir = capture_dir
+        self.ignore = tuple(ignore)
+        self.cache = cache
+
+    def paths(self, sort: bool = True) -> Iterator[Path]:
+        if not self.capture_dir.exists():
+            raise FileNotFoundError(f"Capture directory not found: {self.capture_dir}")
+        return walk_markdown(self.capture_dir, self.ignore, sort)
+
+    def load(self, path: Path, keep_bytes: bool = False) -> ParsedNote:
+        return load_note(path, self.cache, keep_bytes)
+
+    def iter_notes(self, sort: bool = True) -> Iterator[ParsedNote]:
+        for path in self.paths(sort):
+            yield self.load(path)
+
+    def __iter__(self) -> Iterator[ParsedNote]:
+        return self.iter_notes()
+
+    def close(self) -> None:
+        if self.cache is not None:
+            self.cache.flush()
@@ -0,0 +1,93 @@
+"""`os.scandir` walker shared by capture_query and the automation pipeline."""
+
+from __future__ import annotations
+
+import os
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+
+# Subtrees that never hold capture notes.
+DEFAULT_IGNORES: Tuple[str, ...] = (".git", ".trash")
+
+
+def is_ignored(relative: str, name: str, patterns: Sequence[str]) -> bool:
+    """
+    Check a directory entry against ignore globs.
+
+    Patterns without a `/` match the entry name at any depth (`.git`,
+    `*.excalidraw.md`); patterns with a `/` match the POSIX path relative to
+    the walk root (`attachments/*`, `archive/2023`).
+    """
+    for pattern in patterns:
+        if "/" in pattern:
+            if fnmatchcase(relative, pattern.strip("/")):
+                return True
+        elif fnmatchcase(name, pattern):
+            return True
+    return False
+
+
+def is_ignored_path(path: Path, root: Path, patterns: Sequence[str]) -> bool:
+    """Return True when `path` or any of its parents below `root` is ignored."""
+    try:
+        parts = path.relative_to(root).parts
+    except ValueError:
+        return False
+    for depth in range(1, len(parts) + 1):
+        if is_ignored("/".join(parts[:depth]), parts[depth - 1], patterns):
+            return True
+    return False
+
+
+def walk_markdown(
+    root: Path,
+    ignore: Sequence[str] = DEFAULT_IGNORES,
+    sort: bool = True,
+    suffix: str = ".md",
+    prune: Optional[Callable[[os.DirEntry], bool]] = None,
+) -> Iterator[Path]:
+    """
+    Yield note files under `root`, pruning ignored subtrees before descending.
+
+    File types come from the directory entries, so no extra `stat` is issued
+    per note. Results stream as directories are read: with `sort=True` each
+    directory is ordered by name before descending, which yields exactly the
+    order of `sorted(root.rglob("*.md"))`; with `sort=False` entries come in
+    filesystem order. Symlinked directories are not followed. `prune`, when
+    given, is called for each non-ignored subdirectory and skips it when it
+    returns True.
+    """
+    # Stack of (path, relative path, is_directory); files are only pushed in
+    # sorted mode so they interleave with sibling directories by name.
+    stack: List[Tuple[Path, str, bool]] = [(root, "", True)]
+    while stack:
+        path, relative, is_directory = stack.pop()
+        if not is_directory:
+            yield path
+            continue
+        try:
+            with os.scandir(path) as iterator:
+                entries = list(iterator)
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            continue
+        if sort:
+            entries.sort(key=lambda entry: entry.name)
+        pending: List[Tuple[Path, str, bool]] = []
+        for entry in entries:
+            entry_relative = f"{relative}/{entry.name}" if relative else entry.name
+            if ignore and is_ignored(entry_relative, entry.name, ignore):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if prune is not None and prune(entry):
+                        continue
+                    pending.append((Path(entry.path), entry_relative, True))
+                elif entry.name.endswith(suffix) and entry.is_file():
+                    if sort:
+                        pending.append((Path(entry.path), entry_relative, False))
+                    else:
+                        yield Path(entry.path)
+            except OSError:
+                continue
+        stack.extend(reversed(pending))
@@ -0,0 +1,195 @@
+"""Change notification for capture directories (inotify with a stat-diff fallback)."""
+
+from __future__ import annotations
+
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+from .index import FileStamp
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+)
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class PollingWatcher:
+    """Detect changes by diffing `FileStamp` snapshots of Markdown files."""
+
+    def __init__(self, root: Path, interval: float = 2.0) -> None:
+        self.root = root
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def fileno(self) -> Optional[int]:
+        return None
+
+    def _scan(self) -> Dict[Path, FileStamp]:
+        snapshot: Dict[Path, FileStamp] = {}
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if not name.endswith(".md"):
+                    continue
+                path = Path(dirpath) / name
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                snapshot[path] = FileStamp.of(stat)
+        return snapshot
+
+    def read_events(self) -> Optional[Set[Path]]:
+        """Return paths created, modified or removed since the previous call."""
+        current = self._scan()
+        previous = self._snapshot
+        self._snapshot = current
+        changed = {path for path, stamp in current.items() if previous.get(path) != stamp}
+        changed.update(path for path in previous if path not in current)
+        return changed
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[Set[Path]]:
+        """Block until something changes (or `timeout` elapses) and return the changes."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            changed = self.read_events()
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            time.sleep(self.interval)
+
+    def close(self) -> None:
+        self._snapshot = {}
+
+
+class InotifyWatcher:
+    """Recursive inotify watcher built on libc through ctypes (Linux only)."""
+
+    def __init__(self, root: Path) -> None:
+        import ctypes
+        import ctypes.util
+
+        self.root = root
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self._fd = fd
+        self._dirs: Dict[int, Path] = {}
+        try:
+            self._add_tree(root)
+        except OSError:
+            self.close()
+            raise
+
+    def fileno(self) -> Optional[int]:
+        return self._fd
+
+    def _add_watch(self, directory: Path) -> None:
+        import ctypes
+
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), str(directory))
+        self._dirs[wd] = directory
+
+    def _add_tree(self, directory: Path) -> None:
+        self._add_watch(directory)
+        for dirpath, dirnames, _ in os.walk(directory):
+            for name in dirnames:
+                self._add_watch(Path(dirpath) / name)
+
+    def read_events(self) -> Optional[Set[Path]]:
+        """
+        Drain pending events without blocking.
+
+        Returns:
+            Paths that changed, or None when the kernel queue overflowed and
+            callers must rescan the whole tree.
+        """
+        changed: Set[Path] = set()
+        overflowed = False
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                raw_name = data[offset : offset + length].rstrip(b"\0")
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    overflowed = True
+                    continue
+                directory = self._dirs.get(wd)
+                if mask & IN_IGNORED:
+                    self._dirs.pop(wd, None)
+                    continue
+                if directory is None:
+                    continue
+                path = directory / os.fsdecode(raw_name) if raw_name else directory
+                if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                    try:
+                        self._add_tree(path)
+                    except OSError:
+                        continue
+                changed.add(path)
+        if overflowed:
+            return None
+        return changed
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[Set[Path]]:
+        """Block until events arrive (or `timeout` elapses) and return them."""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        return self.read_events()
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+        self._dirs.clear()
+
+
+def open_watcher(root: Path, interval: float = 2.0):
+    """Return an inotify watcher when supported, otherwise a polling watcher."""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(root, interval=interval)
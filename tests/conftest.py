@@ -0,0 +1,154 @@
+"""Shared fixtures for the Python tooling tests: temporary vaults and automation configs."""
+
+from __future__ import annotations
+
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Any, Callable, ClassVar, Dict, Iterator, List, Optional
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from scripts.automation.config import AutomationConfig, load_config  # noqa: E402
+from scripts.automation.consumers import REGISTRY, register  # noqa: E402
+from scripts.automation.consumers.base import Consumer, ConsumerResult  # noqa: E402
+
+
+def render_frontmatter(frontmatter: Dict[str, Any]) -> str:
+    lines = []
+    for key, value in frontmatter.items():
+        if isinstance(value, (list, tuple)):
+            lines.append(f"{key}: [{', '.join(str(item) for item in value)}]")
+        else:
+            lines.append(f"{key}: {value}")
+    return "\n".join(lines)
+
+
+class Vault:
+    """A temporary vault whose capture folder tests write notes into."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.capture_dir = root / "capture" / "raw_capture"
+        self.capture_dir.mkdir(parents=True)
+
+    def write(self, name: str, body: str = "", **frontmatter: Any) -> Path:
+        path = self.capture_dir / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"---\n{render_frontmatter(frontmatter)}\n---\n{body}", encoding="utf-8")
+        return path
+
+
+@pytest.fixture(autouse=True)
+def no_shared_parse_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Keep tests away from the user's parse cache."""
+    monkeypatch.setenv("PARA_ORGANIZE_CACHE", "off")
+
+
+@pytest.fixture
+def vault(tmp_path: Path) -> Vault:
+    return Vault(tmp_path / "vault")
+
+
+@pytest.fixture
+def make_config(tmp_path: Path, vault: Vault) -> Callable[..., AutomationConfig]:
+    """
+    Write an automations TOML for `vault` and load it. The built-in
+    Taskwarrior consumer runs on the fake backend, with `taskwarrior` as
+    extra options, or is disabled when that is None; `extra` is appended
+    verbatim.
+    """
+
+    def build(extra: str = "", taskwarrior: Optional[str] = "") -> AutomationConfig:
+        path = tmp_path / "automations.toml"
+        text = f"""
+[vault]
+root = "{vault.root}"
+capture_dir = "capture/raw_capture"
+
+[state]
+dir = "{tmp_path / 'state'}"
+
+[cache]
+enabled = false
+"""
+        if taskwarrior is None:
+            text += "\n[consumers.taskwarrior]\nenabled = false\n"
+        else:
+            text += f"""
+[consumers.taskwarrior]
+type = "taskwarrior"
+backend = "fake"
+data_directory = "{tmp_path / 'tasks'}"
+{taskwarrior}
+"""
+        path.write_text(text + extra, encoding="utf-8")
+        return load_config(path)
+
+    return build
+
+
+class RecordingConsumer(Consumer):
+    """
+    Test consumer that records what it was asked. With a `require` option
+    (`{field = value}`) it only matches notes whose frontmatter has those
+    values; notes with `fail: true` raise in `handle`.
+    """
+
+    matched: ClassVar[List[Path]] = []
+    handled: ClassVar[List[Path]] = []
+
+    def matches(self, state) -> bool:
+        RecordingConsumer.matched.append(state.note.path)
+        required = self.config.options.get("require", {})
+        return all(str(state.note.frontmatter.get(key)) == str(value) for key, value in required.items())
+
+    def handle(self, state, store) -> ConsumerResult:
+        RecordingConsumer.handled.append(state.note.path)
+        if str(state.note.frontmatter.get("fail", "")).lower() == "true":
+            raise RuntimeError(f"cannot handle {state.note.path.name}")
+        store.mark_emitted(self.name, state.note.path, state.note.note_hash)
+        return ConsumerResult(status="success", note_path=state.note.path)
+
+
+if "recorder" not in REGISTRY:
+    register("recorder")(RecordingConsumer)
+
+
+@pytest.fixture
+def recorder() -> Iterator[type]:
+    RecordingConsumer.matched.clear()
+    RecordingConsumer.handled.clear()
+    yield RecordingConsumer
+    RecordingConsumer.matched.clear()
+    RecordingConsumer.handled.clear()
+
+
+@pytest.fixture
+def run_pipeline() -> Callable[..., int]:
+    """One in-process automation run over every enabled consumer."""
+    from scripts.automation.cli import run
+
+    def run_once(config: AutomationConfig, full: bool = False) -> int:
+        return run(config, [consumer for consumer in config.consumers if consumer.enabled], full=full)
+
+    return run_once
+
+
+@pytest.fixture
+def query_state() -> Callable[..., List[tuple]]:
+    """Run one SQL statement against a config's state database and commit it."""
+
+    def query(config: AutomationConfig, sql: str, *params: Any) -> List[tuple]:
+        conn = sqlite3.connect(str(config.database_path))
+        try:
+            with conn:
+                return [tuple(row) for row in conn.execute(sql, params)]
+        finally:
+            conn.close()
+
+    return query
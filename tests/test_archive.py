@@ -0,0 +1,126 @@
+"""Packing finished captures into archive segments and reading them back."""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from scripts import capture_query
+from scripts.automation import archive
+from scripts.automation.store import AutomationStore
+from scripts.vault.archive import ArchiveBatch, ArchiveIndex, ArchiveWriter
+
+
+@pytest.fixture
+def finished(vault, make_config, run_pipeline):
+    config = make_config(taskwarrior=None)
+    for name in ("a", "b", "c", "d", "e"):
+        vault.write(f"{name}.md", f"Body of {name}", id=name, processing_status="organized")
+    vault.write("raw.md", "Still raw", id="raw", processing_status="raw")
+    assert run_pipeline(config) == 0
+    return config
+
+
+def pack(config):
+    store = AutomationStore(config.database_path)
+    try:
+        return archive.pack_cold_notes(config, store, older_than_days=0)
+    finally:
+        store.close()
+
+
+def query(vault, capsys, *argv: str) -> List[str]:
+    assert capture_query.main(["--root", str(vault.root), "--format", "paths", *argv]) == 0
+    return [Path(line).stem for line in capsys.readouterr().out.splitlines()]
+
+
+def packed_paths(query_state, config) -> List[str]:
+    return [Path(path).stem for (path,) in query_state(config, "SELECT path FROM notes WHERE packed = 1 ORDER BY path")]
+
+
+def test_packed_notes_still_answer_queries(vault, finished, capsys, query_state, run_pipeline) -> None:
+    summary = pack(finished)
+
+    assert summary.packed == 5 and summary.bytes_out > 0
+    assert sorted(path.name for path in vault.capture_dir.iterdir()) == ["raw.md"]
+    assert packed_paths(query_state, finished) == ["a", "b", "c", "d", "e"]
+    assert query(vault, capsys) == ["a", "b", "c", "d", "e", "raw"]
+    assert query(vault, capsys, "--search", "body of c") == ["c"]
+    assert query(vault, capsys, "--processing-status", "organized", "--id", "d") == ["d"]
+    assert run_pipeline(finished) == 0
+    assert packed_paths(query_state, finished) == ["a", "b", "c", "d", "e"], "refreshes keep packed rows"
+
+
+def test_batches_fsync_once_before_and_once_after_indexing(finished, monkeypatch: pytest.MonkeyPatch) -> None:
+    synced: List[int] = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(archive, "PACK_BATCH_NOTES", 2)
+    monkeypatch.setattr("scripts.vault.archive.os.fsync", lambda fd: synced.append(os.fstat(fd).st_ino) or real_fsync(fd))
+
+    assert pack(finished).packed == 5
+    inodes = {path.stat().st_ino: path.name for path in finished.archive.directory.iterdir()}
+    assert [inodes[inode] for inode in synced] == ["segment-000001.seg", "index.jsonl"] * 3
+
+
+def test_notes_edited_since_the_last_run_stay_loose(vault, finished, query_state) -> None:
+    vault.write("b.md", "Edited after the run", id="b", processing_status="organized")
+
+    summary = pack(finished)
+
+    assert (summary.packed, summary.changed) == (4, 1)
+    assert (vault.capture_dir / "b.md").read_text(encoding="utf-8").endswith("Edited after the run")
+    assert "b.md" not in ArchiveIndex(finished.archive.directory)
+    assert packed_paths(query_state, finished) == ["a", "c", "d", "e"]
+
+
+def test_note_edited_while_its_batch_is_written_is_kept(vault, finished, monkeypatch, capsys, query_state) -> None:
+    real_add = ArchiveBatch.add
+
+    def add_then_edit(self, relative_path, *args, **kwargs):
+        entry = real_add(self, relative_path, *args, **kwargs)
+        if relative_path == "c.md":
+            vault.write("c.md", "Edited while packing", id="c", processing_status="organized")
+        return entry
+
+    monkeypatch.setattr(ArchiveBatch, "add", add_then_edit)
+
+    summary = pack(finished)
+
+    assert (summary.packed, summary.changed) == (4, 1)
+    assert "c" not in packed_paths(query_state, finished)
+    assert query(vault, capsys, "--search", "edited while packing") == ["c"], "the loose file shadows its packed copy"
+
+
+def test_crash_before_indexing_leaves_source_notes(vault, finished, monkeypatch, capsys, query_state) -> None:
+    def crash(self) -> None:
+        self._close_segment()
+        raise OSError("no space left on device")
+
+    monkeypatch.setattr(ArchiveBatch, "commit", crash)
+    with pytest.raises(OSError):
+        pack(finished)
+
+    assert sorted(path.stem for path in vault.capture_dir.iterdir()) == ["a", "b", "c", "d", "e", "raw"]
+    assert len(ArchiveIndex(finished.archive.directory)) == 0
+    assert packed_paths(query_state, finished) == []
+    assert (finished.archive.directory / "segment-000001.seg").stat().st_size > 0
+
+    monkeypatch.undo()
+    assert pack(finished).packed == 5
+    assert query(vault, capsys, "--search", "body of e") == ["e"], "entries written after orphaned bytes read back"
+
+
+def test_writer_rolls_over_full_segments(tmp_path: Path) -> None:
+    writer = ArchiveWriter(tmp_path / "archive", max_segment_bytes=64, codec="zlib")
+    data = [os.urandom(48) for _ in range(3)]
+
+    with writer.batch() as batch:
+        for index, blob in enumerate(data):
+            batch.add(f"n{index}.md", blob, f"h{index}", 0, {})
+    index = ArchiveIndex(tmp_path / "archive")
+
+    assert [entry.segment for entry in index] == ["segment-000001.seg", "segment-000002.seg", "segment-000003.seg"]
+    assert [index.read(entry) for entry in index] == data
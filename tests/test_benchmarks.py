@@ -0,0 +1,45 @@
+"""Synthetic vault generator and benchmark result handling."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from scripts.benchmarks import results, suite
+from scripts.benchmarks.vault import VaultSpec, generate_vault, render_note
+
+
+def test_generated_vault_is_deterministic(tmp_path: Path) -> None:
+    spec = VaultSpec(notes=5, seed=7, subdirs=2)
+    first = generate_vault(tmp_path / "a", spec)
+    second = generate_vault(tmp_path / "b", spec)
+
+    assert first["notes"] == 5 and first["bytes"] == second["bytes"]
+    paths = sorted(Path(first["capture_dir"]).rglob("*.md"))
+    assert [path.parent.name for path in paths] == ["batch000", "batch000", "batch000", "batch001", "batch001"]
+    for path in paths:
+        twin = Path(second["capture_dir"]) / path.relative_to(first["capture_dir"])
+        assert path.read_bytes() == twin.read_bytes()
+    assert render_note(spec, 3) != render_note(VaultSpec(notes=5, seed=8), 3)
+
+
+def test_compare_flags_regressions_beyond_threshold() -> None:
+    baseline = results.build_report("s", [results.result_entry("a", [10.0]), results.result_entry("b", [10.0])])
+    current = results.build_report("s", [results.result_entry("a", [11.0]), results.result_entry("b", [13.0])])
+
+    rows = {row["name"]: row for row in results.compare(baseline, current, threshold=0.2)}
+
+    assert rows["a"]["ratio"] == 1.1 and not rows["a"]["regressed"]
+    assert rows["b"]["ratio"] == 1.3 and rows["b"]["regressed"]
+
+
+def test_suite_writes_a_loadable_report(tmp_path: Path) -> None:
+    output = tmp_path / "results.json"
+
+    assert suite.main(["--notes", "20", "--repeat", "2", "--bench", "emitter", "--output", str(output)]) == 0
+
+    report = results.load_report(output)
+    assert report["params"]["notes"] == 20
+    assert report["results"]
+    for entry in report["results"]:
+        assert len(entry["samples_ms"]) == 2
+        assert entry["median_ms"] >= 0
@@ -0,0 +1,120 @@
+"""Per-consumer run budgets and the priority that picks which pending notes go first."""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from scripts.automation.consumers import REGISTRY, register
+from scripts.automation.consumers.base import Consumer, ConsumerResult
+from scripts.automation.metrics import RunMetrics, use_metrics
+
+
+class MeteredConsumer(Consumer):
+    """Test consumer that makes `calls_per_note` external calls for every note it handles."""
+
+    handled: List[str] = []
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.calls = 0
+
+    @property
+    def external_calls(self) -> int:
+        return self.calls
+
+    def handle(self, state, store) -> ConsumerResult:
+        MeteredConsumer.handled.append(state.note.path.stem)
+        self.calls += int(self.config.options.get("calls_per_note", 1))
+        store.mark_emitted(self.name, state.note.path, state.note.note_hash)
+        return ConsumerResult(status="success", note_path=state.note.path)
+
+
+if "metered" not in REGISTRY:
+    register("metered")(MeteredConsumer)
+
+
+@pytest.fixture
+def five_notes(vault) -> None:
+    """Notes a (oldest) to e (newest), one second apart."""
+    for offset, name in enumerate("abcde"):
+        path = vault.write(f"{name}.md", name, id=name)
+        mtime_ns = (1_700_000_000 + offset) * 1_000_000_000
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def metered():
+    MeteredConsumer.handled.clear()
+    yield MeteredConsumer
+    MeteredConsumer.handled.clear()
+
+
+def run_counted(run_pipeline, config) -> dict:
+    """Run once and return the per-consumer status counters."""
+    with use_metrics(RunMetrics()) as metrics:
+        assert run_pipeline(config) == 0
+    return metrics.counters
+
+
+def handled_names(recorder) -> List[str]:
+    names = [Path(path).stem for path in recorder.handled]
+    recorder.handled.clear()
+    return names
+
+
+def test_item_budget_defers_the_rest_to_later_runs(make_config, run_pipeline, recorder, five_notes) -> None:
+    config = make_config('[consumers.rec]\ntype = "recorder"\n[consumers.rec.budget]\nmax_items = 2\n', taskwarrior=None)
+
+    counters = run_counted(run_pipeline, config)
+    assert len(handled_names(recorder)) == 2
+    assert (counters["consumer.rec.success"], counters["consumer.rec.deferred"]) == (2, 3)
+
+    counters = run_counted(run_pipeline, config)
+    assert len(handled_names(recorder)) == 2
+    assert counters["consumer.rec.deferred"] == 1
+
+    counters = run_counted(run_pipeline, config)
+    assert len(handled_names(recorder)) == 1
+    assert counters["consumer.rec.deferred"] == 0
+
+
+def test_external_call_budget_stops_the_consumer(make_config, run_pipeline, metered, five_notes) -> None:
+    config = make_config(
+        '[consumers.meter]\ntype = "metered"\ncalls_per_note = 2\n[consumers.meter.budget]\nmax_external_calls = 3\n',
+        taskwarrior=None,
+    )
+
+    counters = run_counted(run_pipeline, config)
+
+    assert len(metered.handled) == 2, "the second note's calls go over the budget; nothing runs after it"
+    assert (counters["consumer.meter.success"], counters["consumer.meter.deferred"]) == (2, 3)
+
+
+@pytest.mark.parametrize(
+    ("priority", "first"),
+    [("newest", ["e", "d", "c", "b", "a"]), ("oldest", ["a", "b", "c", "d", "e"])],
+)
+def test_priority_orders_pending_notes(make_config, run_pipeline, recorder, five_notes, priority, first) -> None:
+    config = make_config(f'[consumers.rec]\ntype = "recorder"\npriority = "{priority}"\n', taskwarrior=None)
+
+    assert run_pipeline(config) == 0
+
+    assert handled_names(recorder) == first
+
+
+@pytest.mark.parametrize(("priority", "expected"), [("newest", ["e"]), ("oldest", ["a"])])
+def test_priority_decides_what_a_budget_lets_through(
+    make_config, run_pipeline, recorder, five_notes, priority, expected
+) -> None:
+    config = make_config(
+        f'[consumers.rec]\ntype = "recorder"\npriority = "{priority}"\n[consumers.rec.budget]\nmax_items = 1\n',
+        taskwarrior=None,
+    )
+
+    assert run_pipeline(config) == 0
+
+    assert handled_names(recorder) == expected
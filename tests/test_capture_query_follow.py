@@ -0,0 +1,87 @@
+"""capture_query --follow: which changes after the initial query are streamed."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional, Set
+
+import pytest
+
+from scripts import capture_query
+from scripts.vault import watch
+from scripts.vault.watch import PollingWatcher
+
+
+class ScriptedWatcher(PollingWatcher):
+    """
+    Polling watcher that applies one scripted change per wake-up instead of
+    sleeping, and records what the follower printed before each one. A step
+    may return a set of paths to report again as if the watcher saw them
+    twice. The follower is interrupted once the script runs out.
+    """
+
+    def __init__(self, root: Path, capsys: pytest.CaptureFixture, steps: Iterable[Callable[[], object]]) -> None:
+        super().__init__(root, interval=0)
+        self.capsys = capsys
+        self.steps = list(steps)
+        self.printed: List[List[str]] = []
+
+    def wait(self, timeout: Optional[float] = None) -> Set[Path]:
+        self.printed.append([Path(line).stem for line in self.capsys.readouterr().out.splitlines()])
+        if not self.steps:
+            raise KeyboardInterrupt
+        repeated = self.steps.pop(0)()
+        return self.read_events() | (repeated if isinstance(repeated, set) else set())
+
+
+def follow(vault, capsys, monkeypatch, steps, *argv: str) -> List[List[str]]:
+    """Run a --follow query over the scripted steps; the initial results come first."""
+    watchers: List[ScriptedWatcher] = []
+
+    def open_watcher(root: Path, interval: float = 2.0) -> ScriptedWatcher:
+        watchers.append(ScriptedWatcher(root, capsys, steps))
+        return watchers[-1]
+
+    monkeypatch.setattr(watch, "open_watcher", open_watcher)
+    assert capture_query.main(["--root", str(vault.root), "--format", "paths", "--follow", *argv]) == 0
+    return watchers[0].printed
+
+
+def test_new_matching_note_is_printed_once(vault, capsys, monkeypatch) -> None:
+    vault.write("a.md", "first", id="a", processing_status="raw")
+    steps = [
+        lambda: vault.write("b.md", "second", id="b", processing_status="raw"),
+        lambda: vault.write("c.md", "not wanted", id="c", processing_status="organized"),
+        lambda: None,
+    ]
+
+    printed = follow(vault, capsys, monkeypatch, steps, "--processing-status", "raw")
+
+    assert printed == [["a"], ["b"], [], []]
+
+
+def test_edit_that_still_matches_is_printed_once(vault, capsys, monkeypatch) -> None:
+    path = vault.write("a.md", "first", id="a", processing_status="raw")
+    steps = [
+        lambda: vault.write("a.md", "first, edited", id="a", processing_status="raw"),
+        lambda: {path},  # the same save reported again
+        lambda: {path},
+    ]
+
+    printed = follow(vault, capsys, monkeypatch, steps, "--processing-status", "raw")
+
+    assert printed == [["a"], ["a"], [], []]
+
+
+def test_note_that_stops_matching_is_not_printed(vault, capsys, monkeypatch) -> None:
+    vault.write("a.md", "first", id="a", processing_status="raw")
+    vault.write("b.md", "second", id="b", processing_status="raw")
+    steps = [
+        lambda: vault.write("a.md", "first", id="a", processing_status="organized"),
+        lambda: (vault.capture_dir / "b.md").unlink(),
+        lambda: vault.write("b.md", "second, again", id="b", processing_status="raw"),
+    ]
+
+    printed = follow(vault, capsys, monkeypatch, steps, "--processing-status", "raw")
+
+    assert printed == [["a", "b"], [], [], ["b"]], "a re-created note counts as new"
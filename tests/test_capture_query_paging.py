@@ -0,0 +1,110 @@
+"""Sorted output and --after cursor paging in capture_query."""
+
+from __future__ import annotations
+
+import io
+import re
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import pytest
+
+from scripts import capture_query
+
+NEXT_PAGE = re.compile(r"Next page: --after (\S+)")
+
+
+@pytest.fixture
+def ranked(vault) -> List[str]:
+    """Notes with numeric, duplicate and missing `rank` values."""
+    ranks = {"a": 3, "b": 10, "c": 2, "d": None, "e": 3, "f": 1, "g": None}
+    for name, rank in ranks.items():
+        if rank is None:
+            vault.write(f"{name}.md", id=name)
+        else:
+            vault.write(f"{name}.md", id=name, rank=rank)
+    return sorted(ranks)
+
+
+def query(vault, capsys, *argv: str) -> Tuple[List[str], Optional[str]]:
+    assert capture_query.main(["--root", str(vault.root), "--format", "paths", *argv]) == 0
+    captured = capsys.readouterr()
+    cursor = NEXT_PAGE.search(captured.err)
+    return [Path(line).stem for line in captured.out.splitlines()], cursor.group(1) if cursor else None
+
+
+def all_pages(vault, capsys, *argv: str) -> List[List[str]]:
+    pages = []
+    after: Sequence[str] = ()
+    while True:
+        page, cursor = query(vault, capsys, *argv, *after)
+        pages.append(page)
+        if cursor is None:
+            return pages
+        after = ("--after", cursor)
+
+
+def test_sort_by_orders_numerically_with_missing_last(vault, capsys, ranked) -> None:
+    ascending, _ = query(vault, capsys, "--sort-by", "rank")
+    descending, _ = query(vault, capsys, "--sort-by", "rank", "--desc")
+
+    assert ascending == ["f", "c", "a", "e", "b", "d", "g"]
+    # --desc reverses ties too; notes without the field still come last.
+    assert descending == ["b", "e", "a", "c", "f", "g", "d"]
+
+
+@pytest.mark.parametrize("desc", [False, True])
+def test_pages_cover_every_match_once(vault, capsys, ranked, desc: bool) -> None:
+    order = ["--sort-by", "rank"] + (["--desc"] if desc else [])
+    full, _ = query(vault, capsys, *order)
+
+    pages = all_pages(vault, capsys, *order, "--limit", "3")
+
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [name for page in pages for name in page] == full
+
+
+def test_cursor_skips_notes_filtered_out(vault, capsys, ranked) -> None:
+    vault.write("h.md", id="h", rank=0, tags=["keep"])
+    vault.write("i.md", id="i", rank=5, tags=["keep"])
+    vault.write("j.md", id="j", rank=7, tags=["keep"])
+
+    pages = all_pages(vault, capsys, "--sort-by", "rank", "--tag", "keep", "--limit", "2")
+
+    assert pages == [["h", "i"], ["j"]]
+
+
+def test_cursor_is_tied_to_its_ordering(vault, capsys, ranked) -> None:
+    _, cursor = query(vault, capsys, "--sort-by", "rank", "--limit", "2")
+
+    status = capture_query.main(["--root", str(vault.root), "--sort-by", "id", "--after", cursor])
+
+    assert status == 2
+    assert "issued for --sort-by rank" in capsys.readouterr().err
+
+
+def test_plain_limit_prints_no_cursor(vault, capsys, ranked) -> None:
+    page, cursor = query(vault, capsys, "--limit", "2")
+
+    assert page == ["a", "b"]
+    assert cursor is None
+
+
+def test_server_index_pages_like_a_scan(vault, capsys, ranked) -> None:
+    model = capture_query.VaultModel(vault.capture_dir)
+    model.reload()
+    scanned = all_pages(vault, capsys, "--sort-by", "rank", "--limit", "3")
+
+    served: List[List[str]] = []
+    after: Sequence[str] = ()
+    while True:
+        out = io.StringIO()
+        args = capture_query.parse_args(["--format", "paths", "--sort-by", "rank", "--limit", "3", *after])
+        assert capture_query.run_query(args, model.notes(), out, ordered=model.sorted_by) == 0
+        served.append([Path(line).stem for line in out.getvalue().splitlines()])
+        cursor = NEXT_PAGE.search(capsys.readouterr().err)
+        if cursor is None:
+            break
+        after = ("--after", cursor.group(1))
+
+    assert served == scanned
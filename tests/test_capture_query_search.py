@@ -0,0 +1,66 @@
+"""Content filters in capture_query: --search, --search-any, --regex and --case-sensitive."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from scripts import capture_query
+
+
+@pytest.fixture
+def bodies(vault) -> None:
+    vault.write("budget.md", "Review the BUDGET before Friday.", id="budget")
+    vault.write("release.md", "Release notes for v1.2 (draft).", id="release")
+    vault.write("cpp.md", "Learn C++ templates; see a.b.c", id="cpp")
+    vault.write("plain.md", "Nothing to see here", id="plain")
+
+
+def search(vault, capsys, *argv: str) -> List[str]:
+    assert capture_query.main(["--root", str(vault.root), "--format", "paths", *argv]) == 0
+    return sorted(Path(line).stem for line in capsys.readouterr().out.splitlines())
+
+
+def test_search_any_ignores_case(vault, capsys, bodies) -> None:
+    assert search(vault, capsys, "--search-any", "budget", "--search-any", "RELEASE") == ["budget", "release"]
+    assert search(vault, capsys, "--search-any", "budget", "--search-any", "bud") == ["budget"]
+
+
+def test_search_requires_every_needle_ignoring_case(vault, capsys, bodies) -> None:
+    assert search(vault, capsys, "--search", "review", "--search", "Budget") == ["budget"]
+    assert search(vault, capsys, "--search", "review", "--search", "release") == []
+    assert search(vault, capsys, "--search", "notes", "--search-any", "DRAFT", "--search-any", "final") == ["release"]
+
+
+def test_case_sensitive_literals(vault, capsys, bodies) -> None:
+    assert search(vault, capsys, "--case-sensitive", "--search", "budget") == []
+    assert search(vault, capsys, "--case-sensitive", "--search-any", "BUDGET", "--search-any", "release") == ["budget"]
+
+
+@pytest.mark.parametrize(
+    "argv, expected",
+    [
+        (["--search", "C++"], ["cpp"]),
+        (["--search-any", "a.b.c", "--search-any", "v1.2 (draft)"], ["cpp", "release"]),
+        (["--search-any", "v1?2"], []),
+        (["--search", "a.b.c", "--search", "[x]"], []),
+    ],
+)
+def test_literal_needles_escape_regex_metacharacters(vault, capsys, bodies, argv, expected) -> None:
+    assert search(vault, capsys, *argv) == expected
+
+
+def test_regex_patterns(vault, capsys, bodies) -> None:
+    assert search(vault, capsys, "--regex", "--search", r"bud\w+t") == ["budget"]
+    assert search(vault, capsys, "--regex", "--search-any", r"v\d\.\d", "--search-any", r"C\+\+") == ["cpp", "release"]
+    assert search(vault, capsys, "--regex", "--case-sensitive", "--search", r"bud\w+t") == []
+
+
+def test_invalid_regex_is_a_usage_error(vault, capsys, bodies) -> None:
+    with pytest.raises(SystemExit) as exc:
+        capture_query.main(["--root", str(vault.root), "--regex", "--search", "[unclosed"])
+
+    assert exc.value.code == 2
+    assert "invalid regular expression" in capsys.readouterr().err
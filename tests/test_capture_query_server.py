@@ -0,0 +1,111 @@
+"""capture_query serve: forwarding, live updates, and failures that must not stop the server."""
+
+from __future__ import annotations
+
+import json
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+import pytest
+
+from scripts import capture_query
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def request(socket_path: Path, argv: List[str]) -> Dict[str, Any]:
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(str(socket_path))
+        client.sendall(json.dumps({"argv": argv, "cwd": "/"}).encode("utf-8") + b"\n")
+        chunks = []
+        while True:
+            chunk = client.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    finally:
+        client.close()
+    return json.loads(b"".join(chunks).decode("utf-8"))
+
+
+@pytest.fixture
+def server(vault, tmp_path: Path) -> Iterator[Path]:
+    vault.write("a.md", id="a", tags=["x"])
+    vault.write("b.md", id="b")
+    socket_path = tmp_path / "query.sock"
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "scripts.capture_query",
+            "serve",
+            "--root",
+            str(vault.root),
+            "--socket",
+            str(socket_path),
+        ],
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    deadline = time.monotonic() + 30
+    while not socket_path.exists():
+        assert process.poll() is None, process.stderr.read()
+        assert time.monotonic() < deadline, "server did not start"
+        time.sleep(0.05)
+    yield socket_path
+    process.terminate()
+    process.wait(timeout=30)
+
+
+def test_client_forwards_to_server(vault, server: Path, capsys) -> None:
+    status = capture_query.main(["--server", str(server), "--root", str(vault.root), "--format", "paths", "--tag", "x"])
+
+    assert status == 0
+    assert capsys.readouterr().out.splitlines() == [str(vault.capture_dir / "a.md")]
+
+
+def test_answers_follow_created_and_deleted_notes(vault, server: Path) -> None:
+    argv = ["--root", str(vault.root), "--format", "paths"]
+    vault.write("c.md", id="c")
+    created = request(server, argv)
+    (vault.capture_dir / "a.md").unlink()
+    deleted = request(server, argv)
+
+    assert [Path(line).stem for line in created["stdout"].splitlines()] == ["a", "b", "c"]
+    assert [Path(line).stem for line in deleted["stdout"].splitlines()] == ["b", "c"]
+
+
+def test_other_vault_is_refused(tmp_path: Path, server: Path) -> None:
+    response = request(server, ["--root", str(tmp_path / "elsewhere")])
+
+    assert response["status"] == capture_query.SERVER_WRONG_VAULT
+
+
+def test_failing_query_does_not_stop_the_server(vault, monkeypatch: pytest.MonkeyPatch) -> None:
+    model = capture_query.VaultModel(vault.capture_dir)
+    model.reload()
+
+    def ask() -> Dict[str, Any]:
+        server_end, client_end = socket.socketpair()
+        with server_end, client_end:
+            client_end.sendall(json.dumps({"argv": ["--root", str(vault.root)], "cwd": "/"}).encode("utf-8") + b"\n")
+            capture_query.handle_connection(server_end, model)
+            return json.loads(client_end.recv(65536).decode("utf-8"))
+
+    def broken(*_: Any, **__: Any) -> int:
+        raise RuntimeError("zstandard is not installed")
+
+    real_run_query = capture_query.run_query
+    monkeypatch.setattr(capture_query, "run_query", broken)
+    failed = ask()
+    monkeypatch.setattr(capture_query, "run_query", real_run_query)
+
+    assert failed == {"status": 2, "stdout": "", "stderr": "Error: zstandard is not installed\n"}
+    assert ask()["status"] == 0
@@ -0,0 +1,108 @@
+"""The `changes` journal: what refreshes record, compaction, and the `changes` subcommand."""
+
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+import pytest
+
+from scripts.automation import cli
+from scripts.automation.emitter import NoteEmitter
+from scripts.automation.notes import iter_note_payloads
+from scripts.automation.store import CREATED, DELETED, MODIFIED, AutomationStore
+
+
+@pytest.fixture
+def store(tmp_path: Path):
+    store = AutomationStore(tmp_path / "state.db")
+    yield store
+    store.close()
+
+
+def refresh(store: AutomationStore, vault) -> None:
+    NoteEmitter(store).refresh(iter_note_payloads(vault.root, vault.capture_dir))
+
+
+def journal(store: AutomationStore, since: int = 0) -> List[Tuple[str, str, bool]]:
+    """(kind, file name, has a hash) per entry after `since`."""
+    return [(change.kind, Path(change.path).name, change.note_hash is not None) for change in store.iter_changes(since)]
+
+
+def test_upserts_journal_created_and_modified_notes(store, vault) -> None:
+    vault.write("a.md", "one", id="a")
+    vault.write("b.md", "two", id="b")
+    refresh(store, vault)
+    assert sorted(journal(store)) == [(CREATED, "a.md", True), (CREATED, "b.md", True)]
+
+    seq = store.last_change_seq()
+    refresh(store, vault)
+    assert journal(store, seq) == [], "an unchanged note is not journalled again"
+
+    vault.write("a.md", "one, edited", id="a")
+    refresh(store, vault)
+    changes = list(store.iter_changes(seq))
+    assert [(change.kind, Path(change.path).name) for change in changes] == [(MODIFIED, "a.md")]
+    assert changes[0].note_hash == store.get_note_hash(vault.capture_dir / "a.md")
+
+
+def test_purge_journals_deletes_and_renames(store, vault) -> None:
+    vault.write("a.md", "stays", id="a")
+    vault.write("b.md", "goes", id="b")
+    vault.write("c.md", "moves", id="c")
+    refresh(store, vault)
+    seq = store.last_change_seq()
+
+    (vault.capture_dir / "b.md").unlink()
+    (vault.capture_dir / "c.md").rename(vault.capture_dir / "d.md")
+    refresh(store, vault)
+
+    assert journal(store, seq) == [(CREATED, "d.md", True), (DELETED, "b.md", False), (DELETED, "c.md", False)]
+
+
+def test_compaction_drops_old_entries_and_advances_the_watermark(store, vault) -> None:
+    for name in ("a", "b", "c"):
+        vault.write(f"{name}.md", name, id=name)
+        refresh(store, vault)
+    now = int(time.time())
+    store._conn.execute("UPDATE changes SET changed_at = ? WHERE seq <= 2", (now - 3600,))
+    store._conn.commit()
+
+    assert store.compact_changes(now - 60) == 2
+    assert store.compacted_through() == 2
+    assert [Path(change.path).name for change in store.iter_changes()] == ["c.md"]
+    assert store.compact_changes(now - 60) == 0
+    assert store.compacted_through() == 2, "nothing left to drop keeps the watermark"
+
+    assert store.compact_changes(now + 60) == 1
+    assert store.compacted_through() == 3
+    assert store.last_change_seq() == 3, "an empty journal still reports where it ended"
+    vault.write("d.md", "d", id="d")
+    refresh(store, vault)
+    assert [change.seq for change in store.iter_changes()] == [4], "sequence numbers are never reused"
+
+
+def test_changes_command_asks_readers_behind_compaction_to_resync(tmp_path, vault, make_config, run_pipeline, capsys) -> None:
+    config = make_config(taskwarrior=None)
+    vault.write("a.md", "a", id="a")
+    vault.write("b.md", "b", id="b")
+    assert run_pipeline(config) == 0
+    argv = ["changes", "--config", str(tmp_path / "automations.toml"), "--format", "json"]
+
+    assert cli.main(argv) == 0
+    listed = json.loads(capsys.readouterr().out)
+    assert [(change["seq"], change["kind"]) for change in listed["changes"]] == [(1, CREATED), (2, CREATED)]
+
+    store = AutomationStore(config.database_path)
+    try:
+        store.compact_changes(int(time.time()) + 60)
+    finally:
+        store.close()
+
+    assert cli.main(argv) == 3
+    document = json.loads(capsys.readouterr().out)
+    assert (document["resync"], document["compacted_through"], document["last_seq"]) == (True, 2, 2)
+    assert cli.main([*argv, "--since", "2"]) == 0
+    assert json.loads(capsys.readouterr().out)["changes"] == []
@@ -0,0 +1,129 @@
+"""Numbered schema migrations and resumable backfills."""
+
+from __future__ import annotations
+
+import dataclasses
+import json
+import logging
+import sqlite3
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from scripts.automation import migrations
+from scripts.automation.migrations import BACKFILL_KEY, LATEST_VERSION, migrate, schema_version
+from scripts.automation.notes import frontmatter_digests
+from scripts.automation.store import AutomationStore
+
+
+@pytest.fixture
+def conn(tmp_path: Path):
+    conn = sqlite3.connect(str(tmp_path / "state.db"))
+    yield conn
+    conn.close()
+
+
+def migrate_to(conn: sqlite3.Connection, version: int, monkeypatch: pytest.MonkeyPatch) -> None:
+    with monkeypatch.context() as patch:
+        patch.setattr(migrations, "MIGRATIONS", migrations.MIGRATIONS[:version])
+        migrate(conn)
+    assert schema_version(conn) == version
+
+
+def add_notes(conn: sqlite3.Connection, count: int) -> None:
+    with conn:
+        conn.executemany(
+            "INSERT INTO notes(path, note_hash, metadata_json, seen_at) VALUES (?, ?, ?, 0)",
+            (
+                (f"/v/note-{index:02d}.md", f"h{index}", json.dumps({"tags": [f"Tag{index % 3}", "todo"]}))
+                for index in range(count)
+            ),
+        )
+
+
+def tables(conn: sqlite3.Connection) -> List[str]:
+    return sorted(row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'"))
+
+
+def test_fresh_database_reaches_the_latest_version(tmp_path: Path) -> None:
+    AutomationStore(tmp_path / "state.db").close()
+    store = AutomationStore(tmp_path / "state.db")
+    try:
+        assert store.get_metadata("schema_version") == str(LATEST_VERSION)
+    finally:
+        store.close()
+
+
+def test_unversioned_database_replays_every_step(conn: sqlite3.Connection) -> None:
+    for statement in migrations.MIGRATIONS[0].statements:
+        conn.execute(statement)
+    conn.execute("ALTER TABLE notes ADD COLUMN mtime_ns INTEGER NOT NULL DEFAULT 0")
+    conn.commit()
+
+    assert migrate(conn) == LATEST_VERSION
+    assert {"changes", "leases", "note_tags", "retries"} <= set(tables(conn))
+
+
+def test_newer_database_is_left_alone(conn: sqlite3.Connection, caplog: pytest.LogCaptureFixture) -> None:
+    migrate(conn)
+    conn.execute("UPDATE metadata SET value = ? WHERE key = 'schema_version'", (str(LATEST_VERSION + 1),))
+    conn.commit()
+
+    with caplog.at_level(logging.WARNING):
+        assert migrate(conn) == LATEST_VERSION + 1
+    assert "newer than this code" in caplog.text
+
+
+def test_backfills_derive_tags_and_field_digests(conn: sqlite3.Connection, monkeypatch: pytest.MonkeyPatch) -> None:
+    migrate_to(conn, 4, monkeypatch)
+    add_notes(conn, 3)
+    with conn:
+        conn.execute(
+            "INSERT INTO emissions(consumer, note_path, note_hash, emitted_at) VALUES"
+            " ('c', '/v/note-00.md', 'h0', 0), ('c', '/v/note-01.md', 'stale', 0)"
+        )
+
+    migrate(conn)
+
+    assert conn.execute("SELECT tag FROM note_tags WHERE path = '/v/note-01.md' ORDER BY tag").fetchall() == [
+        ("tag1",),
+        ("todo",),
+    ]
+    expected = frontmatter_digests({"tags": ["Tag0", "todo"]})
+    assert conn.execute("SELECT field_digests FROM notes WHERE path = '/v/note-00.md'").fetchone() == (expected,)
+    emitted = dict(conn.execute("SELECT note_path, field_digests FROM emissions").fetchall())
+    assert emitted == {"/v/note-00.md": expected, "/v/note-01.md": None}
+    assert conn.execute("SELECT COUNT(*) FROM metadata WHERE key LIKE 'schema.backfill.%'").fetchone() == (0,)
+
+
+def test_interrupted_backfill_resumes_from_its_cursor(
+    conn: sqlite3.Connection, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    migrate_to(conn, 4, monkeypatch)
+    add_notes(conn, 7)
+    monkeypatch.setattr(migrations, "BACKFILL_BATCH", 2)
+    starts: List[str] = []
+
+    def crash_on_third_batch(connection: sqlite3.Connection, after: str):
+        starts.append(after)
+        if len(starts) == 3:
+            raise RuntimeError("killed")
+        return migrations._backfill_note_tags(connection, after)
+
+    tag_step = dataclasses.replace(migrations.MIGRATIONS[4], backfill=crash_on_third_batch)
+    with monkeypatch.context() as patch:
+        patch.setattr(migrations, "MIGRATIONS", (*migrations.MIGRATIONS[:4], tag_step, *migrations.MIGRATIONS[5:]))
+        with pytest.raises(RuntimeError):
+            migrate(conn)
+
+    assert schema_version(conn) == LATEST_VERSION
+    cursor = conn.execute("SELECT value FROM metadata WHERE key = ?", (BACKFILL_KEY.format(version=5),)).fetchone()
+    assert cursor == ("/v/note-03.md",)
+    assert conn.execute("SELECT COUNT(DISTINCT path) FROM note_tags").fetchone() == (4,)
+
+    migrate(conn)
+
+    assert starts == ["", "/v/note-01.md", "/v/note-03.md"]
+    assert conn.execute("SELECT COUNT(DISTINCT path) FROM note_tags").fetchone() == (7,)
+    assert conn.execute("SELECT COUNT(*) FROM metadata WHERE key LIKE 'schema.backfill.%'").fetchone() == (0,)
@@ -0,0 +1,66 @@
+"""Not-applicable checkpoints keep non-matching notes from being re-evaluated."""
+
+from __future__ import annotations
+
+from typing import Dict
+
+PICKY = """
+[consumers.picky]
+type = "recorder"
+require = {{ kind = "{kind}" }}
+"""
+
+
+def statuses(query_state, config) -> Dict[str, str]:
+    rows = query_state(config, "SELECT note_path, status FROM emissions WHERE consumer = 'picky'")
+    return {path.rsplit("/", 1)[-1]: status for path, status in rows}
+
+
+def names(paths) -> list:
+    return sorted(path.name for path in paths)
+
+
+def test_rejected_notes_are_not_matched_again(vault, make_config, recorder, run_pipeline, query_state) -> None:
+    config = make_config(PICKY.format(kind="task"), taskwarrior=None)
+    vault.write("a.md", "do it", kind="task")
+    vault.write("b.md", "just a note", kind="note")
+    vault.write("c.md", "no kind")
+
+    assert run_pipeline(config) == 0
+    assert names(recorder.matched) == ["a.md", "b.md", "c.md"]
+    assert names(recorder.handled) == ["a.md"]
+    assert statuses(query_state, config) == {"a.md": "success", "b.md": "not_applicable", "c.md": "not_applicable"}
+
+    recorder.matched.clear()
+    assert run_pipeline(config) == 0
+    assert recorder.matched == []
+
+
+def test_edited_note_is_re_evaluated(vault, make_config, recorder, run_pipeline, query_state) -> None:
+    config = make_config(PICKY.format(kind="task"), taskwarrior=None)
+    vault.write("b.md", "just a note", kind="note")
+    run_pipeline(config)
+    recorder.matched.clear()
+
+    vault.write("b.md", "now a task", kind="task")
+    run_pipeline(config)
+
+    assert names(recorder.matched) == ["b.md"]
+    assert names(recorder.handled) == ["b.md"]
+    assert statuses(query_state, config) == {"b.md": "success"}
+
+
+def test_changed_settings_reset_not_applicable(vault, make_config, recorder, run_pipeline, query_state) -> None:
+    vault.write("a.md", "do it", kind="task")
+    vault.write("b.md", "just a note", kind="note")
+    run_pipeline(make_config(PICKY.format(kind="task"), taskwarrior=None))
+    recorder.matched.clear()
+    recorder.handled.clear()
+
+    config = make_config(PICKY.format(kind="note"), taskwarrior=None)
+    run_pipeline(config)
+
+    # Only the not-applicable checkpoint is dropped; a.md stays emitted.
+    assert names(recorder.matched) == ["b.md"]
+    assert names(recorder.handled) == ["b.md"]
+    assert statuses(query_state, config) == {"a.md": "success", "b.md": "success"}
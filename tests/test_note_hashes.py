@@ -0,0 +1,40 @@
+"""Note digests stay compatible with those stored before notes were hashed as bytes."""
+
+from __future__ import annotations
+
+import hashlib
+
+import pytest
+
+from scripts.automation.hashing import hash_bytes
+
+RECORDER = """
+[consumers.recorder]
+type = "recorder"
+"""
+
+
+@pytest.mark.parametrize("newline", ["\r\n", "\r", "\n"])
+def test_digest_matches_text_read_with_universal_newlines(tmp_path, newline: str) -> None:
+    path = tmp_path / "note.md"
+    path.write_bytes(newline.join(["---", "id: a", "---", "Body", ""]).encode("utf-8"))
+
+    legacy = hashlib.sha256(path.read_text(encoding="utf-8").encode("utf-8")).hexdigest()
+
+    assert hash_bytes(path.read_bytes()) == legacy
+
+
+def test_crlf_note_emitted_before_upgrade_is_not_re_emitted(vault, make_config, recorder, run_pipeline, query_state) -> None:
+    config = make_config(RECORDER, taskwarrior=None)
+    path = vault.capture_dir / "windows.md"
+    path.write_bytes(b"---\r\nid: w\r\ntags: [todo]\r\n---\r\nFrom Windows\r\n")
+    legacy = hashlib.sha256(path.read_text(encoding="utf-8").encode("utf-8")).hexdigest()
+    assert run_pipeline(config) == 0
+    # What a run before the upgrade left behind: checkpoints at the text digest.
+    query_state(config, "UPDATE notes SET note_hash = ?", legacy)
+    query_state(config, "UPDATE emissions SET note_hash = ?", legacy)
+    recorder.handled.clear()
+
+    assert run_pipeline(config) == 0
+    assert recorder.handled == []
+    assert query_state(config, "SELECT note_hash FROM notes") == [(legacy,)]
@@ -0,0 +1,82 @@
+"""The shared note reader: parse cache validation and what consumers see of a note."""
+
+from __future__ import annotations
+
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+import yaml
+
+from scripts.automation.consumers.taskwarrior import _task_timestamp
+from scripts.automation.frontmatter import read_note
+from scripts.vault.index import FileStamp, ParseCache
+
+
+@pytest.fixture
+def cache(tmp_path: Path):
+    cache = ParseCache(tmp_path / "cache.sqlite")
+    yield cache
+    cache.close()
+
+
+def write_with_mtime(path: Path, text: str, mtime_ns: int) -> None:
+    path.write_text(text, encoding="utf-8")
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.mark.parametrize("field", ["ctime_ns", "ino"])
+def test_cache_misses_when_only_ctime_or_inode_differs(cache: ParseCache, field: str) -> None:
+    stamp = FileStamp(mtime_ns=1_000, size=10, ctime_ns=2_000, ino=42)
+    cache.put("note.md", stamp, {"id": "a"}, 12, "hash")
+
+    assert cache.get("note.md", stamp) is not None
+    assert cache.get("note.md", stamp._replace(**{field: getattr(stamp, field) + 1})) is None
+
+
+def test_replaced_file_with_same_size_and_mtime_is_reparsed(vault, cache: ParseCache) -> None:
+    path = vault.write("a.md", "body", id="a")
+    mtime_ns = path.stat().st_mtime_ns
+    assert read_note(path, cache=cache).frontmatter == {"id": "a"}
+
+    # An editor saving through a temporary file: new inode, same size and mtime.
+    replacement = vault.write("a.md.tmp", "body", id="b")
+    os.utime(replacement, ns=(mtime_ns, mtime_ns))
+    os.replace(replacement, path)
+
+    assert path.stat().st_mtime_ns == mtime_ns
+    assert read_note(path, cache=cache).frontmatter == {"id": "b"}
+
+
+def test_same_size_edit_with_restored_mtime_is_reparsed(vault, cache: ParseCache) -> None:
+    path = vault.write("a.md", "body", id="a")
+    mtime_ns = path.stat().st_mtime_ns
+    assert read_note(path, cache=cache).frontmatter == {"id": "a"}
+
+    time.sleep(0.05)  # ctime has clock-tick granularity
+    write_with_mtime(path, path.read_text(encoding="utf-8").replace("id: a", "id: b"), mtime_ns)
+
+    assert read_note(path, cache=cache).frontmatter == {"id": "b"}
+
+
+def test_content_and_text_read_as_before(vault) -> None:
+    path = vault.capture_dir / "windows.md"
+    path.write_bytes(b"---\r\nid: w\r\n---\r\n\r\n\r\nFirst line\r\nSecond\rThird\r\n")
+
+    note = read_note(path)
+
+    assert note.content == "First line\nSecond\nThird\n"
+    assert note.raw_text == "---\nid: w\n---\n\n\nFirst line\nSecond\nThird\n"
+
+
+def test_timestamps_stay_strings_and_still_date_tasks(vault) -> None:
+    path = vault.write("a.md", "body", id="a", timestamp="2024-01-02T10:00:00Z", created_date="2024-1-2 10:00:00 -5")
+
+    frontmatter = read_note(path).frontmatter
+
+    assert frontmatter["timestamp"] == "2024-01-02T10:00:00Z"
+    assert _task_timestamp(frontmatter["timestamp"]) == "20240102T100000Z"
+    assert _task_timestamp(frontmatter["created_date"]) == "20240102T150000Z"
+    assert isinstance(yaml.safe_load("2024-01-02 10:00:00"), datetime), "other YAML loads keep timestamps"
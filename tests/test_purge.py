@@ -0,0 +1,135 @@
+"""purge_missing: the anti-join over scanned paths and rename carry-over."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from scripts.automation.config import RetryConfig
+from scripts.automation.emitter import NoteEmitter
+from scripts.automation.notes import iter_note_payloads
+from scripts.automation.store import AutomationStore
+
+TABLES = {
+    "notes": "path",
+    "emissions": "note_path",
+    "note_tags": "path",
+    "retries": "note_path",
+    "leases": "note_path",
+}
+
+
+@pytest.fixture
+def store(tmp_path: Path):
+    store = AutomationStore(tmp_path / "state.db")
+    yield store
+    store.close()
+
+
+def refresh(store: AutomationStore, vault, **kwargs):
+    return NoteEmitter(store).refresh(iter_note_payloads(vault.root, vault.capture_dir), **kwargs)
+
+
+def rows_for(store: AutomationStore, path: Path) -> dict:
+    conn = store._conn
+    return {
+        table: conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {column} = ?", (str(path),)).fetchone()[0]
+        for table, column in TABLES.items()
+    }
+
+
+def checkpoint(store: AutomationStore, path: Path) -> None:
+    note_hash = store.get_note_hash(path)
+    store.mark_emitted("c", path, note_hash)
+    store.record_failure("d", path, note_hash, "boom", RetryConfig())
+    store.claim("e", path, note_hash, "host:1", ttl=60)
+
+
+def test_missing_note_is_forgotten_everywhere(store, vault) -> None:
+    gone = vault.write("gone.md", "bye", tags=["todo"])
+    vault.write("kept.md", "stay", tags=["todo"])
+    refresh(store, vault)
+    checkpoint(store, gone)
+    since = store.last_change_seq()
+
+    gone.unlink()
+    summary = refresh(store, vault)
+
+    assert (summary.deleted, summary.renamed) == (1, 0)
+    assert rows_for(store, gone) == dict.fromkeys(TABLES, 0)
+    assert [(change.path, change.kind) for change in store.iter_changes(since)] == [(str(gone), "deleted")]
+
+
+def test_packed_cold_and_foreign_notes_are_kept(store, vault) -> None:
+    packed = vault.write("packed.md", "p")
+    cold = vault.write("cold.md", "c", processing_status="organized")
+    foreign = vault.write("foreign.md", "f")
+    refresh(store, vault)
+    store.mark_packed([str(packed)])
+    store.mark_cold(["organized"], cutoff_ns=2**62)
+    for path in (packed, cold, foreign):
+        path.unlink()
+
+    assert refresh(store, vault, partial=True, owns=lambda path: path != str(foreign)).deleted == 0
+    assert store.get_note_hash(cold) is not None
+    assert refresh(store, vault).deleted == 2
+    assert store.get_note_hash(packed) is not None
+
+
+def test_rename_carries_checkpoints_to_the_new_path(store, vault) -> None:
+    old = vault.write("old.md", "same content", tags=["todo"])
+    refresh(store, vault)
+    checkpoint(store, old)
+
+    new = old.rename(old.with_name("new.md"))
+    summary = refresh(store, vault)
+
+    assert (summary.created, summary.deleted, summary.renamed) == (1, 1, 1)
+    assert store.get_emission_hash("c", new) == store.get_note_hash(new)
+    assert [retry.path for retry in store.iter_retries("d")] == [str(new)]
+    assert rows_for(store, old) == dict.fromkeys(TABLES, 0)
+    assert rows_for(store, new)["leases"] == 0, "leases are not carried"
+
+
+def test_ambiguous_renames_drop_checkpoints(store, vault) -> None:
+    first = vault.write("first.md", "twin")
+    second = vault.write("second.md", "twin")
+    refresh(store, vault)
+    checkpoint(store, first)
+    checkpoint(store, second)
+
+    first.unlink()
+    moved = second.rename(second.with_name("moved.md"))
+    summary = refresh(store, vault)
+
+    assert (summary.deleted, summary.renamed) == (2, 0)
+    assert store.get_emission_hash("c", moved) is None
+
+
+def test_rename_onto_a_note_with_checkpoints_is_not_merged(store, vault) -> None:
+    old = vault.write("old.md", "content")
+    target = vault.write("target.md", "other")
+    refresh(store, vault)
+    checkpoint(store, old)
+    store.mark_emitted("c", target, store.get_note_hash(target))
+    emitted_before = store.get_emission_hash("c", target)
+
+    old.unlink()
+    vault.write("target.md", "content")
+    summary = refresh(store, vault)
+
+    assert summary.renamed == 0
+    assert store.get_emission_hash("c", target) == emitted_before
+
+
+def test_renamed_note_is_not_redispatched(vault, make_config, recorder, run_pipeline) -> None:
+    config = make_config('[consumers.rec]\ntype = "recorder"\n', taskwarrior=None)
+    note = vault.write("old.md", "content", tags=["todo"])
+    run_pipeline(config)
+    recorder.handled.clear()
+
+    note.rename(note.with_name("renamed.md"))
+    run_pipeline(config)
+
+    assert recorder.handled == []
@@ -0,0 +1,108 @@
+"""Retry queue with exponential backoff and dead letters."""
+
+from __future__ import annotations
+
+import time
+from pathlib import Path
+
+import pytest
+
+from scripts.automation import cli
+from scripts.automation.config import RetryConfig
+
+FLAKY = """
+[consumers.flaky]
+type = "recorder"
+
+[retry]
+max_attempts = 3
+base_delay_seconds = 60
+max_delay_seconds = 100
+"""
+
+
+@pytest.fixture
+def config(make_config):
+    return make_config(FLAKY, taskwarrior=None)
+
+
+def retry_row(query_state, config):
+    rows = query_state(config, "SELECT attempts, next_attempt_at - failed_at, dead, last_error FROM retries")
+    return rows[0] if rows else None
+
+
+def backoff_elapsed(query_state, config) -> None:
+    query_state(config, "UPDATE retries SET next_attempt_at = ?", int(time.time()) - 1)
+
+
+def test_delay_doubles_up_to_the_cap() -> None:
+    policy = RetryConfig(max_attempts=5, base_delay_seconds=60, max_delay_seconds=200)
+
+    assert [policy.delay(attempt) for attempt in (1, 2, 3, 4)] == [60, 120, 200, 200]
+
+
+def test_failures_back_off_then_become_dead_letters(vault, config, recorder, run_pipeline, query_state) -> None:
+    vault.write("a.md", "x", fail="true")
+
+    assert run_pipeline(config) == 1
+    assert retry_row(query_state, config) == (1, 60, 0, "RuntimeError: cannot handle a.md")
+
+    run_pipeline(config)
+    assert len(recorder.handled) == 1, "retried before its backoff elapsed"
+
+    backoff_elapsed(query_state, config)
+    run_pipeline(config)
+    assert retry_row(query_state, config)[:3] == (2, 100, 0)
+
+    backoff_elapsed(query_state, config)
+    run_pipeline(config)
+    assert retry_row(query_state, config)[:3] == (3, 100, 1)
+
+    backoff_elapsed(query_state, config)
+    run_pipeline(config)
+    assert len(recorder.handled) == 3, "dead letters are not retried"
+
+
+def test_edit_retries_at_once_with_a_fresh_count(vault, config, recorder, run_pipeline, query_state) -> None:
+    vault.write("a.md", "x", fail="true")
+    run_pipeline(config)
+    backoff_elapsed(query_state, config)
+    run_pipeline(config)
+
+    vault.write("a.md", "edited", fail="true")
+    run_pipeline(config)
+
+    assert len(recorder.handled) == 3
+    assert retry_row(query_state, config)[0] == 1
+
+
+def test_success_clears_the_retry(vault, config, recorder, run_pipeline, query_state) -> None:
+    vault.write("a.md", "x", fail="true")
+    run_pipeline(config)
+
+    vault.write("a.md", "x", fail="false")
+
+    assert run_pipeline(config) == 0
+    assert retry_row(query_state, config) is None
+
+
+def test_dead_letters_cli_lists_and_requeues(
+    tmp_path: Path, vault, config, recorder, run_pipeline, query_state, capsys
+) -> None:
+    note = vault.write("a.md", "x", fail="true")
+    for _ in range(3):
+        run_pipeline(config)
+        backoff_elapsed(query_state, config)
+    capsys.readouterr()
+    argv = ["dead-letters", "--config", str(tmp_path / "automations.toml")]
+
+    assert cli.main(argv) == 0
+    consumer, attempts, state, path, error = capsys.readouterr().out.strip().split("\t")
+    assert (consumer, attempts, state, path) == ("flaky", "3", "dead", str(note))
+    assert error == "RuntimeError: cannot handle a.md"
+
+    assert cli.main([*argv, "--requeue", str(note)]) == 0
+    assert retry_row(query_state, config) is None
+    run_pipeline(config)
+    assert len(recorder.handled) == 4
+    assert retry_row(query_state, config)[0] == 1
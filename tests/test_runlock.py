@@ -0,0 +1,121 @@
+"""Run locks, rerun coalescing and the dispatch lock shared by runs and archive."""
+
+from __future__ import annotations
+
+import fcntl
+import os
+import threading
+from pathlib import Path
+from typing import Callable, List
+
+from scripts.automation import archive, cli
+from scripts.automation.runlock import DISPATCH_LOCK_NAME, dispatch_lock, run_coalesced
+
+
+def can_lock(state_dir: Path, mode: int) -> bool:
+    """Whether a separate open of dispatch.lock could take `mode` right now."""
+    fd = os.open(state_dir / DISPATCH_LOCK_NAME, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, mode | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    finally:
+        os.close(fd)
+    return True
+
+
+def in_thread(target: Callable[[], int]) -> Callable[[float], List[int]]:
+    """Start `target`; the returned join gives its status, or nothing while it still runs."""
+    result: List[int] = []
+    thread = threading.Thread(target=lambda: result.append(target()), daemon=True)
+    thread.start()
+
+    def join(timeout: float) -> List[int]:
+        thread.join(timeout)
+        return result
+
+    return join
+
+
+def test_second_run_only_requests_a_rerun(tmp_path: Path) -> None:
+    inner: List[bool] = []
+
+    def outer_pass(rerun: bool) -> int:
+        if not rerun:
+            assert run_coalesced(tmp_path, lambda again: inner.append(again) or 0) == 0
+            assert (tmp_path / "rerun.requested").exists()
+        return 0
+
+    run_coalesced(tmp_path, outer_pass)
+
+    assert inner == [], "the second invocation never runs a pass of its own"
+
+
+def test_holder_runs_exactly_one_more_pass(tmp_path: Path) -> None:
+    passes: List[bool] = []
+
+    def run_pass(rerun: bool) -> int:
+        passes.append(rerun)
+        if not rerun:
+            for _ in range(3):
+                run_coalesced(tmp_path, run_pass)
+        return 1 if rerun else 0
+
+    assert run_coalesced(tmp_path, run_pass) == 1
+
+    assert passes == [False, True]
+    assert not (tmp_path / "rerun.requested").exists()
+    assert run_coalesced(tmp_path, lambda rerun: passes.append(rerun) or 0) == 0
+    assert passes == [False, True, False], "the lock is free again afterwards"
+
+
+def test_shard_runs_hold_the_dispatch_lock_shared(tmp_path: Path) -> None:
+    seen: List[bool] = []
+
+    def shard_pass(_rerun: bool) -> int:
+        seen.append(can_lock(tmp_path, fcntl.LOCK_SH))
+        seen.append(can_lock(tmp_path, fcntl.LOCK_EX))
+        return 0
+
+    with dispatch_lock(tmp_path, shared=True):
+        join = in_thread(lambda: run_coalesced(tmp_path, shard_pass, suffix=".shard-1-of-2", shared=True))
+        assert join(10) == [0], "a shard does not wait for another shard"
+
+    assert seen == [True, False]
+
+
+def test_whole_vault_run_waits_for_shards(tmp_path: Path) -> None:
+    passes: List[bool] = []
+
+    with dispatch_lock(tmp_path, shared=True):
+        join = in_thread(lambda: run_coalesced(tmp_path, lambda rerun: passes.append(rerun) or 0))
+        assert join(0.3) == []
+        assert passes == []
+
+    assert join(10) == [0]
+    assert passes == [False]
+
+
+def test_archive_holds_the_dispatch_lock_exclusively(tmp_path: Path, vault, make_config, run_pipeline, monkeypatch) -> None:
+    config = make_config(taskwarrior=None)
+    vault.write("a.md", "done", processing_status="organized")
+    assert run_pipeline(config) == 0
+    real_pack = archive.pack_cold_notes
+    shared_while_packing: List[bool] = []
+
+    def pack(*args, **kwargs):
+        shared_while_packing.append(can_lock(config.state_dir, fcntl.LOCK_SH))
+        return real_pack(*args, **kwargs)
+
+    monkeypatch.setattr(archive, "pack_cold_notes", pack)
+    argv = ["archive", "--config", str(tmp_path / "automations.toml"), "--older-than", "0"]
+
+    with dispatch_lock(config.state_dir, shared=True):
+        join = in_thread(lambda: cli.main(argv))
+        assert join(0.3) == [], "archive waits while a run is dispatching"
+        assert (vault.capture_dir / "a.md").exists()
+
+    assert join(10) == [0]
+    assert shared_while_packing == [False]
+    assert not (vault.capture_dir / "a.md").exists()
+
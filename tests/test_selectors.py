@@ -0,0 +1,87 @@
+"""Consumer selectors and their push-down into the store's pending query."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from scripts.automation.emitter import NoteEmitter
+from scripts.automation.notes import iter_note_payloads
+from scripts.automation.selectors import Selector, describe
+from scripts.automation.store import AutomationStore
+
+
+@pytest.fixture
+def store(tmp_path: Path, vault):
+    vault.write("todo.md", "x", tags=["Todo", "home"], processing_status="raw")
+    vault.write("done.md", "x", tags=["todo"], processing_status="organized")
+    vault.write("flag.md", "x", urgent="true", source="phone")
+    vault.write("inbox/deep.md", "x", tags=["todo"], metadata="{ source: watch }")
+    vault.write("inbox/other.md", "x", sources=["phone", "web"])
+    store = AutomationStore(tmp_path / "state.db")
+    NoteEmitter(store).refresh(iter_note_payloads(vault.root, vault.capture_dir))
+    yield store
+    store.close()
+
+
+def pending(store: AutomationStore, vault, selector: Selector) -> list:
+    return sorted(
+        str(Path(path).relative_to(vault.capture_dir)) for path, _, _ in store.iter_pending("c", selector)
+    )
+
+
+def test_from_options_normalises_and_validates(vault) -> None:
+    selector = Selector.from_options({"tags": " ToDo ", "paths": "inbox/*"}, vault.capture_dir)
+
+    assert selector.tags == ("todo",)
+    assert selector.paths == (f"{vault.capture_dir}/inbox/*",)
+    assert describe(selector, vault.capture_dir) == ["tag:todo", "path:inbox/*"]
+    assert not Selector.from_options(None, vault.capture_dir)
+    with pytest.raises(ValueError, match="Unknown selector keys: tag"):
+        Selector.from_options({"tag": ["todo"]}, vault.capture_dir)
+    with pytest.raises(ValueError):
+        Selector.from_options({"fields": ["status"]}, vault.capture_dir)
+
+
+def test_glob_characters_in_the_capture_dir_are_literal(tmp_path: Path) -> None:
+    selector = Selector.from_options({"paths": ["*.md"]}, tmp_path / "odd[dir]")
+
+    assert selector.paths == (f"{tmp_path}/odd[[]dir]/*.md",)
+
+
+def test_tags_use_normalised_note_tags(store, vault) -> None:
+    assert pending(store, vault, Selector(tags=("todo",))) == ["done.md", "inbox/deep.md", "todo.md"]
+    assert pending(store, vault, Selector(tags=("todo", "home"))) == ["todo.md"]
+
+
+def test_fields_match_scalars_lists_nested_values_and_booleans(store, vault) -> None:
+    def fields(data: dict) -> Selector:
+        return Selector.from_options({"fields": data}, vault.capture_dir)
+
+    assert pending(store, vault, fields({"processing_status": ["raw", "organized"]})) == ["done.md", "todo.md"]
+    assert pending(store, vault, fields({"sources": "web"})) == ["inbox/other.md"]
+    assert pending(store, vault, fields({"metadata": {"source": "watch"}})) == ["inbox/deep.md"]
+    assert pending(store, vault, fields({"urgent": True})) == ["flag.md"]
+
+
+def test_paths_and_combined_terms(store, vault) -> None:
+    inbox = Selector.from_options({"paths": ["inbox/*"]}, vault.capture_dir)
+    both = Selector.from_options({"paths": ["inbox/*"], "tags": ["todo"]}, vault.capture_dir)
+
+    assert pending(store, vault, inbox) == ["inbox/deep.md", "inbox/other.md"]
+    assert pending(store, vault, both) == ["inbox/deep.md"]
+    assert len(pending(store, vault, Selector())) == 5
+
+
+def test_unselected_notes_never_reach_the_consumer(vault, make_config, recorder, run_pipeline) -> None:
+    config = make_config(
+        '[consumers.todo]\ntype = "recorder"\nselect = { tags = ["todo"] }\n',
+        taskwarrior=None,
+    )
+    vault.write("a.md", "x", tags=["todo"])
+    vault.write("b.md", "x", tags=["someday"])
+
+    run_pipeline(config)
+
+    assert [path.name for path in recorder.matched] == ["a.md"]
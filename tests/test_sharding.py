@@ -0,0 +1,150 @@
+"""Dispatch leases and sharded runs sharing one state database."""
+
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from scripts.automation.emitter import NoteEmitter
+from scripts.automation.notes import iter_note_payloads
+from scripts.automation.sharding import LeaseKeeper, Shard, shard_of
+from scripts.automation.store import AutomationStore
+
+ROOT = Path(__file__).resolve().parents[1]
+TODO_NOTES = 24
+
+
+@pytest.fixture
+def store(tmp_path: Path, vault):
+    note = vault.write("a.md", "x", tags=["todo"])
+    store = AutomationStore(tmp_path / "state.db")
+    NoteEmitter(store).refresh(iter_note_payloads(vault.root, vault.capture_dir))
+    yield store, note, store.get_note_hash(note)
+    store.close()
+
+
+def test_lease_excludes_other_owners_until_released(store) -> None:
+    store, note, note_hash = store
+
+    assert store.claim("c", note, note_hash, "host:1", ttl=60)
+    assert not store.claim("c", note, note_hash, "host:2", ttl=60)
+    assert store.claim("c", note, note_hash, "host:1", ttl=60), "the owner may renew"
+    assert store.claim("other", note, note_hash, "host:2", ttl=60), "leases are per consumer"
+
+    store.release("c", note, "host:2")
+    assert not store.claim("c", note, note_hash, "host:2", ttl=60), "only the owner releases"
+    store.release("c", note, "host:1")
+    assert store.claim("c", note, note_hash, "host:2", ttl=60)
+
+
+def test_expired_lease_can_be_taken_over(store) -> None:
+    store, note, note_hash = store
+
+    assert store.claim("c", note, note_hash, "crashed:1", ttl=0)
+    assert store.claim("c", note, note_hash, "host:2", ttl=60)
+
+
+def test_claim_fails_once_emitted_at_that_hash(store) -> None:
+    store, note, note_hash = store
+    store.mark_emitted("c", note, note_hash)
+
+    assert not store.claim("c", note, note_hash, "host:1", ttl=60)
+    assert store.claim("c", note, "sha256:edited", "host:1", ttl=60)
+
+
+def test_shards_partition_the_vault(tmp_path: Path) -> None:
+    shards = [Shard.parse(f"{index}/3", tmp_path) for index in (1, 2, 3)]
+    paths = [tmp_path / "capture" / f"note-{index}.md" for index in range(200)]
+
+    owners = [[shard.label for shard in shards if shard.owns(path)] for path in paths]
+
+    assert all(len(owner) == 1 for owner in owners)
+    assert {owner[0] for owner in owners} == {"1/3", "2/3", "3/3"}
+    assert [shard.label for shard in shards if shard.owns(paths[1])] == [f"{shard_of('capture/note-1.md', 3)}/3"]
+    for text in ("0/3", "4/3", "1", "a/b", "1/0"):
+        with pytest.raises(ValueError, match="Invalid shard"):
+            Shard.parse(text, tmp_path)
+
+
+@pytest.fixture
+def sharded_vault(tmp_path: Path, vault, make_config):
+    make_config()
+    for index in range(TODO_NOTES):
+        vault.write(f"todo-{index:02d}.md", f"Task number {index}", tags=["todo"], id=f"t{index}")
+    for index in range(6):
+        vault.write(f"note-{index:02d}.md", f"Just a note {index}", id=f"n{index}")
+    return tmp_path / "automations.toml"
+
+
+def run_cli(*argv: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-m", "scripts.automation.cli", *argv],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+
+
+def tasks(tmp_path: Path) -> list:
+    lines = (tmp_path / "tasks" / "fake-tasks.jsonl").read_text(encoding="utf-8").splitlines()
+    return [json.loads(line)["description"] for line in lines if line.strip()]
+
+
+def test_workers_dispatch_every_note_once(tmp_path: Path, sharded_vault: Path) -> None:
+    metrics = tmp_path / "metrics.json"
+
+    result = run_cli("--config", str(sharded_vault), "--workers", "3", "--metrics-json", str(metrics))
+
+    assert result.returncode == 0, result.stderr
+    descriptions = tasks(tmp_path)
+    assert len(descriptions) == TODO_NOTES
+    assert len(set(descriptions)) == TODO_NOTES
+    report = json.loads(metrics.read_text(encoding="utf-8"))
+    assert report["workers"] == 3
+    assert sorted(report["shards"]) == ["1/3", "2/3", "3/3"]
+    assert sum(shard["counters"]["notes_scanned"] for shard in report["shards"].values()) == TODO_NOTES + 6
+
+    assert run_cli("--config", str(sharded_vault)).returncode == 0
+    assert len(tasks(tmp_path)) == TODO_NOTES, "a whole-vault run redispatched sharded work"
+
+
+def test_overlapping_shard_layouts_never_dispatch_twice(tmp_path: Path, sharded_vault: Path) -> None:
+    layouts = ["1/1", "1/2", "2/2", "1/3", "2/3", "3/3"]
+    workers = [
+        subprocess.Popen(
+            [sys.executable, "-m", "scripts.automation.cli", "--config", str(sharded_vault), "--shard", layout],
+            cwd=ROOT,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        for layout in layouts
+    ]
+    for worker in workers:
+        _, stderr = worker.communicate(timeout=120)
+        assert worker.returncode == 0, stderr
+
+    descriptions = tasks(tmp_path)
+    assert len(descriptions) == TODO_NOTES
+    assert len(set(descriptions)) == TODO_NOTES
+
+
+def test_lease_keeper_renews_while_a_note_is_handled(store, tmp_path: Path) -> None:
+    store, note, note_hash = store
+    keeper = LeaseKeeper(tmp_path / "state.db", "host:1", ttl=2)
+    assert store.claim("c", note, note_hash, "host:1", ttl=2)
+    try:
+        with keeper.holding("c", note):
+            time.sleep(3)
+            assert not store.claim("c", note, note_hash, "host:2", ttl=60), "a renewed lease is still live"
+        time.sleep(3)
+    finally:
+        keeper.close()
+
+    assert store.claim("c", note, note_hash, "host:2", ttl=60), "renewal stops once the handle returns"
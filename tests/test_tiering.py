@@ -0,0 +1,101 @@
+"""Hot/cold tiering: which notes go cold, and when full scans and re-hashes are due."""
+
+from __future__ import annotations
+
+import os
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import pytest
+
+from scripts.automation.config import TieringConfig
+from scripts.automation.emitter import NoteEmitter
+from scripts.automation.notes import iter_note_payloads
+from scripts.automation.sharding import Shard
+from scripts.automation.store import AutomationStore
+from scripts.automation.tiering import classify, full_scan_due, record_full_scan, rehash_due
+
+TIERING = TieringConfig(enabled=True, cold_after_days=30, full_scan_interval_hours=24)
+DAY = 86400
+
+
+@pytest.fixture
+def store(tmp_path: Path):
+    store = AutomationStore(tmp_path / "state.db")
+    yield store
+    store.close()
+
+
+def write_aged(vault, name: str, age_days: float, **frontmatter) -> Path:
+    path = vault.write(name, name, **frontmatter)
+    mtime_ns = int((time.time() - age_days * DAY) * 1_000_000_000)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+    return path
+
+
+def retier(store: AutomationStore, vault, full_scan: bool = False, now: Optional[float] = None) -> List[str]:
+    """Refresh the store from the vault, classify, and return the cold note names."""
+    NoteEmitter(store).refresh(iter_note_payloads(vault.root, vault.capture_dir))
+    classify(store, TIERING, vault.capture_dir, full_scan, now=now)
+    return sorted(Path(path).name for path in store.cold_paths())
+
+
+def test_only_old_notes_with_a_final_status_are_cold(store, vault) -> None:
+    write_aged(vault, "no-status.md", 90, id="n")
+    write_aged(vault, "raw.md", 90, id="r", processing_status="raw")
+    write_aged(vault, "organized.md", 90, id="o", processing_status="organized")
+    write_aged(vault, "archived.md", 90, id="a", processing_status="Archived")
+    write_aged(vault, "fresh.md", 1, id="f", processing_status="organized")
+
+    assert retier(store, vault) == ["archived.md", "organized.md"]
+
+
+def test_processed_note_goes_cold_after_the_configured_age(store, vault) -> None:
+    vault.write("done.md", "done", id="d", processing_status="organized")
+    now = time.time()
+
+    assert retier(store, vault, now=now + 29 * DAY) == []
+    assert retier(store, vault, now=now + 31 * DAY) == ["done.md"]
+
+    vault.write("done.md", "reopened", id="d", processing_status="raw")
+    assert retier(store, vault, now=now + 31 * DAY) == [], "a note that is no longer final turns hot"
+
+
+def test_full_scans_record_prunable_directories(store, vault) -> None:
+    write_aged(vault, "2023/old.md", 90, id="o", processing_status="organized")
+    write_aged(vault, "2024/old.md", 90, id="p", processing_status="organized")
+    write_aged(vault, "2024/new.md", 1, id="q", processing_status="raw")
+    write_aged(vault, "top.md", 90, id="t", processing_status="organized")
+
+    retier(store, vault)
+    assert store.cold_dirs() == {}, "routine runs leave prunable directories alone"
+
+    retier(store, vault, full_scan=True)
+    assert list(store.cold_dirs()) == [str(vault.capture_dir / "2023")]
+
+
+def test_scans_are_due_per_shard(tmp_path: Path, store) -> None:
+    first, second = (Shard.parse(text, tmp_path) for text in ("1/2", "2/2"))
+    now = time.time()
+    assert full_scan_due(store, TIERING, now, first) and full_scan_due(store, TIERING, now, second)
+
+    record_full_scan(store, now, first)
+
+    assert not full_scan_due(store, TIERING, now + 3600, first)
+    assert full_scan_due(store, TIERING, now + 3600, second), "another shard's scan does not count"
+    assert full_scan_due(store, TIERING, now + 3600), "nor does it for a whole-vault run"
+    assert rehash_due(store, TIERING, now + 24 * 3600, first), "the interval applies per shard"
+
+    record_full_scan(store, now + 7200)
+
+    assert not rehash_due(store, TIERING, now + 3 * 3600, second), "a whole-vault scan covers every shard"
+    assert not rehash_due(store, TIERING, now + 3 * 3600)
+
+
+def test_full_scan_is_always_due_without_tiering(store) -> None:
+    now = time.time()
+    record_full_scan(store, now)
+
+    assert full_scan_due(store, TieringConfig(enabled=False), now + 60)
+    assert not rehash_due(store, TieringConfig(enabled=False), now + 60), "re-hashing keeps its interval"
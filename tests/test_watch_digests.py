@@ -0,0 +1,98 @@
+"""Field-level change detection through consumer watch lists."""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from scripts.automation.consumers.base import parse_watch
+from scripts.automation.notes import frontmatter_digests
+
+WATCHER = """
+[consumers.watcher]
+type = "recorder"
+watch = ["title", "body"]
+"""
+
+
+def checkpoint(query_state, config, name: str) -> str:
+    rows = query_state(
+        config,
+        "SELECT e.note_hash, n.note_hash FROM emissions AS e JOIN notes AS n ON n.path = e.note_path"
+        " WHERE e.consumer = 'watcher' AND e.note_path LIKE ?",
+        f"%/{name}",
+    )
+    (emitted, current), = rows
+    return "current" if emitted == current else "stale"
+
+
+@pytest.fixture
+def dispatched(vault, make_config, recorder, run_pipeline):
+    config = make_config(WATCHER, taskwarrior=None)
+    vault.write("a.md", "body", title="Plan", processing_status="raw")
+    run_pipeline(config)
+    recorder.handled.clear()
+    return config
+
+
+def test_unwatched_edit_advances_the_checkpoint(vault, dispatched, recorder, run_pipeline, query_state) -> None:
+    vault.write("a.md", "body", title="Plan", processing_status="organized")
+
+    run_pipeline(dispatched)
+
+    assert recorder.handled == []
+    assert checkpoint(query_state, dispatched, "a.md") == "current"
+
+
+@pytest.mark.parametrize(
+    "body, title",
+    [("body", "Renamed plan"), ("new body", "Plan")],
+    ids=["field", "body"],
+)
+def test_watched_edit_is_dispatched(vault, dispatched, recorder, run_pipeline, body: str, title: str) -> None:
+    vault.write("a.md", body, title=title, processing_status="raw")
+
+    run_pipeline(dispatched)
+
+    assert [path.name for path in recorder.handled] == ["a.md"]
+
+
+def test_advanced_checkpoint_keeps_the_dispatched_digests(vault, dispatched, recorder, run_pipeline) -> None:
+    # Once an unwatched edit advanced the checkpoint, a watched edit is still
+    # compared with what was dispatched.
+    vault.write("a.md", "body", title="Plan", processing_status="organized")
+    run_pipeline(dispatched)
+    vault.write("a.md", "body", title="Other", processing_status="organized")
+    run_pipeline(dispatched)
+
+    assert [path.name for path in recorder.handled] == ["a.md"]
+
+
+def test_checkpoints_without_digests_stay_pending(vault, dispatched, recorder, run_pipeline, query_state) -> None:
+    # As recorded before digests existed.
+    query_state(dispatched, "UPDATE emissions SET field_digests = NULL")
+    vault.write("a.md", "body", title="Plan", processing_status="organized")
+
+    run_pipeline(dispatched)
+
+    assert [path.name for path in recorder.handled] == ["a.md"]
+
+
+def test_stored_frontmatter_gives_the_same_digests() -> None:
+    frontmatter = {"title": "Plan", "tags": ["a", "b"], "count": 3, "meta": {"x": True}, "empty": None}
+
+    assert frontmatter_digests(json.loads(json.dumps(frontmatter))) == frontmatter_digests(frontmatter)
+    changed = json.loads(frontmatter_digests({**frontmatter, "count": 4}))
+    assert {key for key, value in json.loads(frontmatter_digests(frontmatter)).items() if changed[key] != value} == {
+        "count"
+    }
+
+
+def test_parse_watch_validates_names() -> None:
+    assert parse_watch(None) is None
+    assert parse_watch([" title", "body", "title"]) == ("body", "title")
+    with pytest.raises(ValueError, match="top-level"):
+        parse_watch(["meta.source"])
+    with pytest.raises(ValueError, match="list of field names"):
+        parse_watch("title")